@@ -1,18 +1,21 @@
 import json
-from openai import OpenAI
-from dotenv import load_dotenv
+from bots import llm_gateway
 from utils.debug_util import debug_log
 
-load_dotenv()
-client = OpenAI()
-
 class CombatAgent:
     def __init__(self):
         debug_log("CombatAgent.__init__() called.")
-        self.client = client
 
     def narrate_combat_turn(self, turn_info: dict) -> str:
         debug_log("CombatAgent.narrate_combat_turn() called.")
+        return llm_gateway.chat(*self._combat_turn_prompts(turn_info))
+
+    def stream_combat_turn(self, turn_info: dict) -> llm_gateway.ChatStream:
+        """narrate_combat_turn() streamed: yields the narration as it's written"""
+        debug_log("CombatAgent.stream_combat_turn() called.")
+        return llm_gateway.stream(*self._combat_turn_prompts(turn_info))
+
+    def _combat_turn_prompts(self, turn_info):
         system_prompt = (
             "You are a Dungeon Master for a D&D combat encounter. "
             "You receive the result of the player's or NPC's turn, including whether they hit or missed, "
@@ -20,15 +23,7 @@ class CombatAgent:
             "Always keep it short, like 2-3 sentences, and never fudge the outcome."
         )
         user_prompt = f"Turn Info:\n{turn_info}\n\nNarrate the outcome of this combat turn."
-
-        response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ]
-        )
-        return response.choices[0].message.content
+        return system_prompt, user_prompt
 
     def decide_npc_action(self, npc_info: dict) -> str:
         debug_log("CombatAgent.decide_npc_next_action() called.")
@@ -38,11 +33,4 @@ class CombatAgent:
         )
         user_prompt = f"NPC Info:\n{npc_info}\n\nWhat is the NPC's action?"
 
-        response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ]
-        )
-        return response.choices[0].message.content.strip()
+        return llm_gateway.chat(system_prompt, user_prompt).strip()
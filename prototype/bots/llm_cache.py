@@ -0,0 +1,120 @@
+"""
+Disk-backed cache of LLM replies, keyed by the request's content
+
+Some prompts come back again and again with nothing in them that changes -
+"Class: Goblin / Level: 1" for a stat block - so their replies are kept in a
+small SQLite file and reused across turns and runs. The key is a SHA-256 of
+the request (model, messages, response_format and any other parameters), so
+two requests share an entry only if the model would see exactly the same
+thing.
+
+Caching is opt-in per call; agent methods whose answers should stay fresh
+(narration, combat decisions) simply don't ask for it:
+
+    llm_gateway.chat_json(system_prompt, user_prompt, cache=True)
+
+Entries expire after a TTL, and once the file holds more than `max_entries`
+replies the least recently used ones are evicted.
+
+Configured through the environment (see .env.example):
+
+    LLM_CACHE_SIZE   max entries, 0 disables the cache (default 2048)
+    LLM_CACHE_TTL    seconds an entry may be served (default 7 days)
+    LLM_CACHE_PATH   the cache file (default llm_cache.sqlite3)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS responses (
+        key TEXT PRIMARY KEY,
+        model TEXT NOT NULL,
+        content TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        last_used REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used);
+"""
+
+def request_key(request):
+    """Content address of a chat request: SHA-256 of its canonical JSON"""
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+class LLMCache:
+    """LRU + TTL reply cache in a SQLite file, safe to share between threads and processes"""
+
+    def __init__(self, path="llm_cache.sqlite3", max_entries=2048, ttl=7 * 24 * 3600.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode = WAL;")
+        self._conn.executescript(_SCHEMA)
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "expirations": 0, "evictions": 0}
+
+    def get(self, key):
+        """(True, content) on a fresh hit, else (False, None)"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT content, created_at FROM responses WHERE key = ?;", (key,)).fetchone()
+            if row is not None and row[1] + self.ttl <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?;", (key,))
+                self._stats["expirations"] += 1
+                row = None
+            if row is None:
+                self._stats["misses"] += 1
+                return False, None
+
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?;", (now, key))
+            self._stats["hits"] += 1
+            return True, row[0]
+
+    def put(self, key, model, content):
+        if self.max_entries <= 0:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO responses (key, model, content, created_at, last_used) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET content = excluded.content,
+                    created_at = excluded.created_at, last_used = excluded.last_used;
+            """, (key, model, content, now, now))
+            self._stats["stores"] += 1
+
+            # Expired entries go first, then the least recently used beyond max_entries
+            expired = self._conn.execute("DELETE FROM responses WHERE created_at <= ?;", (now - self.ttl,)).rowcount
+            evicted = self._conn.execute("""
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                );
+            """, (self.max_entries,)).rowcount
+            self._stats["expirations"] += expired
+            self._stats["evictions"] += evicted
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses;")
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM responses;").fetchone()[0]
+            return {**self._stats, "size": size, "max_entries": self.max_entries, "ttl": self.ttl}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def cache_from_env():
+    """The cache configured by LLM_CACHE_*, or None when LLM_CACHE_SIZE=0"""
+    max_entries = int(os.getenv("LLM_CACHE_SIZE", "2048"))
+    if max_entries <= 0:
+        return None
+    return LLMCache(os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3"), max_entries,
+                    float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600))))
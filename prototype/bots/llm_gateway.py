@@ -0,0 +1,413 @@
+"""
+One gateway for every LLM call the agents make
+
+All agents share one OpenAI client, so its HTTP connection pool (and the TLS
+sessions in it) is reused from call to call instead of each module opening
+its own. Every call gets a deadline, retries on rate limits and provider
+errors, and waits for a free slot when too many calls are in flight:
+
+    text = llm_gateway.chat(system_prompt, user_prompt)
+    data = llm_gateway.chat_json(system_prompt, user_prompt)
+    stats = llm_gateway.chat_json(system_prompt, user_prompt, cache=True)
+
+cache=True serves a repeated request from the disk-backed reply cache (see
+bots/llm_cache.py); leave it off wherever the reply should be fresh each time.
+
+stream() returns the reply as it's generated, so narration can be shown from
+the first token. For JSON replies it yields just one field's text:
+
+    reply = llm_gateway.stream(system_prompt, user_prompt, json_field="content")
+    for piece in reply:
+        print(piece, end="", flush=True)
+    reply.json()                        # the whole reply, parsed
+
+Retries back off exponentially with full jitter (a random sleep up to
+base * 2^attempt, capped), honour a Retry-After header when the provider
+sends one, and never sleep past the call's deadline. Client errors like a
+bad request or a wrong API key are not retried. A call that can't be
+completed in time, or is rejected, raises LLMError, so a slow provider
+costs a turn at most `deadline` seconds instead of stalling it.
+
+Configured through the environment (see .env.example):
+
+    LLM_TIMEOUT           seconds for one attempt
+    LLM_DEADLINE          seconds for the whole call, retries included
+    LLM_MAX_RETRIES       retries after the first attempt
+    LLM_MAX_CONCURRENCY   calls in flight at once
+    LLM_BACKOFF_BASE / LLM_BACKOFF_MAX   backoff sleep bounds (seconds)
+"""
+
+import json
+import os
+import random
+import re
+import threading
+import time
+
+import openai
+from dotenv import load_dotenv
+
+from bots import llm_cache
+
+load_dotenv()
+
+DEFAULT_MODEL = "gpt-4o"
+
+class LLMError(Exception):
+    """An LLM call that failed for good: rejected, retries used up, deadline passed or no free slot"""
+
+def _status_code(error):
+    return error.status_code if isinstance(error, openai.APIStatusError) else None
+
+def _retryable(error):
+    """Timeouts, dropped connections, 429s and 5xxs are worth another try"""
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    status = _status_code(error)
+    return status is not None and (status == 429 or status >= 500)
+
+def _retry_after(error):
+    """Seconds the provider asked us to wait, if it said"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return max(0.0, float(headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return None
+
+class _JsonStringReader:
+    """Decodes one string field of a JSON object while the object is still arriving"""
+
+    def __init__(self, field):
+        self._start = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self._buffer = ""
+        self._found = False
+        self._closed = False
+
+    def feed(self, piece):
+        """The field's newly complete text; partial escape sequences wait for the next piece"""
+        if self._closed:
+            return ""
+        self._buffer += piece
+        if not self._found:
+            match = self._start.search(self._buffer)
+            if match is None:
+                return ""
+            self._found = True
+            self._buffer = self._buffer[match.end():]
+
+        text, buf, i = [], self._buffer, 0
+        while i < len(buf):
+            if buf[i] == '"':
+                self._closed = True
+                break
+            if buf[i] != "\\":
+                end = i
+                while end < len(buf) and buf[end] not in '"\\':
+                    end += 1
+                text.append(buf[i:end])
+                i = end
+                continue
+
+            length = 6 if buf[i + 1:i + 2] == "u" else 2
+            if length == 6 and buf[i + 2:i + 4].upper() in ("D8", "D9", "DA", "DB"):
+                length = 12  # high surrogate: decode it together with its pair
+            if i + length > len(buf):
+                break
+            try:
+                text.append(json.loads(f'"{buf[i:i + length]}"'))
+            except ValueError:
+                text.append(buf[i:i + length])
+            i += length
+
+        self._buffer = buf[i:]
+        return "".join(text)
+
+class ChatStream:
+    """
+    A reply read as it arrives. Iterating yields text pieces - only `json_field`'s
+    text for JSON replies - and afterwards .text holds all of it and json() the
+    parsed reply. Iterate it once; json() and read() finish it off if needed.
+    """
+
+    def __init__(self, pieces, json_field=None):
+        self.json_field = json_field
+        self.text = ""
+        self._pieces = pieces
+        self._raw = []
+        self._done = False
+
+    def __iter__(self):
+        reader = _JsonStringReader(self.json_field) if self.json_field else None
+        for piece in self._pieces:
+            self._raw.append(piece)
+            text = reader.feed(piece) if reader else piece
+            if text:
+                self.text += text
+                yield text
+        self._done = True
+
+        if reader:
+            # The parsed field is the truth; show whatever the incremental reader missed
+            final = self.json().get(self.json_field)
+            if isinstance(final, str) and final != self.text:
+                rest = final[len(self.text):] if final.startswith(self.text) else ""
+                self.text = final
+                if rest:
+                    yield rest
+
+    def read(self):
+        """Consume what's left and return the full text"""
+        for _ in self:
+            pass
+        return self.text
+
+    def json(self):
+        if not self._done:
+            self.read()
+        return json.loads("".join(self._raw))
+
+class LLMGateway:
+    """Shared client plus the deadline, retry and concurrency policy around it"""
+
+    def __init__(self, client=None, timeout=30.0, deadline=90.0, max_retries=3,
+                 max_concurrency=8, backoff_base=0.5, backoff_max=8.0, cache=None):
+        if max_concurrency < 1 or max_retries < 0:
+            raise ValueError(f"Invalid LLM gateway limits: max_concurrency={max_concurrency} max_retries={max_retries}")
+
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.cache = cache
+
+        # The SDK's own retries are off; this gateway decides when to retry
+        self._client = client
+        self._client_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._pending = {}  # cache key -> Event set when the request making it finishes
+        self._stats = {
+            "calls": 0,
+            "attempts": 0,
+            "retries": 0,
+            "failures": 0,
+            "rate_limited": 0,
+            "timeouts": 0,
+            "slot_waits": 0,
+            "peak_in_flight": 0,
+            "total_seconds": 0.0,
+        }
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = openai.OpenAI(timeout=self.timeout, max_retries=0)
+        return self._client
+
+    # -------------------------------------------------------------------------
+    # Calls
+    # -------------------------------------------------------------------------
+
+    def create(self, deadline=None, **request):
+        """
+        chat.completions.create(**request) under the gateway's policy. Returns
+        the SDK's response; raises LLMError once the call can't succeed in time.
+        """
+        started = time.monotonic()
+        give_up_at = started + (self.deadline if deadline is None else deadline)
+        self._count("calls")
+        try:
+            return self._create_with_retries(request, give_up_at)
+        except LLMError:
+            self._count("failures")
+            raise
+        finally:
+            with self._lock:
+                self._stats["total_seconds"] += time.monotonic() - started
+
+    def chat(self, system_prompt, user_prompt, model=DEFAULT_MODEL, json_response=False, deadline=None,
+             cache=False):
+        """Send a system + user prompt and return the reply text; `cache` reuses an identical earlier reply"""
+        request = _chat_request(system_prompt, user_prompt, model, json_response)
+        if not cache or self.cache is None:
+            return self.create(deadline=deadline, **request).choices[0].message.content
+
+        key = llm_cache.request_key(request)
+        hit, content = self.cache.get(key)
+        if hit:
+            return content
+
+        # Single flight: concurrent identical requests wait for the first one's reply
+        with self._lock:
+            leader = self._pending.get(key)
+            if leader is None:
+                self._pending[key] = threading.Event()
+        if leader is not None:
+            leader.wait(self.deadline if deadline is None else deadline)
+            hit, content = self.cache.get(key)
+            if hit:
+                return content
+            return self.create(deadline=deadline, **request).choices[0].message.content
+
+        try:
+            content = self.create(deadline=deadline, **request).choices[0].message.content
+            self.cache.put(key, model, content)
+            return content
+        finally:
+            with self._lock:
+                self._pending.pop(key).set()
+
+    def chat_json(self, system_prompt, user_prompt, model=DEFAULT_MODEL, deadline=None, cache=False):
+        """chat() in JSON mode, parsed"""
+        return json.loads(self.chat(system_prompt, user_prompt, model=model, json_response=True,
+                                    deadline=deadline, cache=cache))
+
+    def stream(self, system_prompt, user_prompt, model=DEFAULT_MODEL, json_field=None, deadline=None):
+        """
+        chat() as a ChatStream; with `json_field` the reply is requested in JSON
+        mode and that field's text is what gets streamed. Retries only cover
+        opening the stream - text already shown can't be taken back - and the
+        deadline is for the first token; after that each read gets the timeout.
+        """
+        request = _chat_request(system_prompt, user_prompt, model, json_field is not None)
+        return ChatStream(self._stream_pieces(request, deadline), json_field)
+
+    def stats(self):
+        with self._lock:
+            stats = {**self._stats, "in_flight": self._in_flight, "max_concurrency": self.max_concurrency}
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        return stats
+
+    def _stream_pieces(self, request, deadline):
+        """Text deltas of a streamed completion, holding a concurrency slot until it ends"""
+        started = time.monotonic()
+        give_up_at = started + (self.deadline if deadline is None else deadline)
+        self._count("calls")
+        try:
+            response = self._create_with_retries({**request, "stream": True}, give_up_at, keep_slot=True)
+        except LLMError:
+            self._count("failures")
+            raise
+
+        try:
+            for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except openai.OpenAIError as e:
+            self._count("failures")
+            raise LLMError(f"LLM stream broke off: {e}") from e
+        finally:
+            if hasattr(response, "close"):
+                response.close()
+            self._release_slot()
+            with self._lock:
+                self._stats["total_seconds"] += time.monotonic() - started
+
+    def _create_with_retries(self, request, give_up_at, keep_slot=False):
+        for attempt in range(self.max_retries + 1):
+            remaining = give_up_at - time.monotonic()
+            if remaining <= 0:
+                raise LLMError("LLM call ran out of time before it could be sent")
+            try:
+                return self._attempt(request, remaining, keep_slot)
+            except openai.OpenAIError as e:
+                if isinstance(e, openai.APITimeoutError):
+                    self._count("timeouts")
+                if _status_code(e) == 429:
+                    self._count("rate_limited")
+                if not _retryable(e):
+                    raise LLMError(f"LLM call rejected: {e}") from e
+                if attempt == self.max_retries:
+                    raise LLMError(f"LLM call failed after {attempt + 1} attempts: {e}") from e
+
+                pause = _retry_after(e)
+                if pause is None:
+                    pause = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                if time.monotonic() + pause >= give_up_at:
+                    raise LLMError(f"LLM call out of time after {attempt + 1} attempts: {e}") from e
+
+                self._count("retries")
+                time.sleep(pause)
+
+    def _attempt(self, request, remaining, keep_slot=False):
+        """
+        One request, holding a concurrency slot only while it's on the wire; with
+        `keep_slot` a successful request keeps it for the caller to _release_slot()
+        """
+        if not self._slots.acquire(blocking=False):
+            self._count("slot_waits")
+            if not self._slots.acquire(timeout=remaining):
+                raise LLMError(f"No free LLM slot within {remaining:.1f}s ({self.max_concurrency} calls in flight)")
+        with self._lock:
+            self._in_flight += 1
+            self._stats["attempts"] += 1
+            self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._in_flight)
+        try:
+            # Each attempt gets what's left of the deadline, up to the per-attempt timeout
+            response = self.client.chat.completions.create(timeout=min(self.timeout, remaining), **request)
+        except BaseException:
+            self._release_slot()
+            raise
+        if not keep_slot:
+            self._release_slot()
+        return response
+
+    def _release_slot(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+def _chat_request(system_prompt, user_prompt, model, json_response):
+    request = {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+    }
+    if json_response:
+        request["response_format"] = {"type": "json_object"}
+    return request
+
+def gateway_config_from_env():
+    """Read gateway settings from the environment"""
+    return {
+        "timeout": float(os.getenv("LLM_TIMEOUT", "30")),
+        "deadline": float(os.getenv("LLM_DEADLINE", "90")),
+        "max_retries": int(os.getenv("LLM_MAX_RETRIES", "3")),
+        "max_concurrency": int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+        "backoff_base": float(os.getenv("LLM_BACKOFF_BASE", "0.5")),
+        "backoff_max": float(os.getenv("LLM_BACKOFF_MAX", "8")),
+    }
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+def get_gateway():
+    """The process-wide gateway, created on first use"""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway(cache=llm_cache.cache_from_env(), **gateway_config_from_env())
+    return _gateway
+
+def chat(system_prompt, user_prompt, model=DEFAULT_MODEL, json_response=False, deadline=None, cache=False):
+    return get_gateway().chat(system_prompt, user_prompt, model=model, json_response=json_response,
+                              deadline=deadline, cache=cache)
+
+def chat_json(system_prompt, user_prompt, model=DEFAULT_MODEL, deadline=None, cache=False):
+    return get_gateway().chat_json(system_prompt, user_prompt, model=model, deadline=deadline, cache=cache)
+
+def stream(system_prompt, user_prompt, model=DEFAULT_MODEL, json_field=None, deadline=None):
+    return get_gateway().stream(system_prompt, user_prompt, model=model, json_field=json_field, deadline=deadline)
@@ -1,15 +1,19 @@
 import os
-from openai import OpenAI
-from dotenv import load_dotenv
 import uuid
 import json
+from concurrent.futures import ThreadPoolExecutor
+from bots import llm_gateway
 
-load_dotenv()
-client = OpenAI()
+# Stands in for a stat block the LLM couldn't produce, so one failed call doesn't drop the NPC
+DEFAULT_STATS = {
+    "strength": 10, "dexterity": 10, "constitution": 10, "intelligence": 10, "wisdom": 10,
+    "charisma": 10, "level": 1, "experience": 0, "hp": 8, "ac": 12,
+}
 
 class NpcCreatorAgent:
-    def __init__(self):
-        self.client = client
+    def __init__(self, max_workers=None):
+        # Stat calls in flight per roster (the LLM gateway also caps calls process-wide)
+        self.max_workers = max_workers or int(os.getenv("NPC_STATS_CONCURRENCY", "5"))
 
     def generate_stats(self, character_class: str, level: int = 1) -> dict:
         system_prompt = (
@@ -33,17 +37,8 @@ class NpcCreatorAgent:
 
         user_prompt = f"Class: {character_class}\nLevel: {level}"
 
-        response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-             response_format={"type": "json_object"} 
-        )
-
-        json_string = response.choices[0].message.content
-        return json.loads(json_string)
+        # Rosters repeat classes (three goblins), so stat blocks come from the reply cache
+        return llm_gateway.chat_json(system_prompt, user_prompt, cache=True)
 
     def generate_character_sheet(self, description: str, player_character_names: list[str], level: int = 1):
         system_prompt = """
@@ -62,19 +57,17 @@ class NpcCreatorAgent:
             This is a list of known character names to exclude: {", ".join(player_character_names)}
         """
 
-        response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-             response_format={"type": "json_object"} 
-        )
+        found_characters = llm_gateway.chat_json(system_prompt, user_prompt)["characters"]
+        if not found_characters:
+            return []
+
+        # One stat call per character, run side by side; map() keeps the narration's order
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(found_characters))) as pool:
+            stat_blocks = list(pool.map(lambda character: self._stats_or_default(character["class"], level),
+                                        found_characters))
 
-        found_characters = json.loads(response.choices[0].message.content)["characters"]
         completed_characters = []
-        for character in found_characters:
-            descriptions = self.generate_stats(character_class=character['class'])
+        for character, descriptions in zip(found_characters, stat_blocks):
             updated_character = {
                 "id": str(uuid.uuid4()),
                 "name":character["name"],
@@ -92,3 +85,12 @@ class NpcCreatorAgent:
             }
             completed_characters.append(updated_character)
         return completed_characters
+
+    def _stats_or_default(self, character_class: str, level: int) -> dict:
+        """generate_stats(), falling back to an average stat block if the call fails or leaves fields out"""
+        try:
+            stats = self.generate_stats(character_class=character_class, level=level)
+        except Exception as e:
+            print(f"⚠️ Couldn't generate stats for {character_class}, using defaults: {e}")
+            stats = {}
+        return {**DEFAULT_STATS, "level": level, **stats}
@@ -1,17 +1,17 @@
 import os
-from openai import OpenAI
-from dotenv import load_dotenv
 import json
+from bots import llm_gateway
 from utils.debug_util import debug_log
 
-load_dotenv()
-client = OpenAI()
-
 class StoryAgent:
-    def __init__(self):
-        self.client = client
-
     def generate_intro(self, character_class: str, player_name: str) -> dict:
+        return llm_gateway.chat_json(*self._intro_prompts(character_class, player_name))
+
+    def stream_intro(self, character_class: str, player_name: str) -> llm_gateway.ChatStream:
+        """generate_intro() streamed: yields the intro text as it's written; .json() is the full reply"""
+        return llm_gateway.stream(*self._intro_prompts(character_class, player_name), json_field="content")
+
+    def _intro_prompts(self, character_class, player_name):
         system_prompt = (
             "You are a Dungeon Master. "
             "Create a 5-6 sentence introduction for the player, including: "
@@ -20,17 +20,8 @@ class StoryAgent:
             "Return the response as JSON with keys: content, player_name, class."
         )
 
-        response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"The player's class is {character_class}. The player's name is {player_name}."}
-            ],
-            response_format={"type": "json_object"}  # Direct JSON return
-        )
-
-        json_string = response.choices[0].message.content
-        return json.loads(json_string)
+        user_prompt = f"The player's class is {character_class}. The player's name is {player_name}."
+        return system_prompt, user_prompt
 
     def generate_stats(self, character_class: str, level: int) -> dict:
         system_prompt = (
@@ -42,17 +33,8 @@ class StoryAgent:
 
         user_prompt = f"Class: {character_class}\nLevel: {level}"
 
-        response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-             response_format={"type": "json_object"} 
-        )
-
-        json_string = response.choices[0].message.content
-        return json.loads(json_string)
+        # Stat blocks needn't be unique per call, so repeats are served from the reply cache
+        return llm_gateway.chat_json(system_prompt, user_prompt, cache=True)
 
     def story_agent(self, last_story: str, player_input: str, roll_needed: bool, roll_type: str, dc: int, success: str) -> dict:
         debug_log("Story_Agent() called.")
@@ -61,6 +43,16 @@ class StoryAgent:
         continue narrating the scene (social or exploration, not combat).
         Returns JSON with fields: content, player_name (optional), location (optional), etc.
         """
+        return llm_gateway.chat_json(*self._story_prompts(last_story, player_input, roll_needed, roll_type, dc, success))
+
+    def stream_story_agent(self, last_story: str, player_input: str, roll_needed: bool, roll_type: str, dc: int,
+                           success: str) -> llm_gateway.ChatStream:
+        """story_agent() streamed: yields the narration as it's written; .json() is the full reply"""
+        debug_log("stream_story_agent() called.")
+        return llm_gateway.stream(*self._story_prompts(last_story, player_input, roll_needed, roll_type, dc, success),
+                                  json_field="content")
+
+    def _story_prompts(self, last_story, player_input, roll_needed, roll_type, dc, success):
         system_prompt = (
             "You are the Dungeon Master for a D&D game, responsible for all narrative scenes outside of structured combat turns. "
             "You create immersive descriptions, dialogues, and events in the world, including managing story beats, NPC interactions, and exploration. "
@@ -85,14 +77,4 @@ class StoryAgent:
             "Continue the scene and return JSON: {\"content\": \"...\"}"
         )
 
-        response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            response_format={"type": "json_object"}
-        )
-
-        json_string = response.choices[0].message.content
-        return json.loads(json_string)
\ No newline at end of file
+        return system_prompt, user_prompt
\ No newline at end of file
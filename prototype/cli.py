@@ -1,4 +1,5 @@
 # cli.py
+import os
 import typer
 from InquirerPy import inquirer
 from utils.debug_util import debug_log
@@ -8,6 +9,9 @@ from utils.dice_utility import DiceUtility
 dice = DiceUtility()
 app = typer.Typer()
 
+# Print narration token by token as it's written; off waits for the whole text
+STREAM_NARRATION = os.getenv("STREAM_NARRATION", "on").lower() not in ("0", "off", "false", "no")
+
 def ui_main_menu():
     choice = inquirer.select(
         message="Welcome to Agentic Dungeon Master! Choose an option:",
@@ -90,9 +94,19 @@ def ui_get_action():
     return input("\nWhat do you do? ")
 
 def ui_display_dm_narration(text):
+    """Show narration: a string, or pieces of one printed as they arrive. Returns the whole text."""
     typer.secho("\n🪄 The Dungeon Master says:", fg=typer.colors.BRIGHT_BLUE)
-    typer.echo(text)
+    if isinstance(text, str):
+        typer.echo(text)
+    else:
+        pieces = []
+        for piece in text:
+            typer.echo(piece, nl=False)
+            pieces.append(piece)
+        typer.echo("")
+        text = "".join(pieces)
     typer.echo("")
+    return text
 
 def ui_handle_dice_roll(roll_info, dice_result):
     typer.secho(f"\n  🎲 {roll_info['roll_type']} is required. DC {roll_info['dc']}", fg=typer.colors.YELLOW)
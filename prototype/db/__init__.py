@@ -6,10 +6,22 @@ from .db_schema import SCHEMA_SQL
 
 __all__ = [
     # Database operations
-    'get_or_create_user', 'create_campaign', 'list_campaigns', 'get_most_recent_campaign',
+    'get_or_create_user', 'create_campaign', 'list_campaigns', 'get_most_recent_campaign', 'campaign_exists',
     'update_campaign_last_played', 'save_character', 'get_character', 'get_characters_for_user',
-    'save_npc', 'get_npcs_at_location', 'save_event', 'get_recent_events', 
-    'update_npc_relationship', 'get_npc_relationships',
+    'save_npc', 'save_npcs_bulk', 'get_npcs_at_location', 'save_event', 'save_events_bulk', 'get_event_context', 'get_recent_events', 
+    'update_npc_relationship', 'update_npc_relationships', 'get_npc_relationships',
+    'get_relationship_history',
+    # Keyset pagination (opaque cursors)
+    'page_campaigns', 'page_events', 'page_npc_relationships',
+    # Full-text search over campaign history
+    'search_events',
+    # Event partitions & retention
+    'ensure_event_partitions', 'archive_old_events', 'set_event_retention',
+    'apply_event_retention', 'maintain_events',
+    # Connection pool / unit of work
+    'db_connection', 'transaction', 'pool_stats', 'close_pool',
+    # Read cache
+    'cache_stats',
     # Schema
     'SCHEMA_SQL'
 ] 
\ No newline at end of file
@@ -0,0 +1,559 @@
+"""
+asyncio counterpart of db/db.py
+
+Every public function in db.py has an `async def` twin here with the same name,
+arguments and return shape, running on psycopg 3 with its own async pool. The
+SQL and row mapping are shared with the Postgres backend (db/postgres_backend.py),
+so the two can't drift apart. Needs a postgresql:// DATABASE_URL.
+
+    from db import async_db
+
+    user, events = await asyncio.gather(
+        async_db.get_user_by_username("player"),
+        async_db.get_recent_events(campaign_id),
+    )
+"""
+
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+from datetime import date
+
+from psycopg import sql
+from psycopg.rows import args_row
+from psycopg.types.string import TextLoader
+from psycopg_pool import AsyncConnectionPool
+
+from db import postgres_backend
+from db.db import backend_for_url
+from db.pool import pool_config_from_env
+from db.postgres_backend import (
+    _CREATE_USER_SQL, _GET_USER_BY_USERNAME_SQL,
+    _CREATE_CAMPAIGN_SQL, _ADD_CAMPAIGN_DM_SQL, _LIST_USER_CAMPAIGNS_SQL,
+    _LIST_ALL_CAMPAIGNS_SQL, _MOST_RECENT_CAMPAIGN_SQL, _CAMPAIGN_EXISTS_SQL,
+    _UPDATE_CAMPAIGN_LAST_PLAYED_SQL,
+    _CREATE_CHARACTER_SQL, _GET_CHARACTER_SQL, _UPDATE_CHARACTER_STATS_SQL,
+    _CLEAR_CHARACTERS_SQL, _CREATE_LOCATION_SQL, _FIND_LOCATION_SQL, _UPSERT_LOCATION_SQL,
+    _NPC_UPSERT_SQL, _NPCS_AT_LOCATION_SQL, _INSERT_EVENT_SQL,
+    _INSERT_EVENTS_BULK_SQL, _INSERT_EVENTS_BULK_TEMPLATE, _EVENT_CONTEXT_SQL,
+    _ARCHIVED_EVENT_CONTEXT_SQL, _RECENT_EVENTS_SQL, _ARCHIVED_EVENTS_SQL,
+    _CREATE_EVENT_PARTITION_SQL, _OLD_EVENT_PARTITIONS_SQL,
+    _SET_EVENT_RETENTION_SQL, _APPLY_EVENT_RETENTION_SQL,
+    _RELATIONSHIP_UPSERT_SQL, _RELATIONSHIPS_SQL,
+    _RELATIONSHIP_HISTORY_SQL, _RELATIONSHIP_HISTORY_BEFORE_SQL,
+    _campaigns_page_query, _campaign_key, _event_page_tables, _events_page_query, _event_page,
+    _search_events_query,
+    _relationships_page_query, _relationship_key,
+    _CACHE_CHANNEL, _NOTIFY_CACHE_SQL, _PROCESS_TOKEN,
+)
+from db import cache
+from db.pagination import decode_cursor, keyset_page
+from db.records import Campaign, Character, Npc, Event, Relationship
+from db.sqlite_backend import DEFAULT_DATABASE_URL
+from db.rows import (
+    user_from_row, character_stats_params, npc_params, unique_npcs, event_params,
+    relationship_change_rows, interaction_from_row, context_from_hot_row, add_months,
+)
+
+# Connection owned by the innermost open async_transaction() block, if any
+_active_connection = ContextVar("async_db_active_connection", default=None)
+
+_pool = None
+_pool_lock = asyncio.Lock()
+
+async def _configure(conn):
+    # psycopg2 hands UUIDs back as strings; keep the return shapes identical
+    conn.adapters.register_loader("uuid", TextLoader)
+
+async def get_async_pool():
+    """Return the shared async pool, opening it on first use"""
+    global _pool
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                url = postgres_backend.DB_URL or DEFAULT_DATABASE_URL
+                if backend_for_url(url) != "postgres":
+                    raise ValueError(f"async_db needs a postgresql:// DATABASE_URL, not {url!r}")
+                config = pool_config_from_env()
+                pool = AsyncConnectionPool(
+                    url,
+                    min_size=config["min_size"],
+                    max_size=config["max_size"],
+                    max_idle=config["idle_timeout"],
+                    timeout=config["checkout_timeout"],
+                    configure=_configure,
+                    open=False,
+                )
+                await pool.open()
+                _pool = pool
+    return _pool
+
+async def close_async_pool():
+    """Close every pooled async connection (tests, shutdown)"""
+    global _pool
+    async with _pool_lock:
+        if _pool is not None:
+            await _pool.close()
+            _pool = None
+
+@asynccontextmanager
+async def async_db_connection():
+    """
+    Borrow a pooled async connection; commits on success, rolls back on error.
+
+    Inside an async_transaction() block the transaction's connection is reused.
+    """
+    conn = _active_connection.get()
+    if conn is not None:
+        yield conn
+        return
+
+    pool = await get_async_pool()
+    with cache.after_commit():
+        async with pool.connection() as conn:
+            yield conn
+
+@asynccontextmanager
+async def async_transaction():
+    """
+    Unit of work: every async db call awaited inside the block shares one
+    connection and the whole block commits once (or rolls back if it raises).
+
+    Nested async_transaction() blocks join the outermost one.
+    """
+    conn = _active_connection.get()
+    if conn is not None:
+        yield conn
+        return
+
+    pool = await get_async_pool()
+    with cache.after_commit():
+        async with pool.connection() as conn:
+            token = _active_connection.set(conn)
+            try:
+                yield conn
+            finally:
+                _active_connection.reset(token)
+
+async def async_pool_stats():
+    """Async pool usage (see psycopg_pool's get_stats() for the keys)"""
+    pool = await get_async_pool()
+    return pool.get_stats()
+
+def _expand_values(sql, rows, template=None):
+    """
+    psycopg 3 has no execute_values(): expand the single `VALUES %s` of a bulk
+    statement into one placeholder group (or `template`) per row and flatten
+    the parameters.
+    """
+    group = template or "(" + ", ".join(["%s"] * len(rows[0])) + ")"
+    values = ", ".join([group] * len(rows))
+    return sql.replace("VALUES %s", "VALUES " + values, 1), [value for row in rows for value in row]
+
+async def _invalidate(cur, *tags):
+    """
+    Async reads aren't cached, but writes made here still drop the sync read
+    cache's copies, in this process (after commit) and via NOTIFY in others
+    """
+    cache.invalidate(*tags)
+    payload = {"origin": _PROCESS_TOKEN, "tags": [[kind, str(ident)] for kind, ident in tags]}
+    await cur.execute(_NOTIFY_CACHE_SQL, (_CACHE_CHANNEL, json.dumps(payload)))
+
+# =============================================================================
+# USER MANAGEMENT
+# =============================================================================
+
+async def create_user(username, email=None):
+    """Create a new user"""
+    async with async_db_connection() as conn, conn.cursor() as cur:
+        await cur.execute(_CREATE_USER_SQL, (username, email))
+
+        user_id = (await cur.fetchone())[0]
+
+    return user_id
+
+async def get_user_by_username(username):
+    """Get user by username"""
+    async with async_db_connection() as conn, conn.cursor() as cur:
+        await cur.execute(_GET_USER_BY_USERNAME_SQL, (username,))
+
+        result = await cur.fetchone()
+
+    if result:
+        return user_from_row(result)
+    return None
+
+async def get_or_create_user(username):
+    """Get existing user or create new one"""
+    user = await get_user_by_username(username)
+    if user:
+        return user["user_id"]
+    return await create_user(username)
+
+# =============================================================================
+# CAMPAIGN MANAGEMENT
+# =============================================================================
+
+async def create_campaign(name, description, created_by_user_id):
+    """Create a new campaign"""
+    async with async_db_connection() as conn, conn.cursor() as cur:
+        await cur.execute(_CREATE_CAMPAIGN_SQL, (name, description, created_by_user_id))
+
+        campaign_id = (await cur.fetchone())[0]
+
+        # Add creator as a member with 'dm' role
+        await cur.execute(_ADD_CAMPAIGN_DM_SQL, (campaign_id, created_by_user_id))
+
+    return campaign_id
+
+async def list_campaigns(user_id=None):
+    """List all campaigns, optionally filtered by user"""
+    async with async_db_connection() as conn, conn.cursor(row_factory=args_row(Campaign)) as cur:
+        if user_id:
+            await cur.execute(_LIST_USER_CAMPAIGNS_SQL, (user_id,))
+        else:
+            await cur.execute(_LIST_ALL_CAMPAIGNS_SQL)
+
+        campaigns = await cur.fetchall()
+
+    return campaigns
+
+async def page_campaigns(user_id=None, cursor=None, limit=20):
+    """One page of list_campaigns(), plus the cursor for the next page (None on the last one)"""
+    after = decode_cursor("campaigns", cursor) if cursor else []
+    async with async_db_connection() as conn, conn.cursor(row_factory=args_row(Campaign)) as cur:
+        await cur.execute(*_campaigns_page_query(user_id, after, limit))
+
+        campaigns = await cur.fetchall()
+
+    return keyset_page(campaigns, limit, "campaigns", _campaign_key)
+
+async def get_most_recent_campaign(user_id):
+    """Get the most recently played campaign for a user"""
+    async with async_db_connection() as conn, conn.cursor(row_factory=args_row(Campaign)) as cur:
+        await cur.execute(_MOST_RECENT_CAMPAIGN_SQL, (user_id,))
+
+        return await cur.fetchone()
+
+async def campaign_exists(campaign_id):
+    """True if an active campaign has this id (a primary key lookup)"""
+    async with async_db_connection() as conn, conn.cursor() as cur:
+        await cur.execute(_CAMPAIGN_EXISTS_SQL, (campaign_id,))
+
+        return (await cur.fetchone())[0]
+
+async def update_campaign_last_played(campaign_id):
+    """Update the last played timestamp for a campaign"""
+    async with async_db_connection() as conn, conn.cursor() as cur:
+        await cur.execute(_UPDATE_CAMPAIGN_LAST_PLAYED_SQL, (campaign_id,))
+
+# =============================================================================
+# CHARACTER MANAGEMENT
+# =============================================================================
+
+async def create_character(campaign_id, user_id, name, char_class, hp=30):
+    """Create a character in a campaign"""
+    async with async_db_connection() as conn, conn.cursor() as cur:
+        await cur.execute(_CREATE_CHARACTER_SQL, (campaign_id, user_id, name, char_class, hp, hp))
+
+        character_id = (await cur.fetchone())[0]
+        await _invalidate(cur, ("characters", campaign_id))
+
+    return character_id
+
+async def get_character_in_campaign(campaign_id, user_id):
+    """Get user's character in a specific campaign"""
+    async with async_db_connection() as conn, conn.cursor(row_factory=args_row(Character)) as cur:
+        await cur.execute(_GET_CHARACTER_SQL, (campaign_id, user_id))
+
+        result = await cur.fetchone()
+
+    if result:
+        return result
+    return None
+
+async def update_character_stats(character_id, stats):
+    """Update character stats"""
+    async with async_db_connection() as conn, conn.cursor() as cur:
+        await cur.execute(_UPDATE_CHARACTER_STATS_SQL, character_stats_params(character_id, stats))
+        await _invalidate(cur, ("character", character_id))
+
+async def clear_characters_in_campaign(campaign_id):
+    """Clear all characters in a campaign"""
+    async with async_db_connection() as conn, conn.cursor() as cur:
+        await cur.execute(_CLEAR_CHARACTERS_SQL, (campaign_id,))
+        await _invalidate(cur, ("characters", campaign_id))
+
+# =============================================================================
+# LOCATION MANAGEMENT
+# =============================================================================
+
+async def create_location(campaign_id, name, description=None):
+    """Create a location in a campaign"""
+    async with async_db_connection() as conn, conn.cursor() as cur:
+        await cur.execute(_CREATE_LOCATION_SQL, (campaign_id, name, description))
+
+        location_id = (await cur.fetchone())[0]
+
+    return location_id
+
+async def get_or_create_location(campaign_id, name, description=None):
+    """Get existing location or create new one"""
+    async with async_db_connection() as conn, conn.cursor() as cur:
+        await cur.execute(_FIND_LOCATION_SQL, (campaign_id, name))
+
+        result = await cur.fetchone()
+
+        if result:
+            location_id = result[0]
+        else:
+            await cur.execute(_UPSERT_LOCATION_SQL, (campaign_id, name, description))
+
+            location_id = (await cur.fetchone())[0]
+
+    return location_id
+
+# =============================================================================
+# NPC MANAGEMENT
+# =============================================================================
+
+async def save_npc(campaign_id, npc_data, location_name="Starting Area"):
+    """Save or update an NPC in a campaign"""
+    return (await save_npcs_bulk(campaign_id, [npc_data], location_name))[0]
+
+async def save_npcs_bulk(campaign_id, npcs, location_name="Starting Area"):
+    """
+    Save or update many NPCs at one location with a single multi-row upsert.
+
+    Returns the npc_ids in the same order as `npcs`.
+    """
+    if not npcs:
+        return []
+
+    npcs_by_name = unique_npcs(npcs)
+
+    async with async_transaction() as conn, conn.cursor() as cur:
+        location_id = await get_or_create_location(campaign_id, location_name)
+
+        sql, params = _expand_values(
+            _NPC_UPSERT_SQL,
+            [npc_params(campaign_id, npc_data, location_id) for npc_data in npcs_by_name.values()]
+        )
+        await cur.execute(sql, params)
+        rows = await cur.fetchall()
+        await _invalidate(cur, ("npcs", campaign_id))
+
+    npc_ids = dict(rows)
+    return [npc_ids[npc_data["name"]] for npc_data in npcs]
+
+async def get_npcs_at_location(campaign_id, location_name, status="alive"):
+    """Get all NPCs at a specific location in campaign"""
+    async with async_db_connection() as conn, conn.cursor(row_factory=args_row(Npc)) as cur:
+        await cur.execute(_NPCS_AT_LOCATION_SQL, (campaign_id, location_name, status))
+
+        results = await cur.fetchall()
+
+    return results
+
+# =============================================================================
+# EVENT MANAGEMENT
+# =============================================================================
+
+async def save_event(campaign_id, event_type, description, location_name=None,
+                     npcs_involved=None, character_ids=None, player_actions=None,
+                     consequences=None, session_id=None, turn_number=None, context_delta=None):
+    """Save a story event in a campaign (see db.save_event)"""
+    async with async_transaction() as conn, conn.cursor() as cur:
+        location_id = None
+        if location_name:
+            location_id = await get_or_create_location(campaign_id, location_name)
+
+        await cur.execute(_INSERT_EVENT_SQL, (campaign_id, event_type, description, location_id,
+                          npcs_involved, character_ids, player_actions, consequences,
+                          session_id, turn_number, context_delta))
+
+async def save_events_bulk(events):
+    """Save many events with one multi-row insert, in one transaction (see db.save_events_bulk)"""
+    if not events:
+        return
+
+    async with async_transaction() as conn, conn.cursor() as cur:
+        location_ids = {}
+        for event in events:
+            key = (event["campaign_id"], event.get("location_name"))
+            if key[1] and key not in location_ids:
+                location_ids[key] = await get_or_create_location(*key)
+
+        rows = [event_params(event, location_ids.get((event["campaign_id"], event.get("location_name"))))
+                for event in events]
+        await cur.execute(*_expand_values(_INSERT_EVENTS_BULK_SQL, rows, _INSERT_EVENTS_BULK_TEMPLATE))
+
+async def get_event_context(event_id):
+    """Rebuild the session context as it was when an event was saved"""
+    async with async_db_connection() as conn, conn.cursor() as cur:
+        await cur.execute(_EVENT_CONTEXT_SQL, (event_id,))
+
+        complete, context = context_from_hot_row(await cur.fetchone())
+        if not complete:
+            await cur.execute(_ARCHIVED_EVENT_CONTEXT_SQL, (event_id,))
+            result = await cur.fetchone()
+            context = result[0] if result and result[0] is not None else ""
+
+    return context
+
+async def get_recent_events(campaign_id, limit=10):
+    """Get recent events for AI context in campaign"""
+    async with async_db_connection() as conn, conn.cursor(row_factory=args_row(Event)) as cur:
+        await cur.execute(_RECENT_EVENTS_SQL, (campaign_id, limit))
+
+        results = await cur.fetchall()
+        if len(results) < limit:
+            await cur.execute(_ARCHIVED_EVENTS_SQL, (campaign_id, limit - len(results)))
+            results += await cur.fetchall()
+
+    return results
+
+async def page_events(campaign_id, cursor=None, limit=20, oldest_first=False):
+    """One page of a campaign's events, newest (or oldest) first, plus the cursor for the next page"""
+    tables, after = _event_page_tables(cursor, oldest_first)
+    table_rows = []
+    async with async_db_connection() as conn, conn.cursor() as cur:
+        for table in tables:
+            await cur.execute(*_events_page_query(table, campaign_id, after, limit + 1 - len(table_rows),
+                                                  oldest_first))
+            table_rows += [(table, row) for row in await cur.fetchall()]
+            if len(table_rows) > limit:
+                break
+            after = []
+
+    return _event_page(table_rows, limit, oldest_first)
+
+async def search_events(campaign_id, query, limit=10, match_any=False):
+    """A campaign's events matching a free-text query, most relevant first"""
+    search = _search_events_query(campaign_id, query, limit, match_any)
+    if search is None:
+        return []
+    async with async_db_connection() as conn, conn.cursor(row_factory=args_row(Event)) as cur:
+        await cur.execute(*search)
+        return await cur.fetchall()
+
+# =============================================================================
+# EVENT PARTITIONS & RETENTION
+# =============================================================================
+
+async def ensure_event_partitions(months_ahead=2):
+    """Create this month's and the next `months_ahead` events partitions; returns the new names"""
+    this_month = date.today().replace(day=1)
+    created = []
+    async with async_transaction() as conn, conn.cursor() as cur:
+        for offset in range(months_ahead + 1):
+            await cur.execute(_CREATE_EVENT_PARTITION_SQL, (add_months(this_month, offset),))
+            name = (await cur.fetchone())[0]
+            if name:
+                created.append(name)
+    return created
+
+async def archive_old_events(keep_months=12):
+    """Move whole months older than `keep_months` under events_archive; returns their names"""
+    cutoff = add_months(date.today().replace(day=1), -keep_months)
+    async with async_transaction() as conn, conn.cursor() as cur:
+        await cur.execute(_OLD_EVENT_PARTITIONS_SQL, (cutoff,))
+        names = [row[0] for row in await cur.fetchall()]
+        for name in names:
+            await cur.execute(sql.SQL("ALTER TABLE events DETACH PARTITION {};").format(sql.Identifier(name)))
+            await cur.execute(sql.SQL("ALTER TABLE {} INHERIT events_archive;").format(sql.Identifier(name)))
+    return names
+
+async def set_event_retention(campaign_id, keep_newest):
+    """Keep only the newest `keep_newest` events of a campaign hot (None = keep all)"""
+    async with async_db_connection() as conn, conn.cursor() as cur:
+        await cur.execute(_SET_EVENT_RETENTION_SQL, (keep_newest, campaign_id))
+
+async def apply_event_retention(campaign_id=None, batch_size=10000):
+    """Archive up to `batch_size` events beyond retention limits; returns how many were moved"""
+    async with async_db_connection() as conn, conn.cursor() as cur:
+        if campaign_id:
+            await cur.execute(_APPLY_EVENT_RETENTION_SQL.format(campaigns="c.campaign_id = %s"),
+                              (campaign_id, batch_size))
+        else:
+            await cur.execute(_APPLY_EVENT_RETENTION_SQL.format(campaigns="true"), (batch_size,))
+        return cur.rowcount
+
+async def maintain_events(months_ahead=None, keep_months=None, batch_size=10000):
+    """Create upcoming partitions, archive old months and apply retention (see db.maintain_events)"""
+    if months_ahead is None:
+        months_ahead = int(os.getenv("EVENT_PARTITION_MONTHS_AHEAD", "2"))
+    if keep_months is None:
+        keep_months = int(os.getenv("EVENT_HOT_MONTHS", "12"))
+
+    created = await ensure_event_partitions(months_ahead)
+    archived = await archive_old_events(keep_months)
+    retained = 0
+    while True:
+        moved = await apply_event_retention(batch_size=batch_size)
+        retained += moved
+        if moved < batch_size:
+            break
+
+    return {"partitions_created": created, "partitions_archived": archived, "events_archived": retained}
+
+# =============================================================================
+# RELATIONSHIP MANAGEMENT
+# =============================================================================
+
+async def update_npc_relationship(campaign_id, npc_name, character_id, relationship_change, interaction_description):
+    """Update relationship between NPC and character in campaign"""
+    await update_npc_relationships(campaign_id, character_id,
+                                   [(npc_name, relationship_change, interaction_description)])
+
+async def update_npc_relationships(campaign_id, character_id, changes):
+    """
+    Apply many relationship changes for one character in a single statement
+    (see db.update_npc_relationships). Returns the number of relationships touched.
+    """
+    rows = relationship_change_rows(campaign_id, character_id, changes)
+    if not rows:
+        return 0
+
+    sql, params = _expand_values(_RELATIONSHIP_UPSERT_SQL, rows)
+    async with async_db_connection() as conn, conn.cursor() as cur:
+        await cur.execute(sql, params)
+        touched = cur.rowcount
+        await _invalidate(cur, ("relationships", campaign_id))
+
+    return touched
+
+async def get_npc_relationships(campaign_id, character_id, history_limit=3):
+    """Get all NPC relationships for a character in campaign"""
+    async with async_db_connection() as conn, conn.cursor(row_factory=args_row(Relationship)) as cur:
+        await cur.execute(_RELATIONSHIPS_SQL, (history_limit, campaign_id, character_id))
+
+        results = await cur.fetchall()
+
+    return results
+
+async def page_npc_relationships(campaign_id, character_id, cursor=None, limit=20, history_limit=3):
+    """One page of get_npc_relationships(), plus the cursor for the next page (None on the last one)"""
+    after = decode_cursor("relationships", cursor) if cursor else []
+    async with async_db_connection() as conn, conn.cursor(row_factory=args_row(Relationship)) as cur:
+        await cur.execute(*_relationships_page_query(campaign_id, character_id, after, limit, history_limit))
+
+        relationships = await cur.fetchall()
+
+    return keyset_page(relationships, limit, "relationships", _relationship_key)
+
+async def get_relationship_history(relationship_id, before=None, limit=10):
+    """Page through a relationship's interactions, newest first"""
+    async with async_db_connection() as conn, conn.cursor() as cur:
+        if before:
+            await cur.execute(_RELATIONSHIP_HISTORY_BEFORE_SQL,
+                              (relationship_id, before["created_at"], before["interaction_id"], limit))
+        else:
+            await cur.execute(_RELATIONSHIP_HISTORY_SQL, (relationship_id, limit))
+
+        results = await cur.fetchall()
+
+    return [interaction_from_row(row) for row in results]
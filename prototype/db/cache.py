@@ -0,0 +1,220 @@
+"""
+Read-through cache for the db layer's hot per-turn lookups
+
+Characters, the NPCs at a location and NPC relationships are read every turn
+but only change when the game itself writes them, so the backends serve those
+reads from a process-wide LRU cache with a TTL:
+
+    @cached("npcs")
+    def get_npcs_at_location(campaign_id, location_name, status="alive"): ...
+
+Entries are tagged (kind, id) - e.g. ("npcs", campaign_id) - and the writes
+that change the data invalidate their tags. Inside a connection or transaction
+block the invalidation waits until the block has committed, so no reader can
+re-cache the old rows in between. The Postgres backend also broadcasts every
+invalidation with NOTIFY so other worker processes drop their copies too; the
+TTL bounds staleness from anything else (manual SQL, missed notifications).
+
+Configured through the environment (see .env.example):
+
+    DB_CACHE_SIZE   max entries, 0 disables caching (default 1024)
+    DB_CACHE_TTL    seconds an entry may be served (default 30)
+"""
+
+import copy
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+class ReadCache:
+    """Thread-safe LRU + TTL cache whose entries can be dropped by tag"""
+
+    def __init__(self, max_size=1024, ttl=30.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, expires_at, tags), least recently used first
+        self._keys_by_tag = {}
+        self.version = 0  # bumped by every invalidation
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+            "remote_invalidations": 0,
+        }
+
+    def get(self, key):
+        """(True, value) on a fresh hit, else (False, None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= time.monotonic():
+                self._drop(key)
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return True, entry[0]
+
+    def put(self, key, value, tags, version):
+        """
+        Store `value` unless an invalidation ran since `version` was read (the
+        value may predate that write)
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if version != self.version:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl, tags)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def invalidate(self, tags, remote=False):
+        """Drop every entry carrying any of `tags`"""
+        with self._lock:
+            self.version += 1
+            for tag in tags:
+                for key in self._keys_by_tag.pop(tag, ()):
+                    self._drop(key)
+            self._stats["remote_invalidations" if remote else "invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            self._keys_by_tag.clear()
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "size": len(self._entries),
+                    "max_size": self.max_size, "ttl": self.ttl}
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+def cache_config_from_env():
+    """Read cache settings from the environment"""
+    return {
+        "max_size": int(os.getenv("DB_CACHE_SIZE", "1024")),
+        "ttl": float(os.getenv("DB_CACHE_TTL", "30")),
+    }
+
+_cache = ReadCache(**cache_config_from_env())
+
+# Tags invalidated inside the open connection/transaction block, applied once it commits
+_pending_tags = ContextVar("db_cache_pending_tags", default=None)
+
+def configure(max_size=None, ttl=None):
+    """Resize or re-time the cache (max_size=0 disables it); drops every entry"""
+    if max_size is not None:
+        _cache.max_size = max_size
+    if ttl is not None:
+        _cache.ttl = ttl
+    _cache.clear()
+
+def enabled():
+    return _cache.max_size > 0
+
+def clear():
+    """Drop every cached entry"""
+    _cache.clear()
+
+def cache_stats():
+    """Hit/miss/eviction/invalidation counters and current size"""
+    return _cache.stats()
+
+def _copy(value):
+    # Callers mutate the records they get back (e.g. character["hp"] -= 3), so
+    # the cache never hands out the objects it stores
+    if isinstance(value, list):
+        return [copy.copy(item) for item in value]
+    return copy.copy(value)
+
+def cached(kind, result_tags=None):
+    """
+    Read-through caching for a lookup whose first argument is the campaign_id.
+
+    The entry is tagged (kind, campaign_id), plus any (kind, id) tags
+    `result_tags(result)` returns, for invalidate() to drop.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # A block with uncommitted writes must see them, not the cache
+            if _cache.max_size <= 0 or _pending_tags.get():
+                return func(*args, **kwargs)
+
+            key = (func.__name__, tuple(str(arg) for arg in args), tuple(sorted(kwargs.items())))
+            hit, value = _cache.get(key)
+            if hit:
+                return _copy(value)
+
+            version = _cache.version
+            value = func(*args, **kwargs)
+            tags = [(kind, str(args[0]))]
+            if result_tags is not None:
+                tags += [(tag_kind, str(ident)) for tag_kind, ident in result_tags(value)]
+            _cache.put(key, _copy(value), tags, version)
+            return value
+        return wrapper
+    return decorator
+
+def invalidate(*tags):
+    """
+    Drop cached entries tagged with any of `tags` ((kind, id) pairs). Inside an
+    after_commit() block this happens when the block exits.
+    """
+    tags = [(kind, str(ident)) for kind, ident in tags]
+    pending = _pending_tags.get()
+    if pending is not None:
+        pending.extend(tags)
+    else:
+        _cache.invalidate(tags)
+
+def invalidate_remote(tags):
+    """Apply an invalidation broadcast by another process"""
+    _cache.invalidate([(kind, str(ident)) for kind, ident in tags], remote=True)
+
+@contextmanager
+def after_commit():
+    """
+    Hold back invalidate() calls until the block exits. The backends wrap their
+    outermost connection block in this, outside the commit, so invalidations
+    land after the write is visible. Nested blocks join the outer one.
+    """
+    if _pending_tags.get() is not None:
+        yield
+        return
+
+    pending = []
+    token = _pending_tags.set(pending)
+    try:
+        yield
+    finally:
+        _pending_tags.reset(token)
+        if pending:
+            _cache.invalidate(pending)
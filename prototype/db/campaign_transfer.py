@@ -0,0 +1,216 @@
+"""
+Streaming export / import of one campaign (Postgres)
+
+Moves a campaign - its users, members, characters, locations, NPCs, events
+(hot and archived) and relationships - between databases, or snapshots it:
+
+    export_campaign(campaign_id, "goblin_war.dndcamp.gz")
+    import_campaign("goblin_war.dndcamp.gz")          # into DATABASE_URL
+
+The file is gzip-compressed text in the spirit of a pg_dump data section: a
+JSON header line, then for each table a JSON line naming its columns, the
+table's rows in COPY text format (one line per row) and a "\\." terminator.
+Export streams `COPY (SELECT ...) TO STDOUT` into the gzip stream and import
+streams each section into `COPY ... FROM STDIN`, so memory use stays flat
+however big the campaign is.
+
+Users are matched by username: a username that already exists in the target
+database is reused and the campaign's rows are pointed at it.
+"""
+
+import gzip
+import json
+
+from psycopg2 import sql
+
+from db.postgres_backend import transaction, _invalidate
+
+FORMAT = "agentic-dnd-campaign"
+VERSION = 1
+
+# Export order is also import order: every table comes after the ones it references.
+# Each query selects one campaign's rows; {campaign} is the campaign_id literal
+_SECTIONS = [
+    ("users", """
+        SELECT {columns} FROM users
+        WHERE user_id IN (SELECT created_by FROM campaigns WHERE campaign_id = {campaign}
+                          UNION SELECT user_id FROM campaign_members WHERE campaign_id = {campaign}
+                          UNION SELECT user_id FROM characters WHERE campaign_id = {campaign})
+    """),
+    ("campaigns", "SELECT {columns} FROM campaigns WHERE campaign_id = {campaign}"),
+    ("campaign_members", "SELECT {columns} FROM campaign_members WHERE campaign_id = {campaign}"),
+    ("characters", "SELECT {columns} FROM characters WHERE campaign_id = {campaign}"),
+    ("locations", "SELECT {columns} FROM locations WHERE campaign_id = {campaign}"),
+    ("npcs", "SELECT {columns} FROM npcs WHERE campaign_id = {campaign}"),
+    ("events", "SELECT {columns} FROM events WHERE campaign_id = {campaign} ORDER BY created_at"),
+    ("events_archive", "SELECT {columns} FROM events_archive WHERE campaign_id = {campaign} ORDER BY created_at"),
+    ("relationships", "SELECT {columns} FROM relationships WHERE campaign_id = {campaign}"),
+    # interaction_id is a sequence in the target database, so it's left out and
+    # rows keep their order instead
+    ("relationship_interactions", """
+        SELECT {columns} FROM relationship_interactions
+        WHERE relationship_id IN (SELECT relationship_id FROM relationships WHERE campaign_id = {campaign})
+        ORDER BY interaction_id
+    """),
+]
+
+# Columns that hold a user_id, remapped on import to the target's user with the same username
+_USER_COLUMNS = {"campaigns": "created_by", "campaign_members": "user_id", "characters": "user_id"}
+
+_SKIPPED_COLUMNS = {"relationship_interactions": {"interaction_id"}}
+
+_TABLE_COLUMNS_SQL = """
+    SELECT column_name FROM information_schema.columns
+    WHERE table_schema = current_schema() AND table_name = %s AND is_generated = 'NEVER'
+    ORDER BY ordinal_position;
+"""
+
+_END_OF_SECTION = b"\\.\n"
+
+def _table_columns(cur, table):
+    """Columns to copy: everything but generated and sequence-assigned ones"""
+    cur.execute(_TABLE_COLUMNS_SQL, (table,))
+    return [row[0] for row in cur.fetchall() if row[0] not in _SKIPPED_COLUMNS.get(table, ())]
+
+def _columns_sql(columns):
+    return sql.SQL(", ").join(map(sql.Identifier, columns))
+
+# =============================================================================
+# EXPORT
+# =============================================================================
+
+def export_campaign(campaign_id, path, compresslevel=6):
+    """
+    Write one campaign to `path` (gzip). All tables are read from one
+    REPEATABLE READ snapshot, so the file is consistent even while the
+    campaign is being played. Returns {table: rows exported}.
+    """
+    counts = {}
+    with transaction() as conn, conn.cursor() as cur, \
+            gzip.open(path, "wb", compresslevel=compresslevel) as out:
+        cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY;")
+        cur.execute("SELECT 1 FROM campaigns WHERE campaign_id = %s;", (campaign_id,))
+        if cur.fetchone() is None:
+            raise ValueError(f"No campaign with id {campaign_id}")
+
+        out.write((json.dumps({"format": FORMAT, "version": VERSION, "campaign_id": str(campaign_id)}) + "\n").encode())
+        for table, query in _SECTIONS:
+            columns = _table_columns(cur, table)
+            out.write((json.dumps({"table": table, "columns": columns}) + "\n").encode())
+
+            select = sql.SQL(query).format(columns=_columns_sql(columns), campaign=sql.Literal(str(campaign_id)))
+            cur.copy_expert(sql.SQL("COPY ({}) TO STDOUT;").format(select), out)
+            counts[table] = cur.rowcount
+            out.write(_END_OF_SECTION)
+
+    return counts
+
+# =============================================================================
+# IMPORT
+# =============================================================================
+
+class _SectionReader:
+    """File-like view of one table's COPY rows, ending at the section terminator"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.done = False
+
+    def readline(self, size=-1):
+        if self.done:
+            return b""
+        line = self.stream.readline()
+        if not line:
+            raise ValueError("Campaign file ends in the middle of a table")
+        if line == _END_OF_SECTION:
+            self.done = True
+            return b""
+        return line
+
+    def read(self, size=-1):
+        chunks, total = [], 0
+        while size < 0 or total < size:
+            line = self.readline()
+            if not line:
+                break
+            chunks.append(line)
+            total += len(line)
+        return b"".join(chunks)
+
+def _read_json_line(stream):
+    line = stream.readline()
+    return json.loads(line) if line.strip() else None
+
+def _copy_section(cur, table, columns, stream):
+    """COPY one section's rows into `table`; returns the row count"""
+    cur.copy_expert(sql.SQL("COPY {} ({}) FROM STDIN;").format(sql.Identifier(table), _columns_sql(columns)),
+                    _SectionReader(stream))
+    return cur.rowcount
+
+def _copy_users(cur, columns, stream):
+    """Stage the users, insert the new ones and map every exported user_id to the target's"""
+    cur.execute("CREATE TEMP TABLE import_users (LIKE users) ON COMMIT DROP;")
+    count = _copy_section(cur, "import_users", columns, stream)
+    cur.execute(sql.SQL("""
+        INSERT INTO users ({columns}) SELECT {columns} FROM import_users ON CONFLICT DO NOTHING;
+        CREATE TEMP TABLE import_user_map ON COMMIT DROP AS
+            SELECT i.user_id AS old_id, u.user_id AS new_id
+            FROM import_users i JOIN users u ON u.username = i.username;
+    """).format(columns=_columns_sql(columns)))
+    return count
+
+def _copy_with_user_map(cur, table, columns, stream):
+    """COPY through a staging table, pointing the user column at the target's users"""
+    staging = sql.Identifier(f"import_{table}")
+    cur.execute(sql.SQL("CREATE TEMP TABLE {} (LIKE {}) ON COMMIT DROP;").format(staging, sql.Identifier(table)))
+    count = _copy_section(cur, f"import_{table}", columns, stream)
+
+    user_column = _USER_COLUMNS[table]
+    selected = sql.SQL(", ").join(
+        sql.SQL("coalesce(m.new_id, s.{0})").format(sql.Identifier(column)) if column == user_column
+        else sql.SQL("s.{}").format(sql.Identifier(column))
+        for column in columns
+    )
+    cur.execute(sql.SQL("""
+        INSERT INTO {table} ({columns})
+        SELECT {selected} FROM {staging} s LEFT JOIN import_user_map m ON m.old_id = s.{user_column};
+    """).format(table=sql.Identifier(table), columns=_columns_sql(columns), selected=selected,
+                staging=staging, user_column=sql.Identifier(user_column)))
+    return count
+
+def import_campaign(path, replace=False):
+    """
+    Load a campaign exported by export_campaign() in one transaction. Raises
+    ValueError if the campaign already exists, unless `replace` is set, in
+    which case the existing copy is deleted first. Returns {table: rows imported}.
+    """
+    counts = {}
+    with gzip.open(path, "rb") as stream, transaction() as conn, conn.cursor() as cur:
+        header = _read_json_line(stream)
+        if not header or header.get("format") != FORMAT:
+            raise ValueError(f"{path} is not a campaign export")
+        if header.get("version") != VERSION:
+            raise ValueError(f"Unsupported campaign export version {header.get('version')}")
+
+        campaign_id = header["campaign_id"]
+        cur.execute("SELECT 1 FROM campaigns WHERE campaign_id = %s;", (campaign_id,))
+        if cur.fetchone() is not None:
+            if not replace:
+                raise ValueError(f"Campaign {campaign_id} already exists (pass replace=True to overwrite it)")
+            # events_archive has no foreign keys (detached partitions join it as they are)
+            cur.execute("DELETE FROM events_archive WHERE campaign_id = %s;", (campaign_id,))
+            cur.execute("DELETE FROM campaigns WHERE campaign_id = %s;", (campaign_id,))
+            _invalidate(cur, ("characters", campaign_id), ("npcs", campaign_id), ("relationships", campaign_id))
+
+        while (section := _read_json_line(stream)) is not None:
+            table, columns = section["table"], section["columns"]
+            if table == "users":
+                counts[table] = _copy_users(cur, columns, stream)
+            elif table in _USER_COLUMNS:
+                counts[table] = _copy_with_user_map(cur, table, columns, stream)
+            elif table in dict(_SECTIONS):
+                counts[table] = _copy_section(cur, table, columns, stream)
+            else:
+                raise ValueError(f"Unknown table in campaign export: {table!r}")
+
+    return counts
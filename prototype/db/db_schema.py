@@ -9,8 +9,11 @@ Ready for thousands of users and campaigns.
 # SQL Schema for dev_tools/setup_db.py to import
 SCHEMA_SQL = """
 -- Drop existing tables in dependency order
+DROP TABLE IF EXISTS relationship_interactions CASCADE;
 DROP TABLE IF EXISTS relationships CASCADE;
+DROP TABLE IF EXISTS events_archive CASCADE;
 DROP TABLE IF EXISTS events CASCADE;  
+DROP FUNCTION IF EXISTS create_event_partition(date);
 DROP TABLE IF EXISTS characters CASCADE;
 DROP TABLE IF EXISTS npcs CASCADE;
 DROP TABLE IF EXISTS locations CASCADE;
@@ -35,7 +38,8 @@ CREATE TABLE campaigns (
     created_by UUID REFERENCES users(user_id) ON DELETE CASCADE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     last_played TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    is_active BOOLEAN DEFAULT true
+    is_active BOOLEAN DEFAULT true,
+    event_retention INTEGER  -- Keep only the newest N events hot (NULL = keep all)
 );
 
 -- 3. CAMPAIGN MEMBERS - Who has access to each campaign (future multiplayer)
@@ -77,7 +81,8 @@ CREATE TABLE locations (
     description TEXT,
     connections JSONB,  -- Array of connected location IDs
     notable_features TEXT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(campaign_id, name)  -- Locations are looked up by name
 );
 
 -- 6. NPCS - Non-player characters (isolated by campaign_id)  
@@ -101,12 +106,15 @@ CREATE TABLE npcs (
     disposition TEXT DEFAULT 'neutral',  -- friendly, hostile, neutral
     backstory TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(campaign_id, name)  -- NPCs are looked up and upserted by name
 );
 
 -- 7. EVENTS - Story events (isolated by campaign_id)
+-- Partitioned by month on created_at: inserts and recent reads only touch the
+-- newest partitions, and old months are detached whole (see EVENTS_ARCHIVE)
 CREATE TABLE events (
-    event_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    event_id UUID DEFAULT gen_random_uuid(),
     campaign_id UUID REFERENCES campaigns(campaign_id) ON DELETE CASCADE,
     event_type TEXT,  -- combat, conversation, discovery, etc.
     description TEXT NOT NULL,
@@ -115,9 +123,56 @@ CREATE TABLE events (
     characters_involved JSONB,  -- Array of character IDs
     player_actions TEXT,
     consequences TEXT,
-    session_context TEXT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    session_id UUID,  -- One play session (GameSession) of the campaign
+    turn_number INTEGER,  -- Order of the event within its session
+    context_delta TEXT,  -- Session context appended since the previous event in the session
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    -- Full-text search over what happened (search_events); kept up to date by Postgres
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        to_tsvector('english', coalesce(description, '') || ' ' ||
+                               coalesce(player_actions, '') || ' ' || coalesce(consequences, ''))
+    ) STORED,
+    PRIMARY KEY (event_id, created_at)  -- must include the partition key
+) PARTITION BY RANGE (created_at);
+
+-- Catches rows with no monthly partition yet; create_event_partition() moves
+-- them out when their month's partition is created
+CREATE TABLE events_default PARTITION OF events DEFAULT;
+
+-- Creates the monthly partition starting at month_start if it doesn't exist
+CREATE FUNCTION create_event_partition(month_start date) RETURNS text AS $$
+DECLARE
+    partition_name text := 'events_' || to_char(month_start, 'YYYY_MM');
+    month_end date := (month_start + interval '1 month')::date;
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN NULL;
+    END IF;
+    EXECUTE format('CREATE TABLE %I (LIKE events INCLUDING DEFAULTS INCLUDING GENERATED)', partition_name);
+    -- search_vector is generated, so every other column is copied by name
+    EXECUTE format(
+        'WITH moved AS (DELETE FROM events_default WHERE created_at >= %L AND created_at < %L RETURNING *)
+         INSERT INTO %I (event_id, campaign_id, event_type, description, location_id, npcs_involved,
+                         characters_involved, player_actions, consequences, session_id,
+                         turn_number, context_delta, created_at)
+         SELECT event_id, campaign_id, event_type, description, location_id, npcs_involved,
+                characters_involved, player_actions, consequences, session_id,
+                turn_number, context_delta, created_at
+         FROM moved', month_start, month_end, partition_name);
+    EXECUTE format('ALTER TABLE events ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                   partition_name, month_start, month_end);
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT create_event_partition((date_trunc('month', CURRENT_DATE) + make_interval(months => m))::date)
+FROM generate_series(0, 2) m;
+
+-- 7b. EVENTS ARCHIVE - Cold events, still read by context rebuilds
+-- Campaign retention moves overflow rows here, and monthly partitions detached
+-- from events are re-parented under it (ALTER TABLE ... INHERIT), so archiving
+-- a month never rewrites its rows
+CREATE TABLE events_archive (LIKE events INCLUDING DEFAULTS INCLUDING GENERATED);
 
 -- 8. RELATIONSHIPS - Character-NPC relationships (isolated by campaign_id)
 CREATE TABLE relationships (
@@ -127,36 +182,270 @@ CREATE TABLE relationships (
     npc_id UUID REFERENCES npcs(npc_id) ON DELETE CASCADE,
     relationship_type TEXT DEFAULT 'neutral',  -- ally, enemy, neutral, romantic
     relationship_score INTEGER DEFAULT 0,  -- -100 to +100
-    history TEXT,
     last_interaction TEXT,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     UNIQUE(character_id, npc_id)  -- One relationship per character-npc pair
 );
 
+-- 9. RELATIONSHIP INTERACTIONS - Append-only history, one row per interaction
+CREATE TABLE relationship_interactions (
+    interaction_id BIGSERIAL PRIMARY KEY,
+    relationship_id UUID REFERENCES relationships(relationship_id) ON DELETE CASCADE,
+    score_change INTEGER DEFAULT 0,
+    description TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- CREATE PERFORMANCE INDEXES
+-- Each index matches the WHERE + ORDER BY of a query in db/postgres_backend.py. Composite
+-- indexes lead with campaign_id where the query does, so they also serve
+-- campaign isolation and ON DELETE CASCADE. tests/db_query_plans_test.py
+-- checks that the query plans keep using them.
 
--- Campaign-based queries (most important - this is how isolation works!)
-CREATE INDEX idx_characters_campaign ON characters(campaign_id);
-CREATE INDEX idx_npcs_campaign ON npcs(campaign_id);
-CREATE INDEX idx_events_campaign ON events(campaign_id);
-CREATE INDEX idx_locations_campaign ON locations(campaign_id);
-CREATE INDEX idx_relationships_campaign ON relationships(campaign_id);
+-- Campaigns: list_campaigns(user_id) walks a user's memberships,
+-- list_campaigns() reads active campaigns newest first. The trailing ids are the
+-- tiebreakers page_campaigns() / page_events() / page_npc_relationships()
+-- seek past, so each page starts with an index seek
+CREATE INDEX idx_campaign_members_user ON campaign_members(user_id, campaign_id) INCLUDE (role);
+CREATE INDEX idx_campaigns_active_last_played ON campaigns(last_played DESC, campaign_id DESC) WHERE is_active;
+CREATE INDEX idx_campaigns_creator ON campaigns(created_by);
+
+-- Campaigns: apply_event_retention() visits only campaigns with a retention limit
+CREATE INDEX idx_campaigns_event_retention ON campaigns(campaign_id) WHERE event_retention IS NOT NULL;
 
--- User-based queries (for future multiplayer)
+-- Characters: get_character_in_campaign uses UNIQUE(campaign_id, user_id)
 CREATE INDEX idx_characters_user ON characters(user_id);
-CREATE INDEX idx_campaigns_creator ON campaigns(created_by);
-CREATE INDEX idx_campaign_members_user ON campaign_members(user_id);
 
--- Location-based queries
-CREATE INDEX idx_npcs_location ON npcs(current_location_id);
+-- NPCs: get_npcs_at_location resolves the location through
+-- UNIQUE(campaign_id, name) on locations, then reads NPCs here in last_seen order
+CREATE INDEX idx_npcs_location_status ON npcs(current_location_id, status, last_seen DESC);
+
+-- Events: get_recent_events (newest N in a campaign) and context rebuilds.
+-- Created on the partitioned table, so every partition gets its own copy
+CREATE INDEX idx_events_campaign_created ON events(campaign_id, created_at DESC, event_id DESC);
+CREATE INDEX idx_events_session_turn ON events(session_id, turn_number);
+CREATE INDEX idx_events_archive_campaign_created ON events_archive(campaign_id, created_at DESC, event_id DESC);
+CREATE INDEX idx_events_archive_session_turn ON events_archive(session_id, turn_number);
+
+-- Events: search_events() ranks the matches of a text query. Detached months
+-- keep their copy of the partitioned index when they move to the archive
+CREATE INDEX idx_events_search ON events USING GIN (search_vector);
+CREATE INDEX idx_events_archive_search ON events_archive USING GIN (search_vector);
+
+-- Relationships: get_npc_relationships (newest first) and its history lookups
+CREATE INDEX idx_relationships_character_updated
+    ON relationships(campaign_id, character_id, updated_at DESC, relationship_id DESC);
+CREATE INDEX idx_relationships_npc ON relationships(npc_id);
+CREATE INDEX idx_relationship_interactions_recent
+    ON relationship_interactions(relationship_id, created_at, interaction_id);
+"""
+
+# Column defaults for the SQLite schema: a random version-4 UUID as text, and a
+# millisecond timestamp (CURRENT_TIMESTAMP only has whole seconds in SQLite)
+_SQLITE_UUID = (
+    "(lower(hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-4' || "
+    "substr(hex(randomblob(2)), 2) || '-' || substr('89ab', 1 + (abs(random()) % 4), 1) || "
+    "substr(hex(randomblob(2)), 2) || '-' || hex(randomblob(6))))"
+)
+_SQLITE_NOW = "(strftime('%Y-%m-%d %H:%M:%f', 'now'))"
+
+# Same tables as SCHEMA_SQL for the embedded backend (db/sqlite_backend.py).
+# UUIDs are stored as text, JSONB becomes JSON text and TIMESTAMP columns are
+# parsed back into datetimes, so rows come back in the same shapes as Postgres.
+SQLITE_SCHEMA_SQL = f"""
+DROP TABLE IF EXISTS relationship_interactions;
+DROP TABLE IF EXISTS relationships;
+DROP TABLE IF EXISTS events_archive_search;
+DROP TABLE IF EXISTS events_search;
+DROP TABLE IF EXISTS events_archive;
+DROP TABLE IF EXISTS events;
+DROP TABLE IF EXISTS characters;
+DROP TABLE IF EXISTS npcs;
+DROP TABLE IF EXISTS locations;
+DROP TABLE IF EXISTS campaign_members;
+DROP TABLE IF EXISTS campaigns;
+DROP TABLE IF EXISTS users;
+
+CREATE TABLE users (
+    user_id TEXT PRIMARY KEY DEFAULT {_SQLITE_UUID},
+    username TEXT UNIQUE NOT NULL,
+    email TEXT UNIQUE,
+    created_at TIMESTAMP DEFAULT {_SQLITE_NOW},
+    last_login TIMESTAMP DEFAULT {_SQLITE_NOW}
+);
+
+CREATE TABLE campaigns (
+    campaign_id TEXT PRIMARY KEY DEFAULT {_SQLITE_UUID},
+    name TEXT NOT NULL,
+    description TEXT,
+    created_by TEXT REFERENCES users(user_id) ON DELETE CASCADE,
+    created_at TIMESTAMP DEFAULT {_SQLITE_NOW},
+    last_played TIMESTAMP DEFAULT {_SQLITE_NOW},
+    is_active BOOLEAN DEFAULT 1,
+    event_retention INTEGER
+);
+
+CREATE TABLE campaign_members (
+    campaign_id TEXT REFERENCES campaigns(campaign_id) ON DELETE CASCADE,
+    user_id TEXT REFERENCES users(user_id) ON DELETE CASCADE,
+    role TEXT DEFAULT 'player',
+    joined_at TIMESTAMP DEFAULT {_SQLITE_NOW},
+    PRIMARY KEY (campaign_id, user_id)
+);
+
+CREATE TABLE characters (
+    character_id TEXT PRIMARY KEY DEFAULT {_SQLITE_UUID},
+    campaign_id TEXT REFERENCES campaigns(campaign_id) ON DELETE CASCADE,
+    user_id TEXT REFERENCES users(user_id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    class TEXT,
+    level INTEGER DEFAULT 1,
+    hp INTEGER DEFAULT 30,
+    max_hp INTEGER DEFAULT 30,
+    ac INTEGER DEFAULT 10,
+    strength INTEGER DEFAULT 10,
+    dexterity INTEGER DEFAULT 10,
+    constitution INTEGER DEFAULT 10,
+    intelligence INTEGER DEFAULT 10,
+    wisdom INTEGER DEFAULT 10,
+    charisma INTEGER DEFAULT 10,
+    experience INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT {_SQLITE_NOW},
+    UNIQUE(campaign_id, user_id)
+);
+
+CREATE TABLE locations (
+    location_id TEXT PRIMARY KEY DEFAULT {_SQLITE_UUID},
+    campaign_id TEXT REFERENCES campaigns(campaign_id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    description TEXT,
+    connections JSON,
+    notable_features TEXT,
+    created_at TIMESTAMP DEFAULT {_SQLITE_NOW},
+    UNIQUE(campaign_id, name)
+);
+
+CREATE TABLE npcs (
+    npc_id TEXT PRIMARY KEY DEFAULT {_SQLITE_UUID},
+    campaign_id TEXT REFERENCES campaigns(campaign_id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    class TEXT,
+    level INTEGER DEFAULT 1,
+    hp INTEGER DEFAULT 10,
+    max_hp INTEGER DEFAULT 10,
+    ac INTEGER DEFAULT 10,
+    strength INTEGER DEFAULT 10,
+    dexterity INTEGER DEFAULT 10,
+    constitution INTEGER DEFAULT 10,
+    intelligence INTEGER DEFAULT 10,
+    wisdom INTEGER DEFAULT 10,
+    charisma INTEGER DEFAULT 10,
+    current_location_id TEXT REFERENCES locations(location_id),
+    status TEXT DEFAULT 'alive',
+    disposition TEXT DEFAULT 'neutral',
+    backstory TEXT,
+    created_at TIMESTAMP DEFAULT {_SQLITE_NOW},
+    last_seen TIMESTAMP DEFAULT {_SQLITE_NOW},
+    UNIQUE(campaign_id, name)
+);
+
+CREATE TABLE events (
+    event_id TEXT PRIMARY KEY DEFAULT {_SQLITE_UUID},
+    campaign_id TEXT REFERENCES campaigns(campaign_id) ON DELETE CASCADE,
+    event_type TEXT,
+    description TEXT NOT NULL,
+    location_id TEXT REFERENCES locations(location_id),
+    npcs_involved JSON,
+    characters_involved JSON,
+    player_actions TEXT,
+    consequences TEXT,
+    session_id TEXT,
+    turn_number INTEGER,
+    context_delta TEXT,
+    created_at TIMESTAMP DEFAULT {_SQLITE_NOW}
+);
+
+-- SQLite has no partitioning: archive_old_events() and retention move rows here
+CREATE TABLE events_archive (
+    event_id TEXT PRIMARY KEY,
+    campaign_id TEXT REFERENCES campaigns(campaign_id) ON DELETE CASCADE,
+    event_type TEXT,
+    description TEXT NOT NULL,
+    location_id TEXT REFERENCES locations(location_id),
+    npcs_involved JSON,
+    characters_involved JSON,
+    player_actions TEXT,
+    consequences TEXT,
+    session_id TEXT,
+    turn_number INTEGER,
+    context_delta TEXT,
+    created_at TIMESTAMP
+);
+
+-- Full-text search for search_events() (Postgres uses the generated
+-- search_vector column): FTS5 indexes over each table's event text, kept in
+-- step by triggers as events are written and archived
+CREATE VIRTUAL TABLE events_search USING fts5(
+    description, player_actions, consequences,
+    content='events', content_rowid='rowid', tokenize='porter'
+);
+CREATE TRIGGER events_search_insert AFTER INSERT ON events BEGIN
+    INSERT INTO events_search(rowid, description, player_actions, consequences)
+    VALUES (new.rowid, new.description, new.player_actions, new.consequences);
+END;
+CREATE TRIGGER events_search_delete AFTER DELETE ON events BEGIN
+    INSERT INTO events_search(events_search, rowid, description, player_actions, consequences)
+    VALUES ('delete', old.rowid, old.description, old.player_actions, old.consequences);
+END;
+
+CREATE VIRTUAL TABLE events_archive_search USING fts5(
+    description, player_actions, consequences,
+    content='events_archive', content_rowid='rowid', tokenize='porter'
+);
+CREATE TRIGGER events_archive_search_insert AFTER INSERT ON events_archive BEGIN
+    INSERT INTO events_archive_search(rowid, description, player_actions, consequences)
+    VALUES (new.rowid, new.description, new.player_actions, new.consequences);
+END;
+CREATE TRIGGER events_archive_search_delete AFTER DELETE ON events_archive BEGIN
+    INSERT INTO events_archive_search(events_archive_search, rowid, description, player_actions, consequences)
+    VALUES ('delete', old.rowid, old.description, old.player_actions, old.consequences);
+END;
+
+CREATE TABLE relationships (
+    relationship_id TEXT PRIMARY KEY DEFAULT {_SQLITE_UUID},
+    campaign_id TEXT REFERENCES campaigns(campaign_id) ON DELETE CASCADE,
+    character_id TEXT REFERENCES characters(character_id) ON DELETE CASCADE,
+    npc_id TEXT REFERENCES npcs(npc_id) ON DELETE CASCADE,
+    relationship_type TEXT DEFAULT 'neutral',
+    relationship_score INTEGER DEFAULT 0,
+    last_interaction TEXT,
+    updated_at TIMESTAMP DEFAULT {_SQLITE_NOW},
+    UNIQUE(character_id, npc_id)
+);
 
--- Time-based queries for recent events
-CREATE INDEX idx_events_created ON events(created_at);
-CREATE INDEX idx_relationships_updated ON relationships(updated_at);
+CREATE TABLE relationship_interactions (
+    interaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    relationship_id TEXT REFERENCES relationships(relationship_id) ON DELETE CASCADE,
+    score_change INTEGER DEFAULT 0,
+    description TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT {_SQLITE_NOW}
+);
 
--- Status queries
-CREATE INDEX idx_npcs_status ON npcs(status);
-CREATE INDEX idx_campaigns_active ON campaigns(is_active);
+-- Same indexes as SCHEMA_SQL (SQLite has no INCLUDE columns)
+CREATE INDEX idx_campaign_members_user ON campaign_members(user_id, campaign_id, role);
+CREATE INDEX idx_campaigns_active_last_played ON campaigns(last_played DESC) WHERE is_active;
+CREATE INDEX idx_campaigns_creator ON campaigns(created_by);
+CREATE INDEX idx_characters_user ON characters(user_id);
+CREATE INDEX idx_npcs_location_status ON npcs(current_location_id, status, last_seen DESC);
+CREATE INDEX idx_events_campaign_created ON events(campaign_id, created_at DESC);
+CREATE INDEX idx_events_session_turn ON events(session_id, turn_number);
+CREATE INDEX idx_events_archive_campaign_created ON events_archive(campaign_id, created_at DESC);
+CREATE INDEX idx_events_archive_session_turn ON events_archive(session_id, turn_number);
+CREATE INDEX idx_relationships_character_updated
+    ON relationships(campaign_id, character_id, updated_at DESC);
+CREATE INDEX idx_relationships_npc ON relationships(npc_id);
+CREATE INDEX idx_relationship_interactions_recent
+    ON relationship_interactions(relationship_id, created_at, interaction_id);
 """
 
 import os
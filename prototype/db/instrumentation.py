@@ -0,0 +1,284 @@
+"""
+Timing and counters for the db layer
+
+Shows which db functions and SQL statements a turn spends its time in. When
+on, every public function of db/db.py records its calls, errors, latency
+histogram, rows returned and time spent waiting for a connection, and every
+statement sent through a backend cursor records the same under its
+normalized SQL:
+
+    from db import instrumentation
+    instrumentation.enable()
+    ...play a few turns...
+    print(instrumentation.dump_json())
+
+Configured through the environment (see .env.example):
+
+    DB_INSTRUMENTATION        on / off (default off)
+    DB_INSTRUMENTATION_DUMP   write the JSON here at exit
+
+Off, each instrumented call costs one flag check, so the wrappers stay
+installed and instrumentation can be switched on in a running process.
+"""
+
+import atexit
+import bisect
+import functools
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+
+from psycopg2 import extensions
+
+_enabled = os.getenv("DB_INSTRUMENTATION", "off").lower() in ("1", "on", "true", "yes")
+
+# Upper bounds (ms) of the latency histogram buckets; the last one catches the rest
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float("inf"))
+
+# Context managers and pool helpers aren't data functions
+_NOT_INSTRUMENTED = {"db_connection", "transaction", "pool_stats", "close_pool", "cache_stats"}
+
+class _Metric:
+    __slots__ = ("calls", "errors", "total", "max", "rows", "acquire", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.acquire = 0.0
+        self.buckets = [0] * len(BUCKETS_MS)
+
+    def add(self, seconds, rows, error):
+        ms = seconds * 1000
+        self.calls += 1
+        self.errors += error
+        self.total += ms
+        self.max = max(self.max, ms)
+        self.rows += rows
+        self.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+
+    def _percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of calls"""
+        target = fraction * self.calls
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.buckets):
+            seen += count
+            if count and seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self, with_acquire):
+        result = {
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_ms": round(self.total, 3),
+            "mean_ms": round(self.total / self.calls, 3) if self.calls else 0.0,
+            "p50_ms": round(self._percentile(0.5), 3),
+            "p95_ms": round(self._percentile(0.95), 3),
+            "max_ms": round(self.max, 3),
+            "rows": self.rows,
+            "histogram": {f"<={bound}ms" if bound != float("inf") else "slower": count
+                          for bound, count in zip(BUCKETS_MS, self.buckets) if count},
+        }
+        if with_acquire:
+            result["connection_acquire_ms"] = round(self.acquire * 1000, 3)
+        return result
+
+_lock = threading.Lock()
+_functions = {}
+_statements = {}
+_acquire = {"count": 0, "total": 0.0, "max": 0.0}
+
+# Instrumented db function currently running, for attributing connection waits
+_current_function = ContextVar("db_instrumented_function", default=None)
+
+def enable():
+    global _enabled
+    _enabled = True
+
+def disable():
+    global _enabled
+    _enabled = False
+
+def enabled():
+    return _enabled
+
+def reset():
+    """Forget everything recorded so far"""
+    with _lock:
+        _functions.clear()
+        _statements.clear()
+        _acquire.update(count=0, total=0.0, max=0.0)
+
+def _metric(table, key):
+    metric = table.get(key)
+    if metric is None:
+        metric = table[key] = _Metric()
+    return metric
+
+def _result_rows(result):
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, tuple) and result and isinstance(result[0], list):
+        return len(result[0])  # (page, cursor) from the page_* functions
+    return 0 if result is None else 1
+
+# =============================================================================
+# FUNCTIONS
+# =============================================================================
+
+def instrument(func):
+    """Record calls, latency, rows and connection waits for a db function"""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+
+        token = _current_function.set(name)
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            with _lock:
+                _metric(_functions, name).add(time.perf_counter() - started, 0, True)
+            raise
+        finally:
+            _current_function.reset(token)
+        with _lock:
+            _metric(_functions, name).add(time.perf_counter() - started, _result_rows(result), False)
+        return result
+
+    return wrapper
+
+def instrument_module(namespace, names):
+    """Wrap each public data function `names` lists in `namespace` (a module's globals())"""
+    for name in names:
+        if name not in _NOT_INSTRUMENTED and callable(namespace.get(name)):
+            namespace[name] = instrument(namespace[name])
+
+def record_connection_acquire(seconds):
+    """Time spent getting a connection, charged to the running db function"""
+    if not _enabled:
+        return
+    with _lock:
+        _acquire["count"] += 1
+        _acquire["total"] += seconds
+        _acquire["max"] = max(_acquire["max"], seconds)
+        name = _current_function.get()
+        if name is not None:
+            _metric(_functions, name).acquire += seconds
+
+# =============================================================================
+# STATEMENTS
+# =============================================================================
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_VALUES_LIST = re.compile(r"VALUES\s*\(.*?\)(?=\s*(?:ON CONFLICT|RETURNING|;|$))", re.S | re.I)
+
+@functools.lru_cache(maxsize=1024)
+def normalize_sql(query):
+    """
+    Statement key: whitespace collapsed, inline literals replaced with ? and
+    multi-row VALUES lists folded, so every batch size shares one entry
+    """
+    if isinstance(query, bytes):
+        query = query.decode(errors="replace")
+    query = _VALUES_LIST.sub("VALUES (...)", _LITERALS.sub("?", str(query)))
+    return " ".join(query.split())
+
+def _record_statement(query, seconds, rows, error):
+    key = normalize_sql(query)
+    with _lock:
+        _metric(_statements, key).add(seconds, max(rows, 0), error)
+
+def _timed(execute, query, rowcount):
+    started = time.perf_counter()
+    try:
+        result = execute()
+    except Exception:
+        _record_statement(query, time.perf_counter() - started, 0, True)
+        raise
+    _record_statement(query, time.perf_counter() - started, rowcount(), False)
+    return result
+
+class InstrumentedCursor(extensions.cursor):
+    """psycopg2 cursor that times each statement (the Postgres pool's cursor_factory)"""
+
+    def execute(self, query, vars=None):
+        if not _enabled:
+            return super().execute(query, vars)
+        return _timed(lambda: super(InstrumentedCursor, self).execute(query, vars), query, lambda: self.rowcount)
+
+    def executemany(self, query, vars_list):
+        if not _enabled:
+            return super().executemany(query, vars_list)
+        return _timed(lambda: super(InstrumentedCursor, self).executemany(query, vars_list), query,
+                      lambda: self.rowcount)
+
+class InstrumentedSqliteCursor(sqlite3.Cursor):
+    """sqlite3 cursor that times each statement"""
+
+    def execute(self, sql, parameters=()):
+        if not _enabled:
+            return super().execute(sql, parameters)
+        # SQLite reports no rowcount for SELECTs; rows are counted per function instead
+        return _timed(lambda: super(InstrumentedSqliteCursor, self).execute(sql, parameters), sql,
+                      lambda: self.rowcount)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not _enabled:
+            return super().executemany(sql, seq_of_parameters)
+        return _timed(lambda: super(InstrumentedSqliteCursor, self).executemany(sql, seq_of_parameters), sql,
+                      lambda: self.rowcount)
+
+class InstrumentedSqliteConnection(sqlite3.Connection):
+    """sqlite3 connection whose cursors (including conn.execute's) are instrumented"""
+
+    def cursor(self, factory=InstrumentedSqliteCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+# =============================================================================
+# REPORTING
+# =============================================================================
+
+def stats():
+    """Everything recorded so far; functions and statements slowest (by total time) first"""
+    with _lock:
+        functions = sorted(_functions.items(), key=lambda item: item[1].total, reverse=True)
+        statements = sorted(_statements.items(), key=lambda item: item[1].total, reverse=True)
+        return {
+            "enabled": _enabled,
+            "functions": {name: metric.to_dict(True) for name, metric in functions},
+            "statements": {query: metric.to_dict(False) for query, metric in statements},
+            "connection_acquire": {
+                "count": _acquire["count"],
+                "total_ms": round(_acquire["total"] * 1000, 3),
+                "max_ms": round(_acquire["max"] * 1000, 3),
+            },
+        }
+
+def dump_json(path=None, indent=2):
+    """stats() as JSON; also written to `path` when given"""
+    text = json.dumps(stats(), indent=indent)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+    return text
+
+_dump_path = os.getenv("DB_INSTRUMENTATION_DUMP")
+if _dump_path:
+    atexit.register(lambda: _enabled and dump_json(_dump_path))
@@ -0,0 +1,255 @@
+"""
+Write-behind journal for per-turn story writes
+
+A turn's event and relationship changes don't have to be in the database
+before the player sees the narration. With the journal on, GameSession hands
+them to a bounded in-process queue and returns; a background worker writes
+them in batches (one transaction, one multi-row event insert per batch):
+
+    journal = get_event_journal()       # None when EVENT_JOURNAL=off
+    journal.save_event(campaign_id, "interaction", text, ...)
+    journal.update_npc_relationships(campaign_id, character_id, changes)
+    journal.flush()                     # everything queued so far is written
+
+A batch is written once `batch_size` writes are waiting (flush-on-size), once
+the oldest waiting write is `flush_interval` seconds old (flush-on-interval),
+on flush() and at interpreter exit. When the queue is full, callers block
+until the worker catches up (back-pressure) instead of growing memory.
+
+Durability (EVENT_JOURNAL):
+
+    off     no journal; writes go straight to the database (default)
+    async   callers return once the write is queued; a crash can lose the
+            last flush_interval seconds of writes
+    sync    callers wait until their write has committed, but concurrent
+            writers still share batches (group commit)
+
+Events keep the time they were queued: each is inserted with how long it
+waited, and the database backdates created_at by that much.
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+
+from db import db
+
+_FLUSH = "flush"
+
+class JournalError(Exception):
+    """A sync-durability write (or flush) whose batch failed to commit"""
+
+class _Entry:
+    __slots__ = ("kind", "payload", "queued_at", "done", "error")
+
+    def __init__(self, kind, payload, wait):
+        self.kind = kind
+        self.payload = payload
+        self.queued_at = time.monotonic()
+        self.done = threading.Event() if wait else None
+        self.error = None
+
+class EventJournal:
+    """Bounded write-behind queue for events and relationship updates, drained by one worker thread"""
+
+    def __init__(self, durability="async", max_queue=1000, batch_size=100,
+                 flush_interval=0.5, max_retries=3):
+        if durability not in ("async", "sync"):
+            raise ValueError(f"Unknown journal durability: {durability!r} (use async or sync)")
+        if max_queue < 1 or batch_size < 1:
+            raise ValueError(f"Invalid journal size: max_queue={max_queue} batch_size={batch_size}")
+
+        self.durability = durability
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._lock = threading.Lock()
+        self._stats = {
+            "queued": 0,
+            "events_written": 0,
+            "relationship_updates_written": 0,
+            "batches": 0,
+            "batch_failures": 0,
+            "dropped": 0,
+            "blocked_puts": 0,
+            "peak_queue_depth": 0,
+        }
+
+        self._worker = threading.Thread(target=self._run, name="event-journal", daemon=True)
+        self._worker.start()
+
+    # -------------------------------------------------------------------------
+    # Producer side
+    # -------------------------------------------------------------------------
+
+    def save_event(self, campaign_id, event_type, description, location_name=None,
+                   npcs_involved=None, character_ids=None, player_actions=None,
+                   consequences=None, session_id=None, turn_number=None, context_delta=None):
+        """Queue a db.save_event() call"""
+        self._put("event", {
+            "campaign_id": campaign_id, "event_type": event_type, "description": description,
+            "location_name": location_name, "npcs_involved": npcs_involved,
+            "character_ids": character_ids, "player_actions": player_actions,
+            "consequences": consequences, "session_id": session_id,
+            "turn_number": turn_number, "context_delta": context_delta,
+        })
+
+    def update_npc_relationships(self, campaign_id, character_id, changes):
+        """Queue a db.update_npc_relationships() call"""
+        self._put("relationships", (campaign_id, character_id, list(changes)))
+
+    def flush(self, timeout=None):
+        """
+        Block until every write queued before this call has been committed (or
+        given up on after retries). Raises JournalError on timeout, or if writes
+        batched with the flush failed.
+        """
+        entry = self._put(_FLUSH, None, wait=True, timeout=timeout)
+        if entry is None:
+            raise JournalError("Timed out waiting for the event journal to flush")
+
+    def close(self, timeout=10.0):
+        """Flush what's queued and stop the worker (registered to run at exit)"""
+        if self._closed:
+            return
+        try:
+            self.flush(timeout)
+        except JournalError as e:
+            print(f"❌ Event journal: {e}")
+        finally:
+            self._closed = True
+            self._queue.put(None)
+            self._worker.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "queue_depth": self._queue.qsize(), "durability": self.durability}
+
+    def _put(self, kind, payload, wait=None, timeout=None):
+        if self._closed:
+            raise JournalError("Event journal is closed")
+        if wait is None:
+            wait = self.durability == "sync"
+
+        entry = _Entry(kind, payload, wait)
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            # Back-pressure: the caller waits for the worker rather than queueing without bound
+            with self._lock:
+                self._stats["blocked_puts"] += 1
+            self._queue.put(entry)
+
+        with self._lock:
+            if kind != _FLUSH:
+                self._stats["queued"] += 1
+            self._stats["peak_queue_depth"] = max(self._stats["peak_queue_depth"], self._queue.qsize())
+
+        if entry.done is None:
+            return entry
+        if not entry.done.wait(timeout):
+            return None
+        if entry.error is not None:
+            raise JournalError(f"Journal write failed: {entry.error}") from entry.error
+        return entry
+
+    # -------------------------------------------------------------------------
+    # Worker side
+    # -------------------------------------------------------------------------
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                return
+
+            batch = [entry]
+            deadline = entry.queued_at + self.flush_interval
+            # Gather until the batch is full, the oldest write is due or someone asks for a flush
+            while batch[-1].kind != _FLUSH and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is None:
+                    self._write(batch)
+                    return
+                batch.append(entry)
+
+            self._write(batch)
+
+    def _write(self, batch):
+        writes = [entry for entry in batch if entry.kind != _FLUSH]
+        error = self._write_with_retries(writes) if writes else None
+
+        for entry in batch:
+            if entry.done is not None:
+                entry.error = error
+                entry.done.set()
+
+    def _write_with_retries(self, writes):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._apply(writes)
+                return None
+            except Exception as e:
+                with self._lock:
+                    self._stats["batch_failures"] += 1
+                if attempt == self.max_retries:
+                    with self._lock:
+                        self._stats["dropped"] += len(writes)
+                    print(f"❌ Event journal dropped {len(writes)} writes after {attempt + 1} attempts: {e}")
+                    return e
+                time.sleep(min(0.1 * 2 ** attempt, 2.0))
+
+    def _apply(self, writes):
+        """Write a batch in one transaction, keeping queue order between kinds"""
+        now = time.monotonic()
+        with db.transaction():
+            events = []
+            for entry in writes:
+                if entry.kind == "event":
+                    events.append({**entry.payload, "seconds_ago": now - entry.queued_at})
+                    continue
+                if events:
+                    db.save_events_bulk(events)
+                    events = []
+                db.update_npc_relationships(*entry.payload)
+            db.save_events_bulk(events)
+
+        event_count = sum(1 for entry in writes if entry.kind == "event")
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["events_written"] += event_count
+            self._stats["relationship_updates_written"] += len(writes) - event_count
+
+def journal_config_from_env():
+    """Read journal settings from the environment"""
+    return {
+        "durability": os.getenv("EVENT_JOURNAL", "off").lower(),
+        "max_queue": int(os.getenv("EVENT_JOURNAL_QUEUE_SIZE", "1000")),
+        "batch_size": int(os.getenv("EVENT_JOURNAL_BATCH_SIZE", "100")),
+        "flush_interval": float(os.getenv("EVENT_JOURNAL_FLUSH_INTERVAL", "0.5")),
+    }
+
+_journal = None
+_journal_lock = threading.Lock()
+
+def get_event_journal():
+    """The process-wide journal, started on first use; None when EVENT_JOURNAL=off"""
+    global _journal
+    if _journal is None:
+        config = journal_config_from_env()
+        if config["durability"] == "off":
+            return None
+        with _journal_lock:
+            if _journal is None:
+                _journal = EventJournal(**config)
+                atexit.register(_journal.close)
+    return _journal
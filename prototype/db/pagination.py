@@ -0,0 +1,44 @@
+"""
+Keyset pagination helpers shared by the storage backends
+
+Paged queries order by a unique key (e.g. created_at DESC, event_id DESC) and
+fetch `limit + 1` rows starting strictly after the previous page's last key,
+so every page is one index range scan no matter how deep it is. The last key
+travels to the caller as an opaque cursor string:
+
+    events, cursor = page_events(campaign_id, limit=20)
+    while cursor:
+        events, cursor = page_events(campaign_id, cursor=cursor, limit=20)
+
+Cursors are only meaningful to the query (and backend) that issued them.
+"""
+
+import base64
+import json
+
+def encode_cursor(kind, *key):
+    """Opaque cursor for the page after the row with this key"""
+    payload = json.dumps([kind, *key], separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(kind, cursor):
+    """Key values stored in `cursor`; ValueError if it's malformed or for another query"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError, AttributeError):
+        raise ValueError("Invalid page cursor") from None
+    if not isinstance(payload, list) or not payload or payload[0] != kind:
+        raise ValueError(f"Page cursor is not for {kind}")
+    return payload[1:]
+
+def keyset_page(rows, limit, kind, key):
+    """
+    (page, next_cursor) from rows fetched with LIMIT limit + 1; `key(row)`
+    gives the values the next page starts after. next_cursor is None on the
+    last page.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(kind, *key(page[-1]))
@@ -0,0 +1,284 @@
+"""
+Connection pool for the Postgres database layer
+
+Every db function borrows a connection from one process-wide pool instead of
+opening a fresh TCP + auth handshake per call. Sizing and health checking are
+configured through environment variables (see .env.example).
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+
+from db import instrumentation
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out within the timeout"""
+
+
+class ConnectionPool:
+    """Thread-safe psycopg2 connection pool with idle pruning and health checks"""
+
+    def __init__(self, dsn, min_size=1, max_size=10, idle_timeout=300.0,
+                 checkout_timeout=30.0, health_check_after=30.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size} max={max_size}")
+
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check_after = health_check_after
+
+        self._cond = threading.Condition()
+        self._idle = []  # (connection, returned_at) - most recently returned last
+        self._in_use = set()
+        self._opening = 0  # slots reserved by threads currently connecting or pinging
+        self._closed = False
+
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+            "connections_opened": 0,
+            "connections_closed": 0,
+            "health_check_failures": 0,
+            "peak_in_use": 0,
+        }
+
+        for _ in range(min_size):
+            conn = self._connect()
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+
+    # -------------------------------------------------------------------------
+    # Connection lifecycle
+    # -------------------------------------------------------------------------
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn, cursor_factory=instrumentation.InstrumentedCursor)
+        with self._cond:
+            self._stats["connections_opened"] += 1
+        return conn
+
+    def _discard(self, conn):
+        self._stats["connections_closed"] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_usable(self, conn):
+        """Cheap local checks, safe to run while holding the lock"""
+        if conn.closed:
+            return False
+        return conn.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE
+
+    def _ping(self, conn):
+        """Round-trip check for long-idle connections; never called with the lock held"""
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+        except Exception:
+            return False
+        return True
+
+    def _prune_idle(self, now):
+        """Close connections idle past idle_timeout, keeping at least min_size open"""
+        keep = []
+        for conn, returned_at in self._idle:
+            total = len(keep) + len(self._in_use)
+            if now - returned_at > self.idle_timeout and total >= self.min_size:
+                self._discard(conn)
+            else:
+                keep.append((conn, returned_at))
+        self._idle = keep
+
+    def getconn(self):
+        """Check out a connection, blocking up to checkout_timeout when saturated"""
+        start = time.monotonic()
+        deadline = start + self.checkout_timeout
+        waited = False
+
+        while True:
+            conn = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolTimeout("Connection pool is closed")
+
+                    now = time.monotonic()
+                    self._prune_idle(now)
+
+                    while self._idle:
+                        conn, returned_at = self._idle.pop()
+                        if not self._is_usable(conn):
+                            self._stats["health_check_failures"] += 1
+                            self._discard(conn)
+                            conn = None
+                        elif now - returned_at < self.health_check_after:
+                            return self._checked_out(conn, start, waited)
+                        else:
+                            break  # long idle: ping it below
+
+                    if conn is not None or len(self._in_use) + self._opening < self.max_size:
+                        # Reserve the slot, then ping or connect without holding the lock
+                        self._opening += 1
+                        break
+
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"Timed out after {self.checkout_timeout}s waiting for a database "
+                            f"connection ({self.max_size} in use)"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+
+            if conn is None:
+                break
+            healthy = self._ping(conn)
+            with self._cond:
+                self._opening -= 1
+                if healthy:
+                    return self._checked_out(conn, start, waited)
+                self._stats["health_check_failures"] += 1
+                self._discard(conn)
+                self._cond.notify()
+
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._opening -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._opening -= 1
+            return self._checked_out(conn, start, waited)
+
+    def _checked_out(self, conn, start, waited):
+        wait_time = time.monotonic() - start
+        instrumentation.record_connection_acquire(wait_time)
+        self._in_use.add(conn)
+        self._stats["checkouts"] += 1
+        self._stats["wait_time_total"] += wait_time
+        self._stats["wait_time_max"] = max(self._stats["wait_time_max"], wait_time)
+        if waited:
+            self._stats["waits"] += 1
+        self._stats["peak_in_use"] = max(self._stats["peak_in_use"], len(self._in_use))
+        return conn
+
+    def putconn(self, conn, discard=False):
+        """Return a connection; broken or mid-transaction connections are dropped"""
+        with self._cond:
+            self._in_use.discard(conn)
+            if discard or self._closed or conn.closed:
+                self._discard(conn)
+            elif conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                # Caller forgot to commit/rollback - never hand that state to someone else
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for the duration of a with-block.
+
+        Commits when the block exits normally and rolls back if it raises.
+        """
+        conn = self.getconn()
+        discard = False
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+            raise
+        finally:
+            self.putconn(conn, discard=discard)
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                self._discard(conn)
+            self._idle = []
+            for conn in list(self._in_use):
+                self._discard(conn)
+            self._in_use.clear()
+            self._cond.notify_all()
+
+    # -------------------------------------------------------------------------
+    # Stats
+    # -------------------------------------------------------------------------
+
+    def stats(self):
+        """Snapshot of pool usage: checkouts, wait times and saturation"""
+        with self._cond:
+            stats = dict(self._stats)
+            in_use = len(self._in_use)
+            stats.update({
+                "in_use": in_use,
+                "idle": len(self._idle),
+                "size": in_use + len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "saturation": in_use / self.max_size,
+                "wait_time_avg": (stats["wait_time_total"] / stats["checkouts"]
+                                  if stats["checkouts"] else 0.0),
+            })
+        return stats
+
+
+# =============================================================================
+# PROCESS-WIDE POOL
+# =============================================================================
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool_config_from_env():
+    """Read pool settings from the environment"""
+    return {
+        "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+        "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+        "idle_timeout": float(os.getenv("DB_POOL_IDLE_TIMEOUT", "300")),
+        "checkout_timeout": float(os.getenv("DB_POOL_CHECKOUT_TIMEOUT", "30")),
+        "health_check_after": float(os.getenv("DB_POOL_HEALTH_CHECK_AFTER", "30")),
+    }
+
+
+def get_pool(dsn=None):
+    """Return the shared pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(dsn or os.getenv("DATABASE_URL"), **pool_config_from_env())
+    return _pool
+
+
+def close_pool():
+    """Close every pooled connection (tests, shutdown)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
@@ -0,0 +1,141 @@
+"""
+Typed row records returned by the db layer
+
+Each record is a slotted dataclass built straight from a query row (fields are
+declared in SELECT column order), so reading hundreds of NPCs or events costs
+one small fixed-size object per row instead of a freshly keyed dict.
+
+Dict-style access keeps older call sites working while they move to attributes:
+
+    npc.hp == npc["hp"] == npc.get("hp")
+    character.char_class == character["class"]   # "class" is a Python keyword
+"""
+
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Any, Optional
+
+class _DictAccess:
+    """Read/write records with record["key"] during the move to attributes"""
+
+    __slots__ = ()
+
+    # dict key -> attribute name, where the key isn't a valid identifier
+    _KEY_ALIASES = {"class": "char_class"}
+    _ATTR_KEYS = {"char_class": "class"}
+
+    @classmethod
+    def from_row(cls, row):
+        """Build a record from a row whose columns follow the field order"""
+        return cls(*row)
+
+    def _attr(self, key):
+        attr = self._KEY_ALIASES.get(key, key)
+        if not isinstance(attr, str) or attr not in self.__dataclass_fields__:
+            raise KeyError(key)
+        return attr
+
+    def __getitem__(self, key):
+        return getattr(self, self._attr(key))
+
+    def __setitem__(self, key, value):
+        setattr(self, self._attr(key), value)
+
+    def __contains__(self, key):
+        return self._KEY_ALIASES.get(key, key) in self.__dataclass_fields__
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return [self._ATTR_KEYS.get(field.name, field.name) for field in fields(self)]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def to_dict(self):
+        return dict(self.items())
+
+@dataclass(slots=True)
+class Character(_DictAccess):
+    character_id: str
+    name: str
+    char_class: Optional[str]
+    level: int
+    hp: int
+    max_hp: int
+    ac: int
+    strength: int
+    dexterity: int
+    constitution: int
+    intelligence: int
+    wisdom: int
+    charisma: int
+    experience: int
+
+@dataclass(slots=True)
+class Npc(_DictAccess):
+    npc_id: str
+    name: str
+    char_class: Optional[str]
+    hp: int
+    max_hp: int
+    ac: int
+    strength: int
+    dexterity: int
+    constitution: int
+    intelligence: int
+    wisdom: int
+    charisma: int
+    level: int
+    current_location: Optional[str]
+    status: str
+    disposition: str
+    backstory: Optional[str]
+    last_seen: Optional[datetime]
+
+@dataclass(slots=True)
+class Event(_DictAccess):
+    event_type: Optional[str]
+    description: str
+    location: Optional[str]
+    npcs_involved: Any
+    player_actions: Optional[str]
+    consequences: Optional[str]
+    created_at: Optional[datetime]
+
+@dataclass(slots=True)
+class Relationship(_DictAccess):
+    relationship_id: str
+    npc_id: str
+    npc_name: str
+    relationship_type: str
+    relationship_score: int
+    history: list
+    last_interaction: Optional[str]
+    updated_at: Optional[datetime]
+
+@dataclass(slots=True)
+class Campaign(_DictAccess):
+    campaign_id: str
+    name: str
+    description: Optional[str]
+    created_at: Optional[datetime]
+    last_played: Optional[datetime]
+    creator: str
+    role: Optional[str] = None  # only when listed for a user
+
+    # list_campaigns() used to return tuples; keep campaign[0] and unpacking working
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return getattr(self, fields(self)[key].name)
+        return _DictAccess.__getitem__(self, key)
+
+    def __iter__(self):
+        return (getattr(self, field.name) for field in fields(self))
+
+    def __len__(self):
+        return len(fields(self))
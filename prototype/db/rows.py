@@ -0,0 +1,116 @@
+"""
+Row mapping and parameter helpers shared by the storage backends
+
+Every backend selects the same columns in the same order, so they all build
+their return values here (and from db/records.py) and callers get identical
+shapes whichever backend DATABASE_URL picks.
+"""
+
+import re
+
+def user_from_row(result):
+    """users row -> user dict"""
+    return {
+        "user_id": result[0],
+        "username": result[1],
+        "email": result[2],
+        "created_at": result[3],
+        "last_login": result[4]
+    }
+
+def character_stats_params(character_id, stats):
+    """UPDATE characters parameters, in column order"""
+    return (
+        stats["strength"], stats["dexterity"], stats["constitution"],
+        stats["intelligence"], stats["wisdom"], stats["charisma"],
+        stats["level"], stats["experience"], stats["hp"], stats["max_hp"], stats["ac"],
+        character_id
+    )
+
+def npc_params(campaign_id, npc_data, location_id):
+    """Column values for one NPC, in the backends' NPC upsert column order"""
+    return (
+        campaign_id, npc_data["name"], npc_data["class"],
+        npc_data["hp"], npc_data.get("max_hp", npc_data["hp"]), npc_data["ac"],
+        npc_data["strength"], npc_data["dexterity"], npc_data["constitution"],
+        npc_data["intelligence"], npc_data["wisdom"], npc_data["charisma"],
+        npc_data["level"], location_id, npc_data.get("status", "alive"),
+        npc_data.get("disposition", "neutral"), npc_data.get("backstory", "")
+    )
+
+def unique_npcs(npcs):
+    """
+    ON CONFLICT can't touch the same row twice in one statement, so the last
+    entry for a repeated name wins (same as saving them one by one)
+    """
+    return {npc_data["name"]: npc_data for npc_data in npcs}
+
+def relationship_change_rows(campaign_id, character_id, changes):
+    """(campaign_id, character_id, npc_name, change, description) rows for the relationship upsert"""
+    # A single upsert can't touch the same row twice, so fold repeated NPCs together
+    merged = {}
+    for npc_name, relationship_change, interaction_description in changes:
+        if npc_name in merged:
+            previous_change, previous_description = merged[npc_name]
+            merged[npc_name] = (previous_change + relationship_change,
+                                f"{previous_description}\n{interaction_description}")
+        else:
+            merged[npc_name] = (relationship_change, interaction_description)
+
+    return [(str(campaign_id), str(character_id), npc_name, relationship_change, interaction_description)
+            for npc_name, (relationship_change, interaction_description) in merged.items()]
+
+def event_params(event, location_id):
+    """
+    Column values for one save_events_bulk() event, in the bulk insert's
+    column order; the last one is how many seconds ago the event happened
+    """
+    return (
+        event["campaign_id"], event["event_type"], event["description"], location_id,
+        event.get("npcs_involved"), event.get("character_ids"), event.get("player_actions"),
+        event.get("consequences"), event.get("session_id"), event.get("turn_number"),
+        event.get("context_delta"), event.get("seconds_ago", 0)
+    )
+
+# Words too common to say anything about an event (Postgres' english config
+# drops these itself; SQLite's FTS5 would match nearly every event on them)
+_STOP_WORDS = frozenset("""
+    a an and are as at be but by do for from had has have he her him his i if in into is
+    it its me my no not of on or our she so that the their them then there they this to
+    up was we were what when where which who will with you your
+""".split())
+
+def search_terms(query):
+    """
+    Words of a free-text search_events() query, minus stop words. Backends
+    build their own full-text query from these, so punctuation in player text
+    can never be read as query syntax.
+    """
+    words = re.findall(r"[^\W_]+", query.lower()) if query else []
+    return [word for word in words if word not in _STOP_WORDS]
+
+def context_from_hot_row(row):
+    """
+    (complete, context) from the hot-table context query, which also returns
+    how many of the session's turns it found, the event's turn number and
+    whether the event itself is hot. Incomplete means some turns (or the event)
+    were archived and the query has to be rerun over events_archive too.
+    """
+    context, turns_found, turn_number, event_found = row
+    if not event_found:
+        return False, ""
+    if turn_number is not None and turns_found != turn_number:
+        return False, ""
+    return True, context or ""
+
+def add_months(month_start, months):
+    """First day of the month `months` after (or before) `month_start`"""
+    index = month_start.year * 12 + month_start.month - 1 + months
+    return month_start.replace(year=index // 12, month=index % 12 + 1, day=1)
+
+def interaction_from_row(row):
+    """relationship_interactions row -> interaction dict"""
+    return {
+        "interaction_id": row[0], "score_change": row[1],
+        "description": row[2], "created_at": row[3]
+    }
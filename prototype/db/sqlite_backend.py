@@ -0,0 +1,794 @@
+"""
+Embedded SQLite storage backend
+
+Implements every function in db/db.py on a local SQLite file so single-player
+play and tests need no database server. db/db.py switches to it when
+DATABASE_URL uses the sqlite scheme:
+
+    DATABASE_URL=sqlite:///agentic_dnd.sqlite3      (relative path)
+    DATABASE_URL=sqlite:////var/lib/dnd/game.db     (absolute path)
+    DATABASE_URL=sqlite:///:memory:                 (throwaway, per process)
+
+The tables are created from SQLITE_SCHEMA_SQL the first time a database file
+is opened. Return shapes match the Postgres backend: ids are UUID strings,
+timestamps are datetimes and JSON columns come back parsed.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime
+
+from db import cache, instrumentation
+from db.cache import cached, cache_stats
+from db.db_schema import SQLITE_SCHEMA_SQL
+from db.pagination import decode_cursor, keyset_page
+from db.records import Campaign, Character, Npc, Event, Relationship
+from db.rows import (
+    user_from_row, character_stats_params, npc_params, unique_npcs,
+    relationship_change_rows, interaction_from_row, add_months, event_params, search_terms,
+)
+
+__all__ = [
+    'create_user', 'get_user_by_username', 'get_or_create_user',
+    'create_campaign', 'list_campaigns', 'page_campaigns', 'get_most_recent_campaign',
+    'campaign_exists', 'update_campaign_last_played',
+    'create_character', 'get_character_in_campaign', 'update_character_stats',
+    'clear_characters_in_campaign', 'create_location', 'get_or_create_location',
+    'save_npc', 'save_npcs_bulk', 'get_npcs_at_location',
+    'save_event', 'save_events_bulk', 'get_event_context', 'get_recent_events', 'page_events',
+    'search_events',
+    'ensure_event_partitions', 'archive_old_events', 'set_event_retention', 'apply_event_retention',
+    'update_npc_relationship', 'update_npc_relationships', 'get_npc_relationships',
+    'page_npc_relationships', 'get_relationship_history',
+    'db_connection', 'transaction', 'pool_stats', 'close_pool', 'cache_stats',
+]
+
+# Embedded storage used when DATABASE_URL is not set, so single-player play
+# needs no database server
+DEFAULT_DATABASE_URL = "sqlite:///agentic_dnd.sqlite3"
+
+DB_URL = os.getenv("DATABASE_URL") or DEFAULT_DATABASE_URL
+
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("JSON", lambda value: json.loads(value))
+
+# One connection per process: SQLite serialises writers anyway, and a single
+# connection is the only way to share a :memory: database between calls
+_connection = None
+_lock = threading.RLock()
+
+# Connection owned by the innermost open transaction() block, if any
+_active_connection = ContextVar("sqlite_active_connection", default=None)
+
+def sqlite_path(url):
+    """File path from a sqlite:///path URL"""
+    if not url or not url.startswith("sqlite:"):
+        raise ValueError(f"Not a sqlite URL: {url!r}")
+    path = url[len("sqlite:"):]
+    if path.startswith("///"):
+        path = path[3:]
+    elif path.startswith("//"):
+        path = path[2:]
+    return path or ":memory:"
+
+def _connect():
+    path = sqlite_path(DB_URL)
+    conn = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+                           check_same_thread=False, factory=instrumentation.InstrumentedSqliteConnection)
+    conn.execute("PRAGMA foreign_keys = ON;")
+    if path != ":memory:":
+        conn.execute("PRAGMA journal_mode = WAL;")
+        conn.execute("PRAGMA synchronous = NORMAL;")
+
+    has_schema = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users';"
+    ).fetchone()
+    if not has_schema:
+        conn.executescript(SQLITE_SCHEMA_SQL)
+    return conn
+
+def _get_connection():
+    global _connection
+    if _connection is None:
+        _connection = _connect()
+    return _connection
+
+@contextmanager
+def db_connection():
+    """
+    Borrow the SQLite connection; commits on success, rolls back on error.
+
+    Inside a transaction() block the transaction's connection is reused and
+    committing is left to the transaction.
+    """
+    conn = _active_connection.get()
+    if conn is not None:
+        yield conn
+        return
+
+    started = time.perf_counter()
+    with cache.after_commit(), _lock:
+        conn = _get_connection()
+        instrumentation.record_connection_acquire(time.perf_counter() - started)
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+@contextmanager
+def transaction():
+    """
+    Unit of work: every db call made inside the block shares one connection
+    and the whole block commits once (or rolls back if it raises).
+
+    Nested transaction() blocks join the outermost one.
+    """
+    conn = _active_connection.get()
+    if conn is not None:
+        yield conn
+        return
+
+    with db_connection() as conn:
+        token = _active_connection.set(conn)
+        try:
+            yield conn
+        finally:
+            _active_connection.reset(token)
+
+def pool_stats():
+    """The embedded backend has no pool; report what it does have"""
+    return {"backend": "sqlite", "path": sqlite_path(DB_URL), "open": _connection is not None}
+
+def close_pool():
+    """Close the SQLite connection (tests, shutdown)"""
+    global _connection
+    with _lock:
+        if _connection is not None:
+            _connection.close()
+            _connection = None
+        cache.clear()
+
+def _character_tags(character):
+    return [("character", character.character_id)] if character else []
+
+# Timestamps only have millisecond resolution here, so queries ordered by time
+# break ties with rowid (insertion order)
+
+def _records(conn, record_type):
+    """Cursor whose row factory builds `record_type` records directly"""
+    cur = conn.cursor()
+    cur.row_factory = lambda cursor, row: record_type(*row)
+    return cur
+
+def _timestamp(value):
+    """Format a datetime the way the schema stores it, so comparisons line up"""
+    return value.isoformat(" ", "milliseconds") if isinstance(value, datetime) else value
+
+def _rowid_page(rows, limit, kind, record_type, sort_field, *prefix):
+    """
+    Keyset page of records from rows fetched with LIMIT limit + 1 whose last
+    column is the rowid, which breaks ties in `sort_field` and is left out of
+    the records
+    """
+    pairs = [(record_type(*row[:-1]), row[-1]) for row in rows]
+    page, cursor = keyset_page(pairs, limit, kind, lambda pair: (
+        *prefix, _timestamp(getattr(pair[0], sort_field)), pair[1]))
+    return [record for record, _ in page], cursor
+
+# =============================================================================
+# USER MANAGEMENT
+# =============================================================================
+
+def create_user(username, email=None):
+    """Create a new user"""
+    with db_connection() as conn:
+        return conn.execute("""
+            INSERT INTO users (username, email)
+            VALUES (?, ?)
+            RETURNING user_id;
+        """, (username, email)).fetchone()[0]
+
+def get_user_by_username(username):
+    """Get user by username"""
+    with db_connection() as conn:
+        result = conn.execute("""
+            SELECT user_id, username, email, created_at, last_login
+            FROM users WHERE username = ?;
+        """, (username,)).fetchone()
+
+    if result:
+        return user_from_row(result)
+    return None
+
+def get_or_create_user(username):
+    """Get existing user or create new one (for single player simplicity)"""
+    user = get_user_by_username(username)
+    if user:
+        return user["user_id"]
+    return create_user(username)
+
+# =============================================================================
+# CAMPAIGN MANAGEMENT
+# =============================================================================
+
+def create_campaign(name, description, created_by_user_id):
+    """Create a new campaign"""
+    with db_connection() as conn:
+        campaign_id = conn.execute("""
+            INSERT INTO campaigns (name, description, created_by)
+            VALUES (?, ?, ?)
+            RETURNING campaign_id;
+        """, (name, description, created_by_user_id)).fetchone()[0]
+
+        conn.execute("""
+            INSERT INTO campaign_members (campaign_id, user_id, role)
+            VALUES (?, ?, 'dm');
+        """, (campaign_id, created_by_user_id))
+
+    return campaign_id
+
+def list_campaigns(user_id=None):
+    """List all campaigns, optionally filtered by user"""
+    with db_connection() as conn:
+        cur = _records(conn, Campaign)
+        if user_id:
+            cur.execute("""
+                SELECT c.campaign_id, c.name, c.description, c.created_at, c.last_played,
+                       u.username as creator, cm.role
+                FROM campaigns c
+                JOIN campaign_members cm ON c.campaign_id = cm.campaign_id
+                JOIN users u ON c.created_by = u.user_id
+                WHERE cm.user_id = ? AND c.is_active
+                ORDER BY c.last_played DESC, c.rowid DESC;
+            """, (user_id,))
+        else:
+            cur.execute("""
+                SELECT c.campaign_id, c.name, c.description, c.created_at, c.last_played,
+                       u.username as creator
+                FROM campaigns c
+                JOIN users u ON c.created_by = u.user_id
+                WHERE c.is_active
+                ORDER BY c.last_played DESC, c.rowid DESC;
+            """)
+
+        return cur.fetchall()
+
+def page_campaigns(user_id=None, cursor=None, limit=20):
+    """One page of list_campaigns(), plus the cursor for the next page (None on the last one)"""
+    after = decode_cursor("campaigns", cursor) if cursor else []
+    after_sql = "AND (c.last_played, c.rowid) < (?, ?)" if after else ""
+    with db_connection() as conn:
+        if user_id:
+            rows = conn.execute(f"""
+                SELECT c.campaign_id, c.name, c.description, c.created_at, c.last_played,
+                       u.username as creator, cm.role, c.rowid
+                FROM campaigns c
+                JOIN campaign_members cm ON c.campaign_id = cm.campaign_id
+                JOIN users u ON c.created_by = u.user_id
+                WHERE cm.user_id = ? AND c.is_active {after_sql}
+                ORDER BY c.last_played DESC, c.rowid DESC
+                LIMIT ?;
+            """, (user_id, *after, limit + 1)).fetchall()
+        else:
+            rows = conn.execute(f"""
+                SELECT c.campaign_id, c.name, c.description, c.created_at, c.last_played,
+                       u.username as creator, NULL, c.rowid
+                FROM campaigns c
+                JOIN users u ON c.created_by = u.user_id
+                WHERE c.is_active {after_sql}
+                ORDER BY c.last_played DESC, c.rowid DESC
+                LIMIT ?;
+            """, (*after, limit + 1)).fetchall()
+
+    return _rowid_page(rows, limit, "campaigns", Campaign, "last_played")
+
+def get_most_recent_campaign(user_id):
+    """Get the most recently played campaign for a user"""
+    with db_connection() as conn:
+        return _records(conn, Campaign).execute("""
+            SELECT c.campaign_id, c.name, c.description, c.created_at, c.last_played,
+                   u.username as creator, cm.role
+            FROM campaigns c
+            JOIN campaign_members cm ON c.campaign_id = cm.campaign_id
+            JOIN users u ON c.created_by = u.user_id
+            WHERE cm.user_id = ? AND c.is_active
+            ORDER BY c.last_played DESC, c.rowid DESC
+            LIMIT 1;
+        """, (user_id,)).fetchone()
+
+def campaign_exists(campaign_id):
+    """True if an active campaign has this id (a primary key lookup)"""
+    with db_connection() as conn:
+        return bool(conn.execute("""
+            SELECT EXISTS (SELECT 1 FROM campaigns WHERE campaign_id = ? AND is_active);
+        """, (str(campaign_id),)).fetchone()[0])
+
+def update_campaign_last_played(campaign_id):
+    """Update when campaign was last played"""
+    with db_connection() as conn:
+        conn.execute("""
+            UPDATE campaigns
+            SET last_played = strftime('%Y-%m-%d %H:%M:%f', 'now')
+            WHERE campaign_id = ?;
+        """, (campaign_id,))
+
+# =============================================================================
+# CHARACTER MANAGEMENT
+# =============================================================================
+
+def create_character(campaign_id, user_id, name, char_class, hp=30):
+    """Create a character in a campaign"""
+    with db_connection() as conn:
+        cache.invalidate(("characters", campaign_id))
+        return conn.execute("""
+            INSERT INTO characters (campaign_id, user_id, name, class, hp, max_hp)
+            VALUES (?, ?, ?, ?, ?, ?)
+            RETURNING character_id;
+        """, (campaign_id, user_id, name, char_class, hp, hp)).fetchone()[0]
+
+@cached("characters", result_tags=_character_tags)
+def get_character_in_campaign(campaign_id, user_id):
+    """Get user's character in a specific campaign (cached, see db/cache.py)"""
+    with db_connection() as conn:
+        result = _records(conn, Character).execute("""
+            SELECT character_id, name, class, level, hp, max_hp, ac,
+                   strength, dexterity, constitution, intelligence, wisdom, charisma, experience
+            FROM characters
+            WHERE campaign_id = ? AND user_id = ?;
+        """, (campaign_id, user_id)).fetchone()
+
+    if result:
+        return result
+    return None
+
+def update_character_stats(character_id, stats):
+    """Update character stats"""
+    with db_connection() as conn:
+        conn.execute("""
+            UPDATE characters
+            SET strength=?, dexterity=?, constitution=?,
+                intelligence=?, wisdom=?, charisma=?,
+                level=?, experience=?, hp=?, max_hp=?, ac=?
+            WHERE character_id=?;
+        """, character_stats_params(character_id, stats))
+        cache.invalidate(("character", character_id))
+
+def clear_characters_in_campaign(campaign_id):
+    """Clear all characters in a campaign"""
+    with db_connection() as conn:
+        conn.execute("DELETE FROM characters WHERE campaign_id = ?;", (campaign_id,))
+        cache.invalidate(("characters", campaign_id))
+
+# =============================================================================
+# LOCATION MANAGEMENT
+# =============================================================================
+
+def create_location(campaign_id, name, description=None):
+    """Create a location in a campaign"""
+    with db_connection() as conn:
+        return conn.execute("""
+            INSERT INTO locations (campaign_id, name, description)
+            VALUES (?, ?, ?)
+            RETURNING location_id;
+        """, (campaign_id, name, description)).fetchone()[0]
+
+def get_or_create_location(campaign_id, name, description=None):
+    """Get existing location or create new one"""
+    with db_connection() as conn:
+        return conn.execute("""
+            INSERT INTO locations (campaign_id, name, description)
+            VALUES (?, ?, ?)
+            ON CONFLICT (campaign_id, name) DO UPDATE SET name = excluded.name
+            RETURNING location_id;
+        """, (campaign_id, name, description)).fetchone()[0]
+
+# =============================================================================
+# NPC MANAGEMENT
+# =============================================================================
+
+def save_npc(campaign_id, npc_data, location_name="Starting Area"):
+    """Save or update an NPC in a campaign"""
+    return save_npcs_bulk(campaign_id, [npc_data], location_name)[0]
+
+def save_npcs_bulk(campaign_id, npcs, location_name="Starting Area"):
+    """
+    Save or update many NPCs at one location in one transaction.
+
+    Returns the npc_ids in the same order as `npcs`.
+    """
+    if not npcs:
+        return []
+
+    npcs_by_name = unique_npcs(npcs)
+
+    npc_ids = {}
+    with transaction() as conn:
+        location_id = get_or_create_location(campaign_id, location_name)
+
+        for npc_data in npcs_by_name.values():
+            name, npc_id = conn.execute("""
+                INSERT INTO npcs (campaign_id, name, class, hp, max_hp, ac,
+                                 strength, dexterity, constitution, intelligence, wisdom, charisma,
+                                 level, current_location_id, status, disposition, backstory)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (campaign_id, name) DO UPDATE SET
+                    hp = excluded.hp, max_hp = excluded.max_hp, ac = excluded.ac,
+                    strength = excluded.strength, dexterity = excluded.dexterity,
+                    constitution = excluded.constitution, intelligence = excluded.intelligence,
+                    wisdom = excluded.wisdom, charisma = excluded.charisma,
+                    level = excluded.level, current_location_id = excluded.current_location_id,
+                    status = excluded.status, disposition = excluded.disposition,
+                    backstory = excluded.backstory,
+                    last_seen = strftime('%Y-%m-%d %H:%M:%f', 'now')
+                RETURNING name, npc_id;
+            """, npc_params(campaign_id, npc_data, location_id)).fetchone()
+            npc_ids[name] = npc_id
+        cache.invalidate(("npcs", campaign_id))
+
+    return [npc_ids[npc_data["name"]] for npc_data in npcs]
+
+@cached("npcs")
+def get_npcs_at_location(campaign_id, location_name, status="alive"):
+    """Get all NPCs at a specific location in campaign (cached, see db/cache.py)"""
+    with db_connection() as conn:
+        results = _records(conn, Npc).execute("""
+            SELECT n.npc_id, n.name, n.class, n.hp, n.max_hp, n.ac,
+                   n.strength, n.dexterity, n.constitution, n.intelligence, n.wisdom, n.charisma,
+                   n.level, l.name as location_name, n.status, n.disposition, n.backstory, n.last_seen
+            FROM npcs n
+            JOIN locations l ON n.current_location_id = l.location_id
+            WHERE n.campaign_id = ? AND l.name = ? AND n.status = ?
+            ORDER BY n.last_seen DESC, n.rowid DESC;
+        """, (campaign_id, location_name, status)).fetchall()
+
+    return results
+
+# =============================================================================
+# EVENT MANAGEMENT
+# =============================================================================
+
+def save_event(campaign_id, event_type, description, location_name=None,
+               npcs_involved=None, character_ids=None, player_actions=None,
+               consequences=None, session_id=None, turn_number=None, context_delta=None):
+    """Save a story event in a campaign (see db.save_event)"""
+    with transaction() as conn:
+        location_id = None
+        if location_name:
+            location_id = get_or_create_location(campaign_id, location_name)
+
+        conn.execute("""
+            INSERT INTO events (campaign_id, event_type, description, location_id,
+                               npcs_involved, characters_involved, player_actions,
+                               consequences, session_id, turn_number, context_delta)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+        """, (campaign_id, event_type, description, location_id,
+              npcs_involved, character_ids, player_actions, consequences,
+              session_id, turn_number, context_delta))
+
+def save_events_bulk(events):
+    """Save many events in one transaction (see db.save_events_bulk)"""
+    if not events:
+        return
+
+    with transaction() as conn:
+        location_ids = {}
+        for event in events:
+            key = (event["campaign_id"], event.get("location_name"))
+            if key[1] and key not in location_ids:
+                location_ids[key] = get_or_create_location(*key)
+
+        conn.executemany("""
+            INSERT INTO events (campaign_id, event_type, description, location_id,
+                               npcs_involved, characters_involved, player_actions,
+                               consequences, session_id, turn_number, context_delta, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
+                    strftime('%Y-%m-%d %H:%M:%f', 'now', printf('-%.3f seconds', ?)));
+        """, [event_params(event, location_ids.get((event["campaign_id"], event.get("location_name"))))
+              for event in events])
+
+def get_event_context(event_id):
+    """Rebuild the session context as it was when an event was saved"""
+    with db_connection() as conn:
+        result = conn.execute("""
+            WITH all_events AS (
+                SELECT event_id, session_id, turn_number, context_delta FROM events
+                UNION ALL
+                SELECT event_id, session_id, turn_number, context_delta FROM events_archive
+            )
+            SELECT group_concat(context_delta, '') FROM (
+                SELECT prev.context_delta
+                FROM all_events e
+                JOIN all_events prev ON prev.session_id = e.session_id
+                                    AND prev.turn_number <= e.turn_number
+                WHERE e.event_id = ?
+                ORDER BY prev.turn_number
+            );
+        """, (event_id,)).fetchone()
+
+    return result[0] if result and result[0] is not None else ""
+
+def get_recent_events(campaign_id, limit=10):
+    """Get recent events for AI context in campaign"""
+    with db_connection() as conn:
+        results = []
+        # Archived events are all older than hot ones, so they only fill in a short page
+        for table in ("events", "events_archive"):
+            results += _records(conn, Event).execute(f"""
+                SELECT e.event_type, e.description, l.name as location_name, e.npcs_involved,
+                       e.player_actions, e.consequences, e.created_at
+                FROM {table} e
+                LEFT JOIN locations l ON e.location_id = l.location_id
+                WHERE e.campaign_id = ?
+                ORDER BY e.created_at DESC, e.rowid DESC
+                LIMIT ?;
+            """, (campaign_id, limit - len(results))).fetchall()
+            if len(results) >= limit:
+                break
+
+    return results
+
+def page_events(campaign_id, cursor=None, limit=20, oldest_first=False):
+    """
+    One page of a campaign's events, newest first (or oldest first), plus the
+    cursor for the next page (None on the last one)
+    """
+    kind = "events_oldest_first" if oldest_first else "events"
+    tables = ("events_archive", "events") if oldest_first else ("events", "events_archive")
+    table, *after = decode_cursor(kind, cursor) if cursor else (tables[0],)
+    if table not in tables:
+        raise ValueError("Invalid page cursor")
+    op, order = (">", "ASC") if oldest_first else ("<", "DESC")
+
+    rows, sources = [], []
+    with db_connection() as conn:
+        # Archived events are all older than hot ones, so paging walks between them
+        for table in tables[tables.index(table):]:
+            after_sql = f"AND (e.created_at, e.rowid) {op} (?, ?)" if after else ""
+            fetched = conn.execute(f"""
+                SELECT e.event_type, e.description, l.name as location_name, e.npcs_involved,
+                       e.player_actions, e.consequences, e.created_at, e.rowid
+                FROM {table} e
+                LEFT JOIN locations l ON e.location_id = l.location_id
+                WHERE e.campaign_id = ? {after_sql}
+                ORDER BY e.created_at {order}, e.rowid {order}
+                LIMIT ?;
+            """, (campaign_id, *after, limit + 1 - len(rows))).fetchall()
+            rows += fetched
+            sources += [table] * len(fetched)
+            if len(rows) > limit:
+                break
+            after = []
+
+    # The cursor names the table the page ended in
+    last_table = sources[limit - 1] if len(rows) > limit else None
+    return _rowid_page(rows, limit, kind, Event, "created_at", last_table)
+
+def search_events(campaign_id, query, limit=10, match_any=False):
+    """
+    A campaign's events (hot and archived) matching a free-text query, most
+    relevant (bm25) first. By default every word must appear (stemmed, so
+    "goblins" finds "goblin"); match_any=True ranks events containing any of them.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    match = (" OR " if match_any else " ").join(f'"{term}"' for term in terms)
+
+    ranked = []
+    with db_connection() as conn:
+        for table in ("events", "events_archive"):
+            # bm25() is lower for better matches
+            ranked += conn.execute(f"""
+                SELECT bm25({table}_search), e.event_type, e.description, l.name as location_name,
+                       e.npcs_involved, e.player_actions, e.consequences, e.created_at
+                FROM {table}_search
+                JOIN {table} e ON e.rowid = {table}_search.rowid
+                LEFT JOIN locations l ON e.location_id = l.location_id
+                WHERE {table}_search MATCH ? AND e.campaign_id = ?
+                ORDER BY bm25({table}_search)
+                LIMIT ?;
+            """, (match, campaign_id, limit)).fetchall()
+
+    ranked.sort(key=lambda row: row[0])
+    return [Event(*row[1:]) for row in ranked[:limit]]
+
+# =============================================================================
+# EVENT PARTITIONS & RETENTION
+# =============================================================================
+
+_EVENT_COLUMNS = """event_id, campaign_id, event_type, description, location_id, npcs_involved,
+                    characters_involved, player_actions, consequences, session_id,
+                    turn_number, context_delta, created_at"""
+
+def _archive_events(conn, event_ids):
+    """Move events (oldest first, so rowid keeps breaking time ties) into events_archive"""
+    conn.executemany(f"""
+        INSERT INTO events_archive ({_EVENT_COLUMNS})
+        SELECT {_EVENT_COLUMNS} FROM events WHERE event_id = ?;
+    """, [(event_id,) for event_id in event_ids])
+    conn.executemany("DELETE FROM events WHERE event_id = ?;", [(event_id,) for event_id in event_ids])
+
+def ensure_event_partitions(months_ahead=2):
+    """SQLite has no partitions; nothing to create"""
+    return []
+
+def archive_old_events(keep_months=12):
+    """
+    Move events from months older than `keep_months` into events_archive.
+    Returns the names of the months archived, like the Postgres partitions.
+    """
+    cutoff = add_months(date.today().replace(day=1), -keep_months)
+    with transaction() as conn:
+        rows = conn.execute("""
+            SELECT event_id, strftime('%Y_%m', created_at) FROM events
+            WHERE created_at < ?
+            ORDER BY created_at, rowid;
+        """, (cutoff.isoformat(),)).fetchall()
+        _archive_events(conn, [event_id for event_id, _ in rows])
+    return sorted({f"events_{month}" for _, month in rows})
+
+def set_event_retention(campaign_id, keep_newest):
+    """Keep only the newest `keep_newest` events of a campaign hot (None = keep all)"""
+    with db_connection() as conn:
+        conn.execute("UPDATE campaigns SET event_retention = ? WHERE campaign_id = ?;",
+                     (keep_newest, campaign_id))
+
+def apply_event_retention(campaign_id=None, batch_size=10000):
+    """
+    Archive events beyond each campaign's retention limit (or one campaign's).
+
+    Moves at most `batch_size` rows per call; returns how many were moved.
+    """
+    with transaction() as conn:
+        event_ids = [row[0] for row in conn.execute("""
+            SELECT event_id FROM (
+                SELECT e.event_id, c.event_retention,
+                       row_number() OVER (PARTITION BY e.campaign_id
+                                          ORDER BY e.created_at DESC, e.rowid DESC) AS newest
+                FROM events e
+                JOIN campaigns c ON c.campaign_id = e.campaign_id
+                WHERE c.event_retention IS NOT NULL AND (:campaign_id IS NULL OR c.campaign_id = :campaign_id)
+            )
+            WHERE newest > event_retention
+            ORDER BY newest DESC
+            LIMIT :batch_size;
+        """, {"campaign_id": campaign_id, "batch_size": batch_size})]
+        _archive_events(conn, event_ids)
+    return len(event_ids)
+
+# =============================================================================
+# RELATIONSHIP MANAGEMENT
+# =============================================================================
+
+def update_npc_relationship(campaign_id, npc_name, character_id, relationship_change, interaction_description):
+    """Update relationship between NPC and character in campaign"""
+    update_npc_relationships(campaign_id, character_id,
+                             [(npc_name, relationship_change, interaction_description)])
+
+def update_npc_relationships(campaign_id, character_id, changes):
+    """
+    Apply many relationship changes for one character in one transaction
+    (see db.update_npc_relationships). Returns the number of relationships touched.
+    """
+    rows = relationship_change_rows(campaign_id, character_id, changes)
+    if not rows:
+        return 0
+
+    with transaction() as conn:
+        cur = conn.executemany("""
+            INSERT INTO relationships (campaign_id, character_id, npc_id, relationship_type,
+                                       relationship_score, last_interaction)
+            SELECT n.campaign_id, :character_id, n.npc_id,
+                   CASE WHEN :change > 0 THEN 'ally' WHEN :change < 0 THEN 'enemy' ELSE 'neutral' END,
+                   max(-100, min(100, :change)), :description
+            FROM npcs n
+            WHERE n.campaign_id = :campaign_id AND n.name = :npc_name
+            ON CONFLICT (character_id, npc_id) DO UPDATE SET
+                relationship_score = max(-100, min(100,
+                    relationships.relationship_score + excluded.relationship_score)),
+                last_interaction = excluded.last_interaction,
+                updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now');
+        """, [_relationship_params(row) for row in rows])
+        touched = cur.rowcount
+
+        conn.executemany("""
+            INSERT INTO relationship_interactions (relationship_id, score_change, description)
+            SELECT r.relationship_id, :change, :description
+            FROM relationships r
+            JOIN npcs n ON n.npc_id = r.npc_id
+            WHERE r.character_id = :character_id AND n.campaign_id = :campaign_id
+              AND n.name = :npc_name;
+        """, [_relationship_params(row) for row in rows])
+        cache.invalidate(("relationships", campaign_id))
+
+    return touched
+
+def _relationship_params(row):
+    campaign_id, character_id, npc_name, change, description = row
+    return {"campaign_id": campaign_id, "character_id": character_id, "npc_name": npc_name,
+            "change": change, "description": description}
+
+@cached("relationships")
+def get_npc_relationships(campaign_id, character_id, history_limit=3):
+    """
+    Get all NPC relationships for a character in campaign (cached, see db/cache.py).
+
+    "history" holds only the newest `history_limit` interactions (oldest first).
+    """
+    with db_connection() as conn:
+        results = _records(conn, Relationship).execute("""
+            SELECT r.relationship_id, r.npc_id, n.name, r.relationship_type, r.relationship_score,
+                   (SELECT json_group_array(description) FROM (
+                        SELECT description FROM (
+                            SELECT ri.description, ri.created_at, ri.interaction_id
+                            FROM relationship_interactions ri
+                            WHERE ri.relationship_id = r.relationship_id
+                            ORDER BY ri.created_at DESC, ri.interaction_id DESC
+                            LIMIT ?
+                        ) ORDER BY created_at, interaction_id
+                   )) AS "history [JSON]",
+                   r.last_interaction, r.updated_at
+            FROM relationships r
+            JOIN npcs n ON r.npc_id = n.npc_id
+            WHERE r.campaign_id = ? AND r.character_id = ?
+            ORDER BY r.updated_at DESC, r.rowid DESC;
+        """, (history_limit, campaign_id, character_id)).fetchall()
+
+    return results
+
+def page_npc_relationships(campaign_id, character_id, cursor=None, limit=20, history_limit=3):
+    """One page of get_npc_relationships(), plus the cursor for the next page (None on the last one)"""
+    after = decode_cursor("relationships", cursor) if cursor else []
+    after_sql = "AND (r.updated_at, r.rowid) < (?, ?)" if after else ""
+    with db_connection() as conn:
+        rows = conn.execute(f"""
+            SELECT r.relationship_id, r.npc_id, n.name, r.relationship_type, r.relationship_score,
+                   (SELECT json_group_array(description) FROM (
+                        SELECT description FROM (
+                            SELECT ri.description, ri.created_at, ri.interaction_id
+                            FROM relationship_interactions ri
+                            WHERE ri.relationship_id = r.relationship_id
+                            ORDER BY ri.created_at DESC, ri.interaction_id DESC
+                            LIMIT ?
+                        ) ORDER BY created_at, interaction_id
+                   )) AS "history [JSON]",
+                   r.last_interaction, r.updated_at, r.rowid
+            FROM relationships r
+            JOIN npcs n ON r.npc_id = n.npc_id
+            WHERE r.campaign_id = ? AND r.character_id = ? {after_sql}
+            ORDER BY r.updated_at DESC, r.rowid DESC
+            LIMIT ?;
+        """, (history_limit, campaign_id, character_id, *after, limit + 1)).fetchall()
+
+    return _rowid_page(rows, limit, "relationships", Relationship, "updated_at")
+
+def get_relationship_history(relationship_id, before=None, limit=10):
+    """Page through a relationship's interactions, newest first"""
+    with db_connection() as conn:
+        if before:
+            cur = conn.execute("""
+                SELECT interaction_id, score_change, description, created_at
+                FROM relationship_interactions
+                WHERE relationship_id = ? AND (created_at, interaction_id) < (?, ?)
+                ORDER BY created_at DESC, interaction_id DESC
+                LIMIT ?;
+            """, (relationship_id, _timestamp(before["created_at"]), before["interaction_id"], limit))
+        else:
+            cur = conn.execute("""
+                SELECT interaction_id, score_change, description, created_at
+                FROM relationship_interactions
+                WHERE relationship_id = ?
+                ORDER BY created_at DESC, interaction_id DESC
+                LIMIT ?;
+            """, (relationship_id, limit))
+
+        results = cur.fetchall()
+
+    return [interaction_from_row(row) for row in results]
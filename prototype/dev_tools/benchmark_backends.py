@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark the storage backends against each other
+
+Runs the same game-shaped workload (NPC upserts, events, relationship updates
+and the reads a turn makes) against each DATABASE_URL given on the command
+line and prints per-operation timings:
+
+    python dev_tools/benchmark_backends.py sqlite:///bench.sqlite3 \\
+        postgresql://postgres:pw@localhost:5432/agentic_dnd_bench
+
+⚠️ Every table in each database is dropped and recreated first - never point
+this at a database you want to keep.
+
+Each backend runs in its own subprocess because db/db.py picks its backend
+from DATABASE_URL at import time.
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+PROTOTYPE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+TURNS = 200
+NPCS_PER_TURN = 5
+
+def _goblin(name):
+    return {"name": name, "class": "Goblin", "hp": 7, "ac": 12, "strength": 8,
+            "dexterity": 14, "constitution": 10, "intelligence": 8, "wisdom": 8,
+            "charisma": 8, "level": 1}
+
+def run_workload():
+    """Time the workload against the backend named by DATABASE_URL"""
+    sys.path.insert(0, PROTOTYPE_DIR)
+    from dev_tools.setup_db import setup_database
+    from db import db
+
+    setup_database()
+
+    timings = {}
+
+    def timed(label, fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        timings.setdefault(label, []).append(time.perf_counter() - start)
+        return result
+
+    user_id = db.get_or_create_user("benchmark")
+    campaign_id = db.create_campaign("Benchmark", "Backend benchmark", user_id)
+    character_id = db.create_character(campaign_id, user_id, "Hero", "Fighter")
+
+    for turn in range(1, TURNS + 1):
+        names = [f"Goblin {turn % 20}-{i}" for i in range(NPCS_PER_TURN)]
+        timed("save_npcs_bulk", db.save_npcs_bulk, campaign_id,
+              [_goblin(name) for name in names], f"Room {turn % 10}")
+        timed("save_event", db.save_event, campaign_id, "interaction", f"Turn {turn}",
+              f"Room {turn % 10}", player_actions="I look around",
+              session_id="00000000-0000-4000-8000-000000000001",
+              turn_number=turn, context_delta=f"\nPlayer: turn {turn}")
+        timed("update_npc_relationships", db.update_npc_relationships, campaign_id, character_id,
+              [(name, 3, f"Player: turn {turn}") for name in names])
+        timed("get_npcs_at_location", db.get_npcs_at_location, campaign_id, f"Room {turn % 10}")
+        timed("get_recent_events", db.get_recent_events, campaign_id, 10)
+        timed("get_npc_relationships", db.get_npc_relationships, campaign_id, character_id)
+
+    print(f"\n📊 {db.backend_for_url(db.DB_URL)} - {TURNS} turns")
+    for label, samples in timings.items():
+        total = sum(samples)
+        print(f"   {label:<26} total {total * 1000:8.1f} ms   avg {total / len(samples) * 1000:7.3f} ms")
+
+def main(urls):
+    if not urls:
+        print("Usage: python dev_tools/benchmark_backends.py DATABASE_URL [DATABASE_URL ...]")
+        return 1
+    for url in urls:
+        env = dict(os.environ, DATABASE_URL=url)
+        subprocess.run([sys.executable, os.path.abspath(__file__), "--run"], env=env, check=True)
+    return 0
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--run"]:
+        run_workload()
+    else:
+        sys.exit(main(sys.argv[1:]))
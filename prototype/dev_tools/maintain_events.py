@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Events table upkeep - run from cron (e.g. daily)
+
+Creates the upcoming monthly events partitions, archives months older than
+EVENT_HOT_MONTHS and moves events beyond each campaign's retention limit into
+events_archive. The game itself only creates partitions at startup, so
+schedule this to keep the hot table small.
+
+    python dev_tools/maintain_events.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from db.db import maintain_events
+
+if __name__ == "__main__":
+    result = maintain_events()
+    print(f"🗂️ Created partitions: {', '.join(result['partitions_created']) or 'none'}")
+    print(f"📦 Archived partitions: {', '.join(result['partitions_archived']) or 'none'}")
+    print(f"🧹 Events moved by campaign retention: {result['events_archived']}")
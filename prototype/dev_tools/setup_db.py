@@ -1,11 +1,15 @@
 import os
+import sqlite3
 import psycopg2
 from dotenv import load_dotenv
-from db.db_schema import SCHEMA_SQL
+from db.db import DEFAULT_DATABASE_URL, backend_for_url
+from db.db_schema import SCHEMA_SQL, SQLITE_SCHEMA_SQL
+from db.sqlite_backend import sqlite_path
+from services.campaign_manager import user_id_for
 
 load_dotenv()
 
-DB_URL = os.getenv("DATABASE_URL")
+DB_URL = os.getenv("DATABASE_URL") or DEFAULT_DATABASE_URL
 
 def setup_database():
     """Initialize database with all tables for persistent world data"""
@@ -20,16 +24,23 @@ def setup_database():
     print("   - Relationships table (NPC allegiances)")
     
     try:
-        conn = psycopg2.connect(DB_URL)
-        cur = conn.cursor()
-        
-        # Execute the schema directly from import
-        cur.execute(SCHEMA_SQL)
-        conn.commit()
-        
-        cur.close()
-        conn.close()
+        if backend_for_url(DB_URL) == "sqlite":
+            conn = sqlite3.connect(sqlite_path(DB_URL))
+            conn.executescript(SQLITE_SCHEMA_SQL)
+            conn.close()
+        else:
+            conn = psycopg2.connect(DB_URL)
+            cur = conn.cursor()
+
+            # Execute the schema directly from import
+            cur.execute(SCHEMA_SQL)
+            conn.commit()
+
+            cur.close()
+            conn.close()
         
+        # Cached user ids point at rows that no longer exist
+        user_id_for.cache_clear()
         print("✅ Database setup complete!")
         print("\n🧠 AI Memory System Ready:")
         print("   → NPCs will remember past interactions")
@@ -40,7 +51,7 @@ def setup_database():
         
     except Exception as e:
         print(f"❌ Database setup failed: {e}")
-        print("Make sure PostgreSQL is running and DATABASE_URL is correct")
+        print("Make sure DATABASE_URL is correct (and PostgreSQL is running if you use it)")
         return False
     
     return True
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Export a campaign to a file, or import one into DATABASE_URL (Postgres)
+
+    python dev_tools/transfer_campaign.py export <campaign_id> goblin_war.dndcamp.gz
+    python dev_tools/transfer_campaign.py import goblin_war.dndcamp.gz [--replace]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from db.campaign_transfer import export_campaign, import_campaign
+
+def main(argv):
+    if len(argv) == 3 and argv[0] == "export":
+        action, run = "Exported", lambda: export_campaign(argv[1], argv[2])
+    elif len(argv) in (2, 3) and argv[0] == "import" and argv[2:] in ([], ["--replace"]):
+        action, run = "Imported", lambda: import_campaign(argv[1], replace=argv[2:] == ["--replace"])
+    else:
+        print(__doc__)
+        return 1
+
+    started = time.perf_counter()
+    counts = run()
+    print(f"📦 {action} campaign in {time.perf_counter() - started:.2f}s:")
+    for table, count in counts.items():
+        print(f"   {table}: {count} rows")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -2,7 +2,10 @@
 import cli
 from services.game_session import GameSession
 from services.campaign_manager import CampaignManager
-from db.db import get_or_create_user
+from db.db import get_or_create_user, ensure_event_partitions
+from bots.llm_gateway import LLMError
+from utils import CommandHandler
+import os
 import uuid
 
 def create_new_character(campaign_id, username):
@@ -67,31 +70,36 @@ def campaign_menu():
             return run_campaign(campaign_id, username, is_new=True)
             
         elif choice == "2":
-            # Select existing campaign
-            campaigns = campaign_manager.list_user_campaigns(username)
+            # Select existing campaign, a page at a time
+            campaigns, cursor = campaign_manager.page_user_campaigns(username)
             
             if not campaigns:
                 print("❌ No campaigns found! Create a new one first.")
                 continue
                 
-            print("\n📋 YOUR CAMPAIGNS:")
-            for i, campaign in enumerate(campaigns, 1):
-                campaign_id, name, description, created_at, last_played, creator, role = campaign
-                last_played_str = last_played.strftime("%Y-%m-%d %H:%M") if last_played else "Never"
-                print(f"{i}. {name} ({role}) - Last played: {last_played_str}")
-                if description:
-                    print(f"   Description: {description}")
+            while True:
+                print("\n📋 YOUR CAMPAIGNS:")
+                for i, campaign in enumerate(campaigns, 1):
+                    last_played_str = campaign.last_played.strftime("%Y-%m-%d %H:%M") if campaign.last_played else "Never"
+                    print(f"{i}. {campaign.name} ({campaign.role}) - Last played: {last_played_str}")
+                    if campaign.description:
+                        print(f"   Description: {campaign.description}")
+                        
+                more = ", n for more" if cursor else ""
+                answer = input(f"\nSelect campaign (1-{len(campaigns)}{more}): ").strip().lower()
+                if answer == "n" and cursor:
+                    campaigns, cursor = campaign_manager.page_user_campaigns(username, cursor)
+                    continue
                     
-            try:
-                selection = int(input(f"\nSelect campaign (1-{len(campaigns)}): ")) - 1
-                if 0 <= selection < len(campaigns):
-                    selected_campaign = campaigns[selection]
-                    campaign_id = selected_campaign[0]
-                    return run_campaign(campaign_id, username, is_new=False)
-                else:
-                    print("❌ Invalid selection!")
-            except ValueError:
-                print("❌ Please enter a valid number!")
+                try:
+                    selection = int(answer) - 1
+                    if 0 <= selection < len(campaigns):
+                        return run_campaign(campaigns[selection].campaign_id, username, is_new=False)
+                    else:
+                        print("❌ Invalid selection!")
+                except ValueError:
+                    print("❌ Please enter a valid number!")
+                break
                 
         elif choice == "3":
             # Continue most recent campaign
@@ -101,10 +109,9 @@ def campaign_menu():
                 print("❌ No recent campaigns found! Create a new one first.")
                 continue
                 
-            campaign_id, name, description, created_at, last_played, creator, role = recent_campaign
-            print(f"🔄 Continuing: {name}")
+            print(f"🔄 Continuing: {recent_campaign.name}")
             
-            return run_campaign(campaign_id, username, is_new=False)
+            return run_campaign(recent_campaign.campaign_id, username, is_new=False)
             
         elif choice == "4":
             print("👋 Goodbye!")
@@ -163,20 +170,30 @@ def run_game_session(game_session):
     cli.ui_intro_text()
     cli.ui_player_character_sheet(game_session.character)
     
-    # Run intro scene
+    # Run intro scene (streamed narration has already been shown as it was written)
     intro_text = game_session.run_intro_scene()
-    print(f"\n{intro_text}")
+    if not cli.STREAM_NARRATION:
+        print(f"\n{intro_text}")
     
     # Main game loop
+    cmd_handler = CommandHandler(game_session=game_session)
     while True:
         action = cli.ui_get_action()
         
         # Handle special commands
-        if action.lower() == "menu":
+        handled = cmd_handler.handle_command(action, context="story")
+        if handled == "exit_to_menu":
             return  # Exit to campaign menu
+        if handled:
+            continue  # Command handled, ask for action again
         
-        # Process the action
-        result = game_session.action_handler(action)
+        # Process the action; a provider outage costs this turn, not the session
+        try:
+            result = game_session.action_handler(action)
+        except LLMError as e:
+            print(f"\n❌ The Dungeon Master couldn't answer: {e}")
+            print("Try that again in a moment.")
+            continue
         
         if result == "combat":
             # Start combat
@@ -185,10 +202,11 @@ def run_game_session(game_session):
                 return  # Character died, exit to menu
             else:
                 # Combat ended, continue story
-                print(f"\n{combat_result}")
+                if not cli.STREAM_NARRATION:
+                    print(f"\n{combat_result}")
         elif result == "game_over":
             return  # Game over, exit to menu
-        else:
+        elif not cli.STREAM_NARRATION:
             # Normal story continuation
             print(f"\n{result}")
 
@@ -198,6 +216,9 @@ def main():
     print("🧠 Featuring AI Memory - NPCs remember your actions!")
     
     try:
+        # Only the cheap, non-blocking part of events upkeep; archiving and
+        # retention take locks, so dev_tools/maintain_events.py runs them
+        ensure_event_partitions(int(os.getenv("EVENT_PARTITION_MONTHS_AHEAD", "2")))
         campaign_menu()
     except KeyboardInterrupt:
         print("\n\n👋 Game interrupted. Goodbye!")
@@ -1,6 +1,17 @@
 import os
-from db.db import (create_campaign, list_campaigns, get_most_recent_campaign, 
-                   update_campaign_last_played, get_or_create_user)
+from functools import lru_cache
+from db.db import (create_campaign, list_campaigns, page_campaigns, get_most_recent_campaign, 
+                   campaign_exists, update_campaign_last_played, get_or_create_user)
+
+@lru_cache(maxsize=1024)
+def user_id_for(username):
+    """
+    username -> user_id, looked up (or created) once per process. User ids
+    never change, so menu navigation after the first lookup skips the users table.
+    Call user_id_for.cache_clear() whenever the users table is recreated or
+    users are removed (dev_tools/setup_db.py and tests do).
+    """
+    return get_or_create_user(username)
 
 class CampaignManager:
     def __init__(self):
@@ -9,7 +20,7 @@ class CampaignManager:
     def create_new_campaign(self, campaign_name, username, description=""):
         """Create a new campaign for a user"""
         # Get or create user
-        user_id = get_or_create_user(username)
+        user_id = user_id_for(username)
         
         # Create campaign
         campaign_id = create_campaign(campaign_name, description, user_id)
@@ -19,12 +30,17 @@ class CampaignManager:
     
     def list_user_campaigns(self, username):
         """List all campaigns for a user"""
-        user_id = get_or_create_user(username)
+        user_id = user_id_for(username)
         return list_campaigns(user_id)
     
+    def page_user_campaigns(self, username, cursor=None, limit=10):
+        """One page of a user's campaigns plus the cursor for the next page (None when done)"""
+        user_id = user_id_for(username)
+        return page_campaigns(user_id, cursor=cursor, limit=limit)
+    
     def get_most_recent_campaign_for_user(self, username):
         """Get the most recently played campaign for a user"""
-        user_id = get_or_create_user(username)
+        user_id = user_id_for(username)
         return get_most_recent_campaign(user_id)
     
     def update_last_played(self, campaign_id):
@@ -32,9 +48,8 @@ class CampaignManager:
         update_campaign_last_played(campaign_id)
     
     def campaign_exists(self, campaign_id):
-        """Check if campaign exists (simple check by trying to get campaigns)"""
+        """Check if an active campaign exists (single indexed lookup)"""
         try:
-            campaigns = list_campaigns()
-            return any(str(c[0]) == str(campaign_id) for c in campaigns)
+            return campaign_exists(campaign_id)
         except:
-            return False
+            return False  # e.g. not a valid campaign id
@@ -0,0 +1,227 @@
+"""
+Local fast path for "is combat happening?"
+
+Most turns are obviously peaceful ("I look around", "I talk to the
+innkeeper") or obviously a fight ("I attack the goblin"), and shouldn't
+cost an LLM round trip to find out. The detector scores the DM's last
+narration and the player's action with weighted keyword and regex features,
+turns the score into a probability and only answers when it's confident -
+and never when the features contradict each other ("I tell him to leave
+and draw my sword"):
+
+    verdict = detector.fast_verdict(last_dm_text, player_action)   # True / False / None
+    combat = detector.decide(last_dm_text, player_action, ask_llm)  # falls back to ask_llm()
+    detector.roll_free(player_action)  # a quiet turn that needs no roll either
+
+so a plain conversation or walk across town costs no LLM call at all.
+
+To keep the weights honest, a sample of the confident answers is also sent
+to the LLM in the background and every disagreement is counted, kept in
+stats() and optionally appended to a JSONL file for tuning.
+
+Configured through the environment (see .env.example):
+
+    COMBAT_FAST_PATH          on / off (default on)
+    COMBAT_FAST_PATH_HIGH     answer "combat" at or above this probability
+    COMBAT_FAST_PATH_LOW      answer "no combat" at or below this probability
+    COMBAT_FAST_PATH_SAMPLE   share of confident answers double-checked by the LLM
+    COMBAT_FAST_PATH_LOG      append disagreements here as JSON lines
+"""
+
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+
+from utils.debug_util import debug_log
+
+# Log-odds of combat before any feature is seen: quiet turns are the common case
+_BIAS = -1.0
+
+# (pattern, weight) scored against the player's action
+_ACTION_FEATURES = [
+    (r"\b(attack|strike|stab|slash|smite|punch|kick|kill|behead|shoot|fight)s?\b", 3.0),
+    (r"\bswing (my|the|a) \w+", 3.0),
+    (r"\bcharge (at|into|toward|towards|the)\b", 2.5),
+    (r"\bcast (fireball|magic missile|eldritch blast|firebolt|fire bolt|lightning bolt|ray of frost)\b", 3.0),
+    (r"\bfire (an arrow|a bolt|at)\b", 2.5),
+    (r"\b(draw|ready|unsheathe) (my |a |the )?(sword|axe|weapon|bow|dagger|blade|mace|hammer|crossbow)\b", 1.5),
+    (r"\bthrow .{0,30}\bat\b", 1.5),
+    (r"\b(talk|speak|ask|greet|thank|chat|say|tell|introduce|persuade|negotiate)s?\b", -2.0),
+    (r"\b(look|examine|inspect|search|read|study|listen|investigate|peek)s?\b", -2.0),
+    (r"\b(buy|sell|trade|pay|rest|sleep|eat|drink|walk|leave|travel|open|enter|sit)s?\b", -1.5),
+]
+
+# (pattern, weight) scored against the DM's last narration
+_NARRATION_FEATURES = [
+    (r"\broll (for )?initiative\b", 4.0),
+    (r"\b(attacks|lunges|charges|swings|strikes|slashes|stabs|ambush(es|ed)?)\b", 2.0),
+    (r"\b(combat|battle|fight) (begins|starts|erupts|breaks out)\b", 2.5),
+    (r"\bdraws? (a |an |its |his |her |their )?(blade|sword|weapon|dagger|bow|axe)\b", 1.5),
+    (r"\b(hostile|snarls|growls|bares (its|his|her|their) teeth|battle cry|war cry)\b", 1.0),
+    (r"\b(tavern|inn|merchant|shop|market|smiles|greets|friendly|peaceful|quiet|calm)\b", -1.0),
+]
+
+# Peaceful actions that never call for a check (dialogue, trade, travel, rest)...
+_ROLL_FREE = re.compile(
+    r"\b(talk|speak|ask|greet|thank|chat|say|tell|introduce|buy|sell|pay|order|rest|sleep|eat|drink"
+    r"|walk|travel|go|head|leave|enter|sit|wait|nod|wave|follow|return)s?\b")
+# ...unless they come with something that does: social pressure, stealth, athletics,
+# observation (Perception / Investigation) or magic
+_ROLL_WORTHY = re.compile(
+    r"\b(persuade|convince|intimidate|threaten|deceive|lie|bluff|negotiate|haggle|barter|bribe|charm"
+    r"|sneak|hide|steal|pickpocket|lockpick|pick|disarm|climb|jump|swim|run|chase|dodge|force|break"
+    r"|lift|push|pull|look|search|examine|inspect|investigate|listen|study|read|track|spot|notice"
+    r"|recall|remember|cast|perform|sing|heal|quietly|carefully|secretly|unnoticed)\w*\b")
+
+# A negation shortly before a combat word ("I don't attack") makes it count against combat
+_NEGATION = re.compile(r"\b(don't|do not|never|without|instead of|refuse to|won't|not)\b[\w\s']{0,20}$")
+
+def _compile(features):
+    return [(re.compile(pattern), weight) for pattern, weight in features]
+
+class CombatDetector:
+    """Weighted-feature combat classifier with confidence thresholds and LLM spot checks"""
+
+    def __init__(self, high=0.85, low=0.15, sample_rate=0.05, log_path=None, enabled=True):
+        if not 0 <= low < high <= 1:
+            raise ValueError(f"Invalid combat fast path thresholds: low={low} high={high}")
+        self.high = high
+        self.low = low
+        self.sample_rate = sample_rate
+        self.log_path = log_path
+        self.enabled = enabled
+
+        self._action_features = _compile(_ACTION_FEATURES)
+        self._narration_features = _compile(_NARRATION_FEATURES)
+        self._lock = threading.Lock()
+        self._recent_disagreements = deque(maxlen=20)
+        self._stats = {
+            "checks": 0,
+            "fast_combat": 0,
+            "fast_no_combat": 0,
+            "deferred": 0,
+            "fast_no_roll": 0,
+            "sampled": 0,
+            "agreements": 0,
+            "disagreements": 0,
+            "sample_errors": 0,
+        }
+
+    def score(self, last_dm_text, player_action):
+        """(probability of combat, the features that matched)"""
+        log_odds = _BIAS
+        matched = []
+        for text, features in ((player_action or "", self._action_features),
+                               (last_dm_text or "", self._narration_features)):
+            text = text.lower()
+            for pattern, weight in features:
+                for match in pattern.finditer(text):
+                    if weight > 0 and _NEGATION.search(text[:match.start()]):
+                        weight = -weight / 2
+                    log_odds += weight
+                    matched.append((match.group(0), weight))
+                    break  # each feature counts once
+        return 1 / (1 + math.exp(-log_odds)), matched
+
+    def fast_verdict(self, last_dm_text, player_action, ask_llm=None):
+        """
+        True / False when the features are decisive, None when the LLM should
+        decide. With `ask_llm`, a sample of decisive answers is checked against it
+        in the background.
+        """
+        if not self.enabled:
+            return None
+        probability, matched = self.score(last_dm_text, player_action)
+        mixed = any(weight > 0 for _, weight in matched) and any(weight < 0 for _, weight in matched)
+        verdict = None
+        if not mixed:
+            verdict = True if probability >= self.high else False if probability <= self.low else None
+
+        with self._lock:
+            self._stats["checks"] += 1
+            self._stats["deferred" if verdict is None else "fast_combat" if verdict else "fast_no_combat"] += 1
+        debug_log(f"Combat fast path: p={probability:.2f} verdict={verdict} features={matched}")
+
+        if verdict is not None and ask_llm is not None and random.random() < self.sample_rate:
+            threading.Thread(target=self._check_sample, name="combat-fast-path-sample", daemon=True,
+                             args=(last_dm_text, player_action, verdict, probability, ask_llm)).start()
+        return verdict
+
+    def roll_free(self, player_action):
+        """
+        True when a peaceful action plainly needs no dice roll ("I thank the
+        innkeeper and head upstairs"), so the roll question can be skipped too
+        """
+        if not self.enabled:
+            return False
+        action = (player_action or "").lower()
+        free = bool(_ROLL_FREE.search(action)) and not _ROLL_WORTHY.search(action)
+        if free:
+            with self._lock:
+                self._stats["fast_no_roll"] += 1
+        return free
+
+    def decide(self, last_dm_text, player_action, ask_llm):
+        """The fast verdict if there is one, otherwise ask_llm()"""
+        verdict = self.fast_verdict(last_dm_text, player_action, ask_llm)
+        return ask_llm() if verdict is None else verdict
+
+    def stats(self):
+        with self._lock:
+            fast = self._stats["fast_combat"] + self._stats["fast_no_combat"]
+            sampled = self._stats["agreements"] + self._stats["disagreements"]
+            return {
+                **self._stats,
+                "hit_rate": round(fast / self._stats["checks"], 3) if self._stats["checks"] else 0.0,
+                "disagreement_rate": round(self._stats["disagreements"] / sampled, 3) if sampled else 0.0,
+                "recent_disagreements": list(self._recent_disagreements),
+                "thresholds": {"low": self.low, "high": self.high},
+            }
+
+    def _check_sample(self, last_dm_text, player_action, verdict, probability, ask_llm):
+        with self._lock:
+            self._stats["sampled"] += 1
+        try:
+            llm_verdict = bool(ask_llm())
+        except Exception as e:
+            debug_log(f"Combat fast path sample failed: {e}")
+            with self._lock:
+                self._stats["sample_errors"] += 1
+            return
+
+        if llm_verdict == verdict:
+            with self._lock:
+                self._stats["agreements"] += 1
+            return
+
+        record = {
+            "at": time.time(),
+            "last_dm_text": last_dm_text,
+            "player_action": player_action,
+            "fast_verdict": verdict,
+            "probability": round(probability, 3),
+            "llm_verdict": llm_verdict,
+        }
+        with self._lock:
+            self._stats["disagreements"] += 1
+            self._recent_disagreements.append(record)
+            if self.log_path:
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+
+def detector_config_from_env():
+    """Read fast path settings from the environment"""
+    return {
+        "enabled": os.getenv("COMBAT_FAST_PATH", "on").lower() not in ("0", "off", "false", "no"),
+        "high": float(os.getenv("COMBAT_FAST_PATH_HIGH", "0.85")),
+        "low": float(os.getenv("COMBAT_FAST_PATH_LOW", "0.15")),
+        "sample_rate": float(os.getenv("COMBAT_FAST_PATH_SAMPLE", "0.05")),
+        "log_path": os.getenv("COMBAT_FAST_PATH_LOG") or None,
+    }
+
+detector = CombatDetector(**detector_config_from_env())
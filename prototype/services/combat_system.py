@@ -2,20 +2,23 @@ import json
 import random
 import cli
 from utils.debug_util import debug_log
-from openai import OpenAI
-from dotenv import load_dotenv
+from bots import llm_gateway
 from bots.combat_agent import CombatAgent
+from services import combat_detector
 from utils.dice_utility import DiceUtility
 from utils import CommandHandler
 
-load_dotenv()
-client = OpenAI()
-
 dice = DiceUtility()
 combat_agent = CombatAgent()
 
 def analyze_combat_state_ai(last_dm_text: str, player_response) -> bool:
     debug_log("analyze_combat_state_ai() called.")
+    # Obvious turns are settled locally; only the uncertain ones cost an LLM call
+    return combat_detector.detector.decide(last_dm_text, player_response,
+                                           lambda: analyze_combat_state_llm(last_dm_text, player_response))
+
+def analyze_combat_state_llm(last_dm_text: str, player_response) -> bool:
+    """analyze_combat_state_ai() without the local fast path"""
     system_prompt = (
         "You are a Dungeon Master assistant. Based on the following narration, "
         "determine if combat has started or if combat is ongoing. "
@@ -26,16 +29,7 @@ def analyze_combat_state_ai(last_dm_text: str, player_response) -> bool:
         f"Player's Response:\n{player_response}\n\nIs combat happening?"
     )
 
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ],
-        response_format={"type": "json_object"}
-    )
-
-    combat_state = json.loads(response.choices[0].message.content)
+    combat_state = llm_gateway.chat_json(system_prompt, user_prompt)
     return combat_state["combat"]
 
 class CombatManager:
@@ -144,8 +138,10 @@ def handle_player_turn(combat_manager):
             "damage": damage,
             "hp_remaining": target["hp"]
         }
-        narration = combat_agent.narrate_combat_turn(turn_info)
-        cli.ui_display_dm_narration(narration)
+        if cli.STREAM_NARRATION:
+            cli.ui_display_dm_narration(combat_agent.stream_combat_turn(turn_info))
+        else:
+            cli.ui_display_dm_narration(combat_agent.narrate_combat_turn(turn_info))
         break
 
 def handle_npc_turn(combat_manager, npc_name):
@@ -173,8 +169,12 @@ def handle_npc_turn(combat_manager, npc_name):
         "damage": damage,
         "hp_remaining": combat_manager.combatants["player"]["hp"]
     }
-    narration = combat_agent.narrate_combat_turn(turn_info)
-    print(narration)
+    if cli.STREAM_NARRATION:
+        for piece in combat_agent.stream_combat_turn(turn_info):
+            print(piece, end="", flush=True)
+        print()
+    else:
+        print(combat_agent.narrate_combat_turn(turn_info))
 
 if __name__ == "__main__":
     npcs = [{"name": "Goblin", "hp": 10, "ac": 13}]
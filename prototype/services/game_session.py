@@ -2,15 +2,20 @@
 import cli
 from bots.story_agent import StoryAgent
 from db.db import (create_character, get_character_in_campaign, update_character_stats,
-                   save_npc, get_npcs_at_location, save_event, get_recent_events, 
-                   update_npc_relationship, get_npc_relationships, get_or_create_user,
-                   clear_characters_in_campaign)
+                   save_npcs_bulk, get_npcs_at_location, save_event, get_recent_events, 
+                   search_events, update_npc_relationships, get_npc_relationships,
+                   clear_characters_in_campaign, transaction)
+from db.journal import get_event_journal
+from services.vector_memory import get_vector_memory
+from services.campaign_manager import user_id_for
 from bots.combat_agent import CombatAgent
-from services.combat_system import CombatManager, analyze_combat_state_ai
+from services.combat_system import CombatManager
+from services.turn_analysis import analyze_turn_ai
 from utils.dice_utility import DiceUtility
 from utils.debug_util import debug_log
 from bots.npc_creator_agent import NpcCreatorAgent
 import json
+import uuid
 
 class GameSession:
     def __init__(self, campaign_id, username):
@@ -22,10 +27,20 @@ class GameSession:
         # Campaign and user context
         self.campaign_id = campaign_id
         self.username = username
-        self.user_id = get_or_create_user(username)
+        self.user_id = user_id_for(username)
+        
+        # Write-behind journal for per-turn writes (None = write straight through)
+        self.journal = get_event_journal()
+        
+        # Embedding index of past events and NPC backstories (None = off); loaded
+        # now so its first-use backfill can't also pick up this session's events
+        self.memory = get_vector_memory()
+        if self.memory:
+            self.memory.index(campaign_id)
         
         # Game state
         self.session_context = ""
+        self._start_context_session()
         self.last_dm_text = ""
         self.player_name = ""
         self.player_class = ""
@@ -66,7 +81,7 @@ class GameSession:
 
     def run_intro_scene(self):
         debug_log("run_intro_scene() called.")
-        intro = self.story.generate_intro(self.player_class, self.player_name)
+        intro = self._narrate(self.story.generate_intro, self.story.stream_intro, self.player_class, self.player_name)
         self.session_context += f"\nDM: {intro['content']}"
         self.last_dm_text = intro["content"]
 
@@ -91,45 +106,64 @@ class GameSession:
                 player_character_names=[self.player_name]
             )
             
-            # Save NPCs to database for persistence
-            for npc in generated_npcs:
-                npc_id = save_npc(self.campaign_id, npc, self.current_location)
-                npc["npc_id"] = npc_id
-                print(f"💾 Saved NPC: {npc['name']} ({npc['class']}) to database")
-            
             self.current_npcs = generated_npcs
 
-        # 🧠 AI MEMORY: Save the intro as a story event
+        # 🧠 AI MEMORY: Save new NPCs and the intro event in one transaction
         npc_names = [npc["name"] for npc in self.current_npcs] if self.current_npcs else []
         character_ids = [self.character_id] if self.character_id else []
         
-        save_event(
-            self.campaign_id,
-            event_type="intro",
-            description=intro["content"],
-            location_name=self.current_location,
-            npcs_involved=json.dumps(npc_names),
-            character_ids=json.dumps(character_ids),
-            player_actions="Started new adventure",
-            session_context=self.session_context
-        )
+        turn_number, context_delta = self._next_context_delta()
+        with transaction():
+            if not existing_npcs:
+                # Save NPCs to database for persistence (one upsert for the whole roster)
+                npc_ids = save_npcs_bulk(self.campaign_id, generated_npcs, self.current_location)
+                for npc, npc_id in zip(generated_npcs, npc_ids):
+                    npc["npc_id"] = npc_id
+                    print(f"💾 Saved NPC: {npc['name']} ({npc['class']}) to database")
+
+            save_event(
+                self.campaign_id,
+                event_type="intro",
+                description=intro["content"],
+                location_name=self.current_location,
+                npcs_involved=json.dumps(npc_names),
+                character_ids=json.dumps(character_ids),
+                player_actions="Started new adventure",
+                session_id=self.session_id,
+                turn_number=turn_number,
+                context_delta=context_delta
+            )
+        self._context_persisted()
+        
+        if self.memory:
+            # Already-indexed names are skipped, so existing NPCs only land once
+            self.memory.add_npcs(self.campaign_id, self.current_npcs)
+            self.memory.add_event(self.campaign_id, intro["content"], player_actions="Started new adventure",
+                                  event_type="intro", location_name=self.current_location)
         
         return intro["content"]
 
     def action_handler(self, action):
+        # Last turn's queued writes have had the player's thinking time to land
+        if self.journal:
+            self.journal.flush()
+        
         # 🧠 AI MEMORY: Get recent events for context
         recent_events = get_recent_events(self.campaign_id, limit=5)
+        # Older events that mention what the player is doing now
+        relevant_events = search_events(self.campaign_id, action, limit=3, match_any=True)
+        # ...and the memories (events, NPC backstories) closest to it in meaning
+        memories = self.memory.search(self.campaign_id, action, k=3) if self.memory else []
         relationships = []
         if self.character_id:
             relationships = get_npc_relationships(self.campaign_id, self.character_id)
         
-        # Check for combat first
-        combat_triggered = analyze_combat_state_ai(self.last_dm_text, action)
-        if combat_triggered:
+        # Combat check and roll analysis in one round trip
+        roll_info = analyze_turn_ai(self.last_dm_text, action)
+        if roll_info["combat"]:
             return "combat"
 
         # Handle dice rolling as before
-        roll_info = self.dice.analyze_for_roll(self.last_dm_text, action)
         if roll_info.get('roll_needed'):
             result = self.dice.roll_dice(roll_info['dice_type'])
             cli.ui_handle_dice_roll(roll_info, result)
@@ -140,7 +174,7 @@ class GameSession:
 
         # 🧠 AI MEMORY: Enhanced story generation with persistent context
         response_json = self._enhanced_story_generation(
-            action, roll_info, success, recent_events, relationships
+            action, roll_info, success, recent_events, relationships, relevant_events, memories
         )
         
         new_dm_text = response_json["content"]
@@ -151,8 +185,8 @@ class GameSession:
         npc_names = [npc["name"] for npc in self.current_npcs] if self.current_npcs else []
         character_ids = [self.character_id] if self.character_id else []
         
-        save_event(
-            self.campaign_id,
+        turn_number, context_delta = self._next_context_delta()
+        event = dict(
             event_type="interaction",
             description=new_dm_text,
             location_name=self.current_location,
@@ -160,16 +194,45 @@ class GameSession:
             character_ids=json.dumps(character_ids),
             player_actions=action,
             consequences=success,
-            session_context=self.session_context
+            session_id=self.session_id,
+            turn_number=turn_number,
+            context_delta=context_delta
         )
-        
-        # 🧠 AI MEMORY: Update NPC relationships based on the interaction
-        if self.character_id:
-            self._update_relationships_from_interaction(action, new_dm_text)
+        if self.journal:
+            # Write-behind: queue the turn's writes and return the narration now
+            self.journal.save_event(self.campaign_id, **event)
+            if self.character_id:
+                self._update_relationships_from_interaction(action, new_dm_text)
+        else:
+            # One connection and one commit for the whole turn's writes
+            with transaction():
+                save_event(self.campaign_id, **event)
+                
+                # 🧠 AI MEMORY: Update NPC relationships based on the interaction
+                if self.character_id:
+                    self._update_relationships_from_interaction(action, new_dm_text)
+        if self.memory:
+            self.memory.add_event(self.campaign_id, **event)
+        self._context_persisted()
         
         return new_dm_text
 
-    def _enhanced_story_generation(self, action, roll_info, success, recent_events, relationships):
+    def _start_context_session(self):
+        """Begin a fresh session context; events store only what each turn appends to it"""
+        self.session_id = str(uuid.uuid4())
+        self.turn_number = 0
+        self._persisted_context_len = 0
+
+    def _next_context_delta(self):
+        """Turn number and session context text not yet stored with an event"""
+        return self.turn_number + 1, self.session_context[self._persisted_context_len:]
+
+    def _context_persisted(self):
+        self.turn_number += 1
+        self._persisted_context_len = len(self.session_context)
+
+    def _enhanced_story_generation(self, action, roll_info, success, recent_events, relationships,
+                                   relevant_events=(), memories=()):
         """Enhanced story generation with persistent world context"""
         
         # Build context from persistent data
@@ -179,7 +242,18 @@ class GameSession:
             context_additions.append("RECENT EVENTS:")
             for event in recent_events[:3]:  # Last 3 events
                 context_additions.append(f"- {event['event_type']}: {event['description'][:100]}...")
-        
+
+        relevant_events = [event for event in relevant_events if event not in recent_events[:3]]
+        if relevant_events:
+            context_additions.append("\nRELEVANT PAST EVENTS:")
+            for event in relevant_events:
+                context_additions.append(f"- {event['event_type']}: {event['description'][:100]}...")
+
+        if memories:
+            context_additions.append("\nRELATED MEMORIES:")
+            for memory in memories:
+                context_additions.append(f"- {memory.kind}: {memory.text[:200]}")
+
         if relationships:
             context_additions.append("\nNPC RELATIONSHIPS:")
             for rel in relationships[:5]:  # Top 5 relationships
@@ -195,7 +269,8 @@ class GameSession:
         if context_additions:
             enhanced_context += "\n\n--- AI MEMORY CONTEXT ---\n" + "\n".join(context_additions) + "\n--- END CONTEXT ---\n"
         
-        return self.story.story_agent(
+        return self._narrate(
+            self.story.story_agent, self.story.stream_story_agent,
             enhanced_context, action,
             roll_info.get('roll_needed'),
             roll_info.get('roll_type'),
@@ -203,6 +278,14 @@ class GameSession:
             success
         )
 
+    def _narrate(self, generate, stream, *args):
+        """A story reply; with streaming on it's shown as it's written and returned once complete"""
+        if not cli.STREAM_NARRATION:
+            return generate(*args)
+        reply = stream(*args)
+        cli.ui_display_dm_narration(reply)
+        return reply.json()
+
     def _update_relationships_from_interaction(self, player_action, dm_response):
         """Analyze interaction and update NPC relationships"""
         # Simple heuristic - you could make this more sophisticated with AI analysis
@@ -223,10 +306,14 @@ class GameSession:
         elif negative_count > positive_count:
             relationship_change = negative_count * -10  # -10 per negative word
         
-        # Update relationships for all current NPCs
+        # Update relationships for all current NPCs in one statement
         if relationship_change != 0 and self.current_npcs:
+            changes = [(npc["name"], relationship_change, interaction_desc) for npc in self.current_npcs]
+            if self.journal:
+                self.journal.update_npc_relationships(self.campaign_id, self.character_id, changes)
+            else:
+                update_npc_relationships(self.campaign_id, self.character_id, changes)
             for npc in self.current_npcs:
-                update_npc_relationship(self.campaign_id, npc["name"], self.character_id, relationship_change, interaction_desc)
                 print(f"📊 Updated relationship with {npc['name']}: {relationship_change:+d}")
 
     def _build_relationship_context(self, relationships):
@@ -295,6 +382,7 @@ class GameSession:
         # Clear session data for clean restart
         self.current_npcs = []
         self.session_context = ""
+        self._start_context_session()
         self.last_dm_text = ""
         self.in_combat = False
         
@@ -308,7 +396,8 @@ class GameSession:
         self.current_npcs = []
         
         # Generate post-combat story continuation
-        post_combat_story = self.story.story_agent(
+        post_combat_story = self._narrate(
+            self.story.story_agent, self.story.stream_story_agent,
             self.session_context, 
             "I have won the battle", 
             False, None, None, "Victory achieved"
@@ -0,0 +1,104 @@
+"""
+Turn analysis: does the player's action start combat, and does it need a roll?
+
+Both questions are asked about the same two texts - the DM's last narration
+and the player's response - so by default they're answered by one structured
+call instead of two serial ones:
+
+    turn = analyze_turn_ai(last_dm_text, player_response)
+    turn["combat"], turn["roll_needed"], turn["dice_type"], turn["roll_type"], turn["dc"]
+
+TURN_ANALYSIS picks the strategy (see .env.example):
+
+    unified    one call answering both (default)
+    parallel   the separate combat and roll prompts, sent at the same time
+
+A unified reply that leaves out `combat`, or leaves out `roll_needed` without
+saying combat has started, falls back to the parallel calls.
+
+Before either, the local combat detector (services/combat_detector.py) gets
+a look: an obvious fight needs no LLM call at all, an obviously peaceful turn
+only needs the roll question answered, and one that is plainly dialogue,
+trade or travel with no check involved needs no call either.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from bots import llm_gateway
+from services import combat_detector
+from services.combat_system import analyze_combat_state_llm
+from utils.debug_util import debug_log
+from utils.dice_utility import DiceUtility
+
+_SYSTEM_PROMPT = (
+    "You are a Dungeon Master assistant. Given the Dungeon Master's last narration and the "
+    "player's response, decide two things.\n"
+    "1. combat: true if combat has started or is ongoing, otherwise false.\n"
+    "2. Whether the player's action needs a dice roll (ignored when combat is true):\n"
+    "- roll_needed: true or false\n"
+    "- dice_type: e.g., d20, d6\n"
+    "- roll_type: the type of roll needed, e.g., 'Persuasion', 'Attack', 'Stealth', 'Perception', etc.\n"
+    "- roll_reason: a short explanation\n"
+    "- dc: a numeric Difficulty Class (DC) based on the situation\n\n"
+    "Respond in JSON only, with exactly the keys combat, roll_needed, dice_type, roll_type, roll_reason, dc."
+)
+
+_dice = DiceUtility()
+
+def turn_analysis_mode():
+    mode = os.getenv("TURN_ANALYSIS", "unified").lower()
+    if mode not in ("unified", "parallel"):
+        raise ValueError(f"Unknown TURN_ANALYSIS: {mode!r} (use unified or parallel)")
+    return mode
+
+def analyze_turn_ai(last_dm_text: str, player_response: str) -> dict:
+    """Combat state and roll requirements for the player's action, as one dict"""
+    debug_log("analyze_turn_ai() called.")
+    combat = combat_detector.detector.fast_verdict(
+        last_dm_text, player_response, ask_llm=lambda: analyze_combat_state_llm(last_dm_text, player_response))
+    if combat is True:
+        return _normalized({"combat": True, "roll_needed": False})
+    if combat is False:
+        if combat_detector.detector.roll_free(player_response):
+            return _normalized({"combat": False, "roll_needed": False, "roll_reason": "No check needed"})
+        return _normalized({**_dice.analyze_for_roll(last_dm_text, player_response), "combat": False})
+
+    if turn_analysis_mode() == "unified":
+        user_prompt = (
+            f"Dungeon Master's Narration text:\n{last_dm_text}\n\n"
+            f"Player's Response:\n{player_response}\n\n"
+            "Is combat happening, and does the player's action need a roll?"
+        )
+        turn = llm_gateway.chat_json(_SYSTEM_PROMPT, user_prompt)
+        if _complete(turn):
+            return _normalized(turn)
+        debug_log(f"Unified turn analysis left fields out ({turn}); asking separately.")
+    return _analyze_turn_parallel(last_dm_text, player_response)
+
+def _complete(turn):
+    """Roll fields are ignored once combat starts, so only a quiet turn needs roll_needed"""
+    if "combat" not in turn:
+        return False
+    return "roll_needed" in turn or _flag(turn["combat"])
+
+def _analyze_turn_parallel(last_dm_text, player_response):
+    """The separate combat and roll calls, in flight together"""
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        combat = pool.submit(analyze_combat_state_llm, last_dm_text, player_response)
+        roll_info = pool.submit(_dice.analyze_for_roll, last_dm_text, player_response)
+        return _normalized({**roll_info.result(), "combat": combat.result()})
+
+def _flag(value):
+    return value.strip().lower() == "true" if isinstance(value, str) else bool(value)
+
+def _normalized(turn):
+    """JSON booleans can come back as strings; a roll always needs a dice type and DC"""
+    turn = {**turn, "combat": _flag(turn.get("combat")), "roll_needed": _flag(turn.get("roll_needed"))}
+    if turn["roll_needed"]:
+        turn["dice_type"] = turn.get("dice_type") or "d20"
+        try:
+            turn["dc"] = int(turn.get("dc"))
+        except (TypeError, ValueError):
+            turn["dc"] = 10
+    return turn
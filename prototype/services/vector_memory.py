@@ -0,0 +1,336 @@
+"""
+Vector memory: embedding search over a campaign's events and NPC backstories
+
+The story agent gets the memories most similar to what the player is doing,
+not just the newest ones:
+
+    memory = get_vector_memory()          # None when VECTOR_MEMORY_EMBEDDER=off
+    memory.add_event(campaign_id, description, player_actions="I open the crypt")
+    memory.add_npc(campaign_id, npc)
+    memory.search(campaign_id, "who guards the crypt?", k=3)  # -> [Memory, ...]
+
+Each campaign has its own index: a float32 NumPy matrix of unit vectors,
+searched with one matrix-vector product and an argpartition top-k. It is
+persisted next to the game as two append-only files per campaign (raw
+vectors and JSON lines of metadata), so adding a memory writes one row
+instead of rewriting the index. A campaign with no index yet is filled from
+its stored events (a page at a time) and its NPCs on first use.
+
+Embedders are pluggable - anything with a `name`, a `dim` and
+`embed(texts) -> ndarray` works:
+
+    hashing   deterministic feature hashing, offline and fast (default)
+    openai    OpenAI embeddings API (VECTOR_MEMORY_MODEL)
+    off       no vector memory
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from db.db import get_npcs_at_location, page_events
+from db.rows import search_terms
+from bots import llm_gateway
+
+# Events embedded per request while backfilling; well under the embeddings API's 2048 inputs
+_BACKFILL_PAGE = 500
+
+@dataclass(slots=True)
+class Memory:
+    kind: str  # "event" or "npc"
+    text: str
+    score: float
+    metadata: dict = field(default_factory=dict)
+
+# =============================================================================
+# EMBEDDERS
+# =============================================================================
+
+def _unit_rows(vectors):
+    """Scale each row to length 1 (zero rows stay zero)"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+class HashingEmbedder:
+    """
+    Feature-hashing embedder: words, word pairs and word prefixes hashed into
+    `dim` signed buckets. Needs no model or network and gives the same vector
+    for the same text in every process, so persisted indexes stay valid.
+    """
+
+    def __init__(self, dim=256):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text):
+        words = search_terms(text)
+        features = list(words)
+        features += [f"{a} {b}" for a, b in zip(words, words[1:])]
+        # Prefixes let "goblins" and "goblin" share a bucket without a stemmer
+        features += [f"{word[:5]}~" for word in words if len(word) > 5]
+        return features
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+                sign = 1.0 if digest >> 63 else -1.0
+                vectors[row, digest % self.dim] += sign
+        return _unit_rows(vectors)
+
+class OpenAIEmbedder:
+    """Embeddings from the OpenAI API, over the LLM gateway's shared connection pool"""
+
+    def __init__(self, model="text-embedding-3-small", dim=1536, client=None):
+        self.dim = dim
+        self.model = model
+        self.name = f"openai-{model}-{dim}"
+        self._client = client
+
+    def embed(self, texts):
+        if self._client is None:
+            # Same HTTP client as the chat calls; backfills are batch work, so the SDK may retry them
+            self._client = llm_gateway.get_gateway().client.with_options(max_retries=2)
+        response = self._client.embeddings.create(model=self.model, input=list(texts), dimensions=self.dim)
+        return _unit_rows(np.array([item.embedding for item in response.data], dtype=np.float32))
+
+def embedder_from_env():
+    """The embedder named by VECTOR_MEMORY_EMBEDDER, or None when it's off"""
+    kind = os.getenv("VECTOR_MEMORY_EMBEDDER", "hashing").lower()
+    if kind == "off":
+        return None
+    if kind == "hashing":
+        return HashingEmbedder(int(os.getenv("VECTOR_MEMORY_DIM", "256")))
+    if kind == "openai":
+        return OpenAIEmbedder(os.getenv("VECTOR_MEMORY_MODEL", "text-embedding-3-small"),
+                              int(os.getenv("VECTOR_MEMORY_DIM", "1536")))
+    raise ValueError(f"Unknown VECTOR_MEMORY_EMBEDDER: {kind!r} (use hashing, openai or off)")
+
+# =============================================================================
+# PER-CAMPAIGN INDEX
+# =============================================================================
+
+class CampaignIndex:
+    """
+    One campaign's memories: a growable (n, dim) float32 matrix plus one
+    metadata dict per row, mirrored to <campaign_id>.f32 / <campaign_id>.jsonl
+    """
+
+    def __init__(self, path, embedder):
+        self.embedder = embedder
+        self.vectors_path = path + ".f32"
+        self.entries_path = path + ".jsonl"
+        self.lock = threading.Lock()
+        self.entries = []
+        self.keys = set()
+        self._vectors = np.empty((64, embedder.dim), dtype=np.float32)
+        self.loaded_from_disk = self._load()
+        self._on_disk = self.loaded_from_disk  # False: the files are missing or for another embedder
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _load(self):
+        """Read the persisted index; False (and start empty) if there is none or it's for another embedder"""
+        if not os.path.exists(self.entries_path) or not os.path.exists(self.vectors_path):
+            return False
+        with open(self.entries_path, encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("embedder") != self.embedder.name:
+                return False
+            entries = [json.loads(line) for line in f if line.strip()]
+
+        vectors = np.fromfile(self.vectors_path, dtype=np.float32)
+        vectors = vectors[:len(vectors) - len(vectors) % self.embedder.dim].reshape(-1, self.embedder.dim)
+        # A crash between the two appends leaves one file a row ahead; keep what both have
+        count = min(len(entries), len(vectors))
+        self._reserve(count)
+        self._vectors[:count] = vectors[:count]
+        self.entries = entries[:count]
+        self.keys = {entry["key"] for entry in self.entries if entry.get("key")}
+        if count != len(entries) or count != len(vectors):
+            self._rewrite()
+        return True
+
+    def _reserve(self, count):
+        if count > len(self._vectors):
+            grown = np.empty((max(count, 2 * len(self._vectors)), self.embedder.dim), dtype=np.float32)
+            grown[:len(self.entries)] = self._vectors[:len(self.entries)]
+            self._vectors = grown
+
+    def _rewrite(self):
+        """Write the whole index out again (new embedder, or repairing a torn append)"""
+        os.makedirs(os.path.dirname(self.entries_path) or ".", exist_ok=True)
+        with open(self.entries_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"embedder": self.embedder.name, "dim": self.embedder.dim}) + "\n")
+            for entry in self.entries:
+                f.write(json.dumps(entry, default=str) + "\n")
+        self._vectors[:len(self.entries)].tofile(self.vectors_path)
+
+    def add(self, entries, vectors):
+        """
+        Append rows in memory and on disk; entries whose key is already indexed
+        are skipped. Returns the entries added.
+        """
+        with self.lock:
+            fresh = [i for i, entry in enumerate(entries) if not entry.get("key") or entry["key"] not in self.keys]
+            if not fresh:
+                return []
+            entries = [entries[i] for i in fresh]
+            vectors = np.ascontiguousarray(vectors[fresh], dtype=np.float32)
+
+            if not self._on_disk:
+                self._rewrite()
+                self._on_disk = True
+            start = len(self.entries)
+            self._reserve(start + len(entries))
+            self._vectors[start:start + len(entries)] = vectors
+            self.entries.extend(entries)
+            self.keys.update(entry["key"] for entry in entries if entry.get("key"))
+
+            with open(self.vectors_path, "ab") as f:
+                vectors.tofile(f)
+            with open(self.entries_path, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(entry, default=str) + "\n" for entry in entries)
+            return entries
+
+    def search(self, query_vector, k, kind=None, min_score=0.0):
+        """Top-k (score, entry) pairs by cosine similarity, best first"""
+        with self.lock:
+            count = len(self.entries)
+            if count == 0 or k <= 0:
+                return []
+            scores = self._vectors[:count] @ query_vector
+            if kind is not None:
+                scores = np.where([entry["kind"] == kind for entry in self.entries], scores, -np.inf)
+
+            k = min(k, count)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(float(scores[i]), self.entries[i]) for i in top if scores[i] > min_score]
+
+# =============================================================================
+# MEMORY STORE
+# =============================================================================
+
+def _event_text(description, player_actions=None, consequences=None):
+    parts = [f"Player: {player_actions}" if player_actions else "", description or "",
+             consequences if consequences and consequences != "No result required" else ""]
+    return "\n".join(part for part in parts if part)
+
+class VectorMemory:
+    """Per-campaign vector indexes under one directory, loaded on first use"""
+
+    def __init__(self, embedder, directory="vector_memory"):
+        self.embedder = embedder
+        self.directory = directory
+        self._indexes = {}
+        self._lock = threading.RLock()  # held while a campaign's index loads
+        self._stats = {"events_added": 0, "npcs_added": 0, "searches": 0, "search_seconds": 0.0}
+
+    def index(self, campaign_id):
+        """
+        The campaign's index, loaded from disk (or backfilled from stored
+        events and NPCs) on first use. Load it before saving new events, or the
+        backfill will pick them up as well as add_event().
+        """
+        campaign_id = str(campaign_id)
+        with self._lock:
+            index = self._indexes.get(campaign_id)
+            if index is None:
+                index = CampaignIndex(os.path.join(self.directory, campaign_id), self.embedder)
+                self._indexes[campaign_id] = index
+                if not index.loaded_from_disk:
+                    self._backfill(campaign_id, index)
+        return index
+
+    def _backfill(self, campaign_id, index):
+        """
+        Index a campaign's stored events, oldest first, the first time it's
+        searched here - one page at a time, so neither memory nor a single
+        embedding request grows with the campaign - then the living NPCs at
+        every location those events took place in
+        """
+        locations = {"Starting Area"}
+        cursor = None
+        while True:
+            events, cursor = page_events(campaign_id, cursor=cursor, limit=_BACKFILL_PAGE, oldest_first=True)
+            if events:
+                self._add(index, [self._event_entry(event.description, event.player_actions, event.consequences,
+                                                    event.event_type, event.location, event.created_at)
+                                  for event in events])
+                locations.update(event.location for event in events if event.location)
+            if not cursor:
+                break
+
+        for location in sorted(locations):
+            self.add_npcs(campaign_id, get_npcs_at_location(campaign_id, location, status="alive"), index)
+
+    def _event_entry(self, description, player_actions, consequences, event_type, location, created_at):
+        return {"kind": "event", "text": _event_text(description, player_actions, consequences),
+                "event_type": event_type, "location": location, "created_at": created_at}
+
+    def _add(self, index, entries):
+        added = index.add(entries, self.embedder.embed([entry["text"] for entry in entries]))
+        with self._lock:
+            for entry in added:
+                self._stats["events_added" if entry["kind"] == "event" else "npcs_added"] += 1
+
+    def add_event(self, campaign_id, description, player_actions=None, consequences=None,
+                  event_type=None, location_name=None, **_):
+        """Remember a saved event (accepts save_event()'s keyword arguments)"""
+        entry = self._event_entry(description, player_actions, consequences, event_type,
+                                  location_name, time.strftime("%Y-%m-%d %H:%M:%S"))
+        self._add(self.index(campaign_id), [entry])
+
+    def add_npcs(self, campaign_id, npcs, index=None):
+        """Remember NPCs by their backstory; each NPC name is indexed once per campaign"""
+        entries = [{"kind": "npc", "key": f"npc:{npc['name']}", "name": npc["name"],
+                    "text": f"{npc['name']} ({npc.get('class', '')}): {npc.get('backstory') or ''}".strip()}
+                   for npc in npcs if npc.get("name")]
+        if entries:
+            self._add(self.index(campaign_id) if index is None else index, entries)
+
+    def add_npc(self, campaign_id, npc):
+        self.add_npcs(campaign_id, [npc])
+
+    def search(self, campaign_id, query, k=5, kind=None, min_score=0.05):
+        """The `k` memories most similar to `query`, best first"""
+        index = self.index(campaign_id)
+        started = time.perf_counter()
+        query_vector = self.embedder.embed([query])[0]
+        hits = index.search(query_vector, k, kind=kind, min_score=min_score)
+        with self._lock:
+            self._stats["searches"] += 1
+            self._stats["search_seconds"] += time.perf_counter() - started
+
+        return [Memory(entry["kind"], entry["text"], score,
+                       {key: value for key, value in entry.items() if key not in ("kind", "text", "key")})
+                for score, entry in hits]
+
+    def stats(self):
+        with self._lock:
+            indexed = sum(len(index) for index in self._indexes.values())
+            return {**self._stats, "campaigns_loaded": len(self._indexes),
+                    "memories_loaded": indexed, "embedder": self.embedder.name}
+
+_memory = None
+_memory_lock = threading.Lock()
+
+def get_vector_memory():
+    """The process-wide vector memory; None when VECTOR_MEMORY_EMBEDDER=off"""
+    global _memory
+    if _memory is None:
+        embedder = embedder_from_env()
+        if embedder is None:
+            return None
+        with _memory_lock:
+            if _memory is None:
+                _memory = VectorMemory(embedder, os.getenv("VECTOR_MEMORY_DIR", "vector_memory"))
+    return _memory
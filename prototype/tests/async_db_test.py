@@ -0,0 +1,134 @@
+"""
+Tests for the asyncio database layer (db/async_db.py)
+
+The placeholder expansion runs anywhere; the parity test needs a scratch
+Postgres database in TEST_DATABASE_URL (see tests/db_query_plans_test.py)
+and checks every async read returns exactly what its sync twin does.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import asyncio
+
+import psycopg2
+import pytest
+
+from db import async_db
+from db import cache
+from db import postgres_backend as pg_db
+from db.db_schema import SCHEMA_SQL
+
+TEST_DB_URL = os.getenv("TEST_DATABASE_URL")
+
+def goblin(name, **overrides):
+    npc = {"name": name, "class": "Goblin", "hp": 7, "ac": 12, "strength": 8,
+           "dexterity": 14, "constitution": 10, "intelligence": 8, "wisdom": 8,
+           "charisma": 8, "level": 1}
+    npc.update(overrides)
+    return npc
+
+def test_expand_values():
+    """One placeholder group (or template) per row, parameters flattened in row order"""
+    sql, params = async_db._expand_values("INSERT INTO t (a, b) VALUES %s RETURNING a;", [(1, "x"), (2, "y")])
+    assert sql == "INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s) RETURNING a;"
+    assert params == [1, "x", 2, "y"]
+
+    sql, params = async_db._expand_values("INSERT INTO t (a, at) VALUES %s;", [(1, 5), (2, 0)],
+                                          template="(%s, now() - make_interval(secs => %s))")
+    assert sql == ("INSERT INTO t (a, at) VALUES (%s, now() - make_interval(secs => %s)), "
+                   "(%s, now() - make_interval(secs => %s));")
+    assert params == [1, 5, 2, 0]
+    print("✅ Bulk VALUES expansion works")
+
+def test_pool_needs_a_postgres_url(monkeypatch):
+    """Without a postgresql:// URL the pool refuses to open, and says why"""
+    monkeypatch.setattr(pg_db, "DB_URL", None)
+    with pytest.raises(ValueError, match="postgresql://"):
+        asyncio.run(async_db.get_async_pool())
+    monkeypatch.setattr(pg_db, "DB_URL", "sqlite:///game.sqlite3")
+    with pytest.raises(ValueError, match="sqlite:///game.sqlite3"):
+        asyncio.run(async_db.get_async_pool())
+    print("✅ Async pool needs a Postgres URL")
+
+def _can_connect(url):
+    try:
+        psycopg2.connect(url).close()
+        return True
+    except Exception:
+        return False
+
+@pytest.mark.skipif(not TEST_DB_URL or not _can_connect(TEST_DB_URL),
+                    reason="TEST_DATABASE_URL is not set or not reachable")
+def test_async_reads_match_sync(monkeypatch):
+    """Each async read returns the same records, ids and cursors as the sync one on the same data"""
+    conn = psycopg2.connect(TEST_DB_URL)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(SCHEMA_SQL)
+    monkeypatch.setattr(pg_db, "DB_URL", TEST_DB_URL)
+    pg_db.close_pool()
+    cache.configure(max_size=0)  # sync reads must come from the database too
+
+    async def compare():
+        user_id = await async_db.get_or_create_user("async-player")
+        assert user_id == pg_db.get_or_create_user("async-player")
+        campaign_id = await async_db.create_campaign("Async", "", user_id)
+        pg_db.create_campaign("Sync", "", user_id)
+        character_id = await async_db.create_character(campaign_id, user_id, "Hero", "Fighter")
+        await async_db.save_npcs_bulk(campaign_id, [goblin("Grik"), goblin("Snag", hp=3)], "Cave")
+        pg_db.save_npc(campaign_id, goblin("Mira", **{"class": "Priest"}), "Cave")
+        await async_db.save_events_bulk([
+            {"campaign_id": campaign_id, "event_type": "interaction", "description": f"Goblin turn {turn}",
+             "location_name": "Cave", "session_id": campaign_id, "turn_number": turn,
+             "context_delta": f"\nPlayer: turn {turn}", "seconds_ago": 10 - turn}
+            for turn in range(1, 8)])
+        pg_db.save_event(campaign_id, "combat", "The goblins attack", "Cave")
+        await async_db.update_npc_relationships(campaign_id, character_id, [("Grik", 5, "Player: hi"),
+                                                                           ("Mira", -3, "Player: rude")])
+        pg_db.update_npc_relationship(campaign_id, "Grik", character_id, 2, "Player: waves")
+
+        with conn.cursor() as cur:
+            cur.execute("SELECT event_id FROM events WHERE campaign_id = %s AND turn_number = 5;", (campaign_id,))
+            event_id = cur.fetchone()[0]
+
+        checks = [
+            ("get_user_by_username", ("async-player",)),
+            ("list_campaigns", (user_id,)),
+            ("page_campaigns", (user_id, None, 1)),
+            ("get_most_recent_campaign", (user_id,)),
+            ("campaign_exists", (campaign_id,)),
+            ("get_character_in_campaign", (campaign_id, user_id)),
+            ("get_npcs_at_location", (campaign_id, "Cave")),
+            ("get_event_context", (event_id,)),
+            ("get_recent_events", (campaign_id, 5)),
+            ("page_events", (campaign_id, None, 3)),
+            ("page_events", (campaign_id, None, 3, True)),
+            ("search_events", (campaign_id, "goblin turn")),
+            ("get_npc_relationships", (campaign_id, character_id)),
+            ("page_npc_relationships", (campaign_id, character_id, None, 1)),
+        ]
+        for name, args in checks:
+            expected = getattr(pg_db, name)(*args)
+            assert expected, name  # nothing vacuous
+            assert await getattr(async_db, name)(*args) == expected, name
+            if name.startswith("page_") and expected[1]:
+                # The next page, from the sync layer's cursor (the None in args)
+                follow = tuple(expected[1] if arg is None else arg for arg in args)
+                assert await getattr(async_db, name)(*follow) == getattr(pg_db, name)(*follow), name
+
+        relationship = pg_db.get_npc_relationships(campaign_id, character_id)[0]
+        history = pg_db.get_relationship_history(relationship.relationship_id, limit=1)
+        assert await async_db.get_relationship_history(relationship.relationship_id, limit=1) == history
+        assert await async_db.get_relationship_history(relationship.relationship_id, before=history[-1]) == \
+            pg_db.get_relationship_history(relationship.relationship_id, before=history[-1])
+        assert isinstance(campaign_id, str) and isinstance(relationship.relationship_id, str)
+        await async_db.close_async_pool()
+
+    try:
+        asyncio.run(compare())
+    finally:
+        pg_db.close_pool()
+        cache.configure(**cache.cache_config_from_env())
+        conn.close()
+    print("✅ Async reads match the sync layer")
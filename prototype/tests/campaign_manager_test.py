@@ -0,0 +1,60 @@
+"""
+Tests for the campaign menu's user lookups (services/campaign_manager.py)
+
+Runs against the embedded SQLite backend, counting queries with db/instrumentation.py.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+
+from db import db
+from db import instrumentation
+from db import sqlite_backend as sqlite_db
+from services.campaign_manager import CampaignManager, user_id_for
+
+pytestmark = pytest.mark.skipif(db.backend_for_url(db.DB_URL) != "sqlite",
+                                reason="campaign manager tests run on the SQLite backend")
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    """A campaign manager over a fresh SQLite database, with an empty user id cache"""
+    sqlite_db.close_pool()
+    monkeypatch.setattr(sqlite_db, "DB_URL", f"sqlite:///{tmp_path / 'game.sqlite3'}")
+    user_id_for.cache_clear()
+    instrumentation.reset()
+    instrumentation.enable()
+    yield CampaignManager()
+    instrumentation.disable()
+    instrumentation.reset()
+    user_id_for.cache_clear()
+    sqlite_db.close_pool()
+
+def _users_queries():
+    stats = instrumentation.stats()
+    lookups = sum(stats["functions"].get(name, {}).get("calls", 0)
+                  for name in ("get_or_create_user", "get_user_by_username", "create_user"))
+    statements = sum(metric["calls"] for query, metric in stats["statements"].items()
+                     if "from users" in query.lower() or "into users" in query.lower())
+    return lookups, statements
+
+def test_menu_navigation_skips_the_users_table(manager, tmp_path, monkeypatch):
+    """After the first lookup, listing, paging and creating campaigns never query users"""
+    manager.create_new_campaign("First", "player")
+    first_lookup = _users_queries()
+    assert first_lookup[0] == 1 and first_lookup[1] >= 1
+
+    manager.list_user_campaigns("player")
+    manager.page_user_campaigns("player")
+    manager.get_most_recent_campaign_for_user("player")
+    manager.create_new_campaign("Second", "player")
+    assert _users_queries() == first_lookup
+
+    # A recreated users table must not be served stale ids
+    user_id = user_id_for("player")
+    user_id_for.cache_clear()
+    sqlite_db.close_pool()
+    monkeypatch.setattr(sqlite_db, "DB_URL", f"sqlite:///{tmp_path / 'fresh.sqlite3'}")
+    assert user_id_for("player") != user_id
+    print("✅ Menu navigation reuses the cached user id")
@@ -0,0 +1,83 @@
+"""
+Round-trip test for campaign export / import (db/campaign_transfer.py)
+
+Recreates every table, so it only runs against TEST_DATABASE_URL:
+
+    TEST_DATABASE_URL=postgresql://postgres:pw@localhost:5432/agentic_dnd_test \
+        python -m pytest prototype/tests/campaign_transfer_test.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import psycopg2
+import pytest
+
+from db import postgres_backend as pg_db
+from db.campaign_transfer import export_campaign, import_campaign
+from db.db_schema import SCHEMA_SQL
+
+TEST_DB_URL = os.getenv("TEST_DATABASE_URL")
+
+def _can_connect(url):
+    try:
+        psycopg2.connect(url).close()
+        return True
+    except Exception:
+        return False
+
+pytestmark = pytest.mark.skipif(not TEST_DB_URL or not _can_connect(TEST_DB_URL),
+                                reason="TEST_DATABASE_URL is not set or not reachable")
+
+@pytest.fixture
+def empty_db(monkeypatch):
+    conn = psycopg2.connect(TEST_DB_URL)
+    conn.autocommit = True
+    conn.cursor().execute(SCHEMA_SQL)
+    monkeypatch.setattr(pg_db, "DB_URL", TEST_DB_URL)
+    pg_db.close_pool()
+    yield conn
+    pg_db.close_pool()
+    conn.close()
+
+def test_campaign_round_trip(empty_db, tmp_path):
+    """Every row comes back, archived events included, with users matched by username"""
+    user_id = pg_db.get_or_create_user("exporter")
+    campaign_id = pg_db.create_campaign("Goblin War", "Tabs\tand\nnewlines \\ survive", user_id)
+    character_id = pg_db.create_character(campaign_id, user_id, "Hero", "Fighter")
+    pg_db.save_npcs_bulk(campaign_id, [{"name": f"Goblin {i}", "class": "Goblin", "hp": 7, "ac": 12,
+                                        "strength": 8, "dexterity": 14, "constitution": 10,
+                                        "intelligence": 8, "wisdom": 8, "charisma": 8, "level": 1}
+                                       for i in range(3)], "Cave")
+    pg_db.save_events_bulk([{"campaign_id": campaign_id, "event_type": "interaction",
+                             "description": f"Turn {turn}", "location_name": "Cave",
+                             "session_id": campaign_id, "turn_number": turn, "context_delta": f"{turn} ",
+                             "seconds_ago": 200 - turn}
+                            for turn in range(1, 201)])
+    pg_db.update_npc_relationships(campaign_id, character_id, [("Goblin 1", 5, "Player: hi")])
+    pg_db.set_event_retention(campaign_id, 50)
+    pg_db.apply_event_retention(campaign_id)
+
+    path = str(tmp_path / "campaign.dndcamp.gz")
+    exported = export_campaign(campaign_id, path)
+    assert exported["events"] == 50 and exported["events_archive"] == 150
+
+    with pytest.raises(ValueError):
+        import_campaign(path)
+
+    # Move to a "new" database: same username, different user id
+    cur = empty_db.cursor()
+    cur.execute("DELETE FROM events_archive; DELETE FROM users;")
+    new_user_id = pg_db.get_or_create_user("exporter")
+    assert import_campaign(path) == exported
+
+    assert pg_db.list_campaigns(new_user_id)[0].description == "Tabs\tand\nnewlines \\ survive"
+    assert pg_db.get_character_in_campaign(campaign_id, new_user_id).character_id == character_id
+    assert len(pg_db.get_npcs_at_location(campaign_id, "Cave")) == 3
+    assert pg_db.get_npc_relationships(campaign_id, character_id)[0].relationship_score == 5
+    events, _ = pg_db.page_events(campaign_id, limit=500)
+    assert len(events) == 200 and events[0].description == "Turn 200"
+    assert pg_db.search_events(campaign_id, "turn 7")[0].description == "Turn 7"
+
+    assert import_campaign(path, replace=True) == exported
+    print("✅ Campaign export/import round-trips")
@@ -0,0 +1,86 @@
+"""
+Tests for the local combat fast path (services/combat_detector.py)
+
+The LLM is replaced with fakes, so no API key or network is needed.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import json
+import time
+
+from services.combat_detector import CombatDetector
+from services import combat_system, turn_analysis
+
+def test_obvious_turns_skip_the_llm():
+    """Clear-cut turns are decided locally; uncertain or contradictory ones defer"""
+    detector = CombatDetector()
+    assert detector.fast_verdict("You stand in the market square.", "I look around") is False
+    assert detector.fast_verdict("The innkeeper smiles at you.", "I talk to the innkeeper") is False
+    assert detector.fast_verdict("A goblin blocks the road.", "I attack the goblin") is True
+    assert detector.fast_verdict("The orc snarls. Roll for initiative!", "I hold my ground") is True
+    assert detector.fast_verdict("The guard eyes you.", "I do not attack, I raise my hands") is False
+
+    assert detector.fast_verdict("The goblin lunges at you!", "I look around") is None
+    assert detector.fast_verdict("The bandit wants your coin.", "I tell him to leave and draw my sword") is None
+    assert detector.fast_verdict("The road runs north.", "I go north") is None
+
+    stats = detector.stats()
+    assert stats["checks"] == 8 and stats["fast_combat"] == 2 and stats["fast_no_combat"] == 3
+    assert stats["deferred"] == 3 and stats["hit_rate"] == 0.625
+    print("✅ Obvious turns skip the LLM")
+
+def test_sampled_disagreements_are_recorded(tmp_path):
+    """Sampled confident answers are checked against the LLM and disagreements logged"""
+    log_path = tmp_path / "fast_path.jsonl"
+    detector = CombatDetector(sample_rate=1.0, log_path=str(log_path))
+    llm_calls = []
+
+    def llm_says_combat():
+        llm_calls.append(1)
+        return True
+
+    assert detector.decide("The tavern is quiet.", "I buy an ale", llm_says_combat) is False
+    assert detector.decide("The road runs north.", "I go north", llm_says_combat) is True  # deferred
+
+    deadline = time.monotonic() + 5
+    while detector.stats()["disagreements"] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    stats = detector.stats()
+    assert stats["sampled"] == 1 and stats["disagreements"] == 1 and stats["disagreement_rate"] == 1.0
+    assert len(llm_calls) == 2
+    record = json.loads(log_path.read_text().splitlines()[0])
+    assert record["player_action"] == "I buy an ale" and record["fast_verdict"] is False and record["llm_verdict"] is True
+    print("✅ Sampled disagreements are recorded")
+
+def test_turn_analysis_uses_the_fast_path(monkeypatch):
+    """An obvious attack needs no LLM call; an obviously quiet turn only asks about rolls"""
+    monkeypatch.setattr(combat_system.combat_detector, "detector", CombatDetector(sample_rate=0))
+    monkeypatch.setattr(turn_analysis.llm_gateway, "chat_json", lambda *args, **kwargs: 1 / 0)
+    monkeypatch.setattr(turn_analysis._dice, "analyze_for_roll",
+                        lambda last_dm_text, player_input="": {"roll_needed": True, "dice_type": "d20",
+                                                               "roll_type": "Perception", "dc": 12})
+
+    assert turn_analysis.analyze_turn_ai("A goblin blocks the road.", "I attack the goblin")["combat"] is True
+    turn = turn_analysis.analyze_turn_ai("You stand in the market square.", "I look around")
+    assert turn["combat"] is False and turn["roll_type"] == "Perception"
+    assert combat_system.analyze_combat_state_ai("The innkeeper smiles at you.", "I talk to the innkeeper") is False
+    print("✅ Turn analysis takes the fast path on obvious turns")
+
+def test_quiet_roll_free_turn_makes_no_llm_call(monkeypatch):
+    """Plain dialogue or travel on a quiet turn is settled without a single chat_json call"""
+    calls = []
+    monkeypatch.setattr(combat_system.combat_detector, "detector", CombatDetector(sample_rate=0))
+    monkeypatch.setattr(turn_analysis.llm_gateway, "chat_json", lambda *args, **kwargs: calls.append(args) or {})
+
+    turn = turn_analysis.analyze_turn_ai("The innkeeper smiles at you.", "I talk to the innkeeper")
+    assert turn["combat"] is False and turn["roll_needed"] is False and calls == []
+    assert turn_analysis.analyze_turn_ai("The market is quiet.", "I walk to the inn")["roll_needed"] is False
+    assert calls == [] and combat_system.combat_detector.detector.stats()["fast_no_roll"] == 2
+
+    # A peaceful action that may need a check still asks
+    turn_analysis.analyze_turn_ai("The guard eyes you.", "I try to persuade the guard")
+    turn_analysis.analyze_turn_ai("You stand in the market square.", "I look around")
+    assert len(calls) == 2
+    print("✅ Quiet roll-free turns make no LLM call")
@@ -0,0 +1,71 @@
+"""
+Tests for in-game commands (utils/command_handler.py)
+
+Database reads and LLM narration are replaced with fakes.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from types import SimpleNamespace
+
+import cli
+from services import combat_system
+from services.combat_system import CombatManager, handle_player_turn
+from utils import command_handler
+from utils.command_handler import CommandHandler
+
+def _session():
+    return SimpleNamespace(campaign_id="campaign-1", character_id="character-1", player_name="Hero",
+                           current_location="Starting Area")
+
+def test_search_command_reaches_search_events(monkeypatch):
+    """/search queries the campaign history; a plain "search ..." is left as a player action"""
+    searches = []
+    monkeypatch.setattr(command_handler, "search_events",
+                        lambda campaign_id, query, limit=8: searches.append((campaign_id, query)) or [])
+    handler = CommandHandler(game_session=_session())
+
+    assert handler.handle_command("/search goblin ambush", context="story") is True
+    assert searches == [("campaign-1", "goblin ambush")]
+    assert handler.handle_command("search the chest", context="story") is False
+    assert searches == [("campaign-1", "goblin ambush")]
+    print("✅ /search reaches search_events")
+
+def test_history_command_pages_older_entries(monkeypatch):
+    """/history pages back through an NPC's interactions on demand; combat has no such command"""
+    entries = [{"created_at": None, "score_change": 5, "description": f"Chat {n}", "interaction_id": n}
+               for n in range(25, 0, -1)]
+    pages = []
+
+    def fake_history(relationship_id, before=None, limit=10):
+        start = 0 if before is None else entries.index(before) + 1
+        pages.append(start)
+        return entries[start:start + limit]
+
+    monkeypatch.setattr(command_handler, "get_npc_relationships", lambda campaign_id, character_id, history_limit=3: [
+        {"npc_name": "Mira", "relationship_id": "rel-1", "relationship_score": 25}])
+    monkeypatch.setattr(command_handler, "get_relationship_history", fake_history)
+    monkeypatch.setattr("builtins.input", lambda prompt="": "y")
+
+    assert CommandHandler(game_session=_session()).handle_command("/history mira", context="story") is True
+    assert pages == [0, 10, 20]
+    assert CommandHandler().handle_command("history of this place is long", context="combat") is False
+    print("✅ /history pages older interactions")
+
+def test_combat_action_starting_with_search_is_a_turn(monkeypatch):
+    """In combat, "search the goblin's corpse" is resolved as the player's turn, not eaten as a command"""
+    narrated = []
+    monkeypatch.setattr(cli, "STREAM_NARRATION", False)
+    actions = iter(["search the goblin's corpse"])  # asking twice raises instead of looping
+    monkeypatch.setattr(cli, "ui_get_action", lambda: next(actions))
+    monkeypatch.setattr(combat_system.dice, "roll_dice", lambda dice_type: 20)
+    monkeypatch.setattr(combat_system.combat_agent, "narrate_combat_turn",
+                        lambda turn_info: narrated.append(turn_info) or "You strike true.")
+    combat_manager = CombatManager("Hero", [{"name": "Goblin", "hp": 20, "ac": 10}], player_hp=20, player_ac=15)
+
+    handle_player_turn(combat_manager)
+
+    assert len(narrated) == 1 and narrated[0]["action"] == "search the goblin's corpse"
+    assert narrated[0]["success"] is True and combat_manager.combatants["Goblin"]["hp"] < 20
+    print("✅ Combat actions starting with 'search' still take a turn")
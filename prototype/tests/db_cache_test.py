@@ -0,0 +1,138 @@
+"""
+Tests for the db layer's read-through cache (db/cache.py)
+
+The cache itself and its use by the SQLite backend run anywhere; the
+cross-process LISTEN/NOTIFY test needs a scratch Postgres database in
+TEST_DATABASE_URL (see tests/db_query_plans_test.py).
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import json
+import time
+
+import psycopg2
+import pytest
+
+from db import cache
+from db import postgres_backend as pg_db
+from db import sqlite_backend as sqlite_db
+from db.cache import ReadCache
+from db.db_schema import SCHEMA_SQL
+
+TEST_DB_URL = os.getenv("TEST_DATABASE_URL")
+
+def goblin(name, **overrides):
+    npc = {"name": name, "class": "Goblin", "hp": 7, "ac": 12, "strength": 8,
+           "dexterity": 14, "constitution": 10, "intelligence": 8, "wisdom": 8,
+           "charisma": 8, "level": 1}
+    npc.update(overrides)
+    return npc
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    cache.configure(max_size=128, ttl=30)
+    yield
+    cache.configure(**cache.cache_config_from_env())
+
+def test_lru_ttl_and_tags():
+    """Least recently used entries go first, entries expire and tags drop entries"""
+    lru = ReadCache(max_size=2, ttl=30)
+    lru.put("a", 1, [("npcs", "c1")], lru.version)
+    lru.put("b", 2, [("npcs", "c2")], lru.version)
+    assert lru.get("a") == (True, 1)
+    lru.put("c", 3, [("npcs", "c2")], lru.version)
+    assert lru.get("b") == (False, None) and lru.stats()["evictions"] == 1
+
+    lru.invalidate([("npcs", "c2")])
+    assert lru.get("c") == (False, None) and lru.get("a") == (True, 1)
+
+    # A read that started before an invalidation must not be cached
+    version = lru.version
+    lru.invalidate([("npcs", "c1")])
+    lru.put("a", "stale", [("npcs", "c1")], version)
+    assert lru.get("a") == (False, None)
+
+    short = ReadCache(max_size=2, ttl=0.01)
+    short.put("a", 1, [], short.version)
+    time.sleep(0.02)
+    assert short.get("a") == (False, None) and short.stats()["expirations"] == 1
+    print("✅ LRU, TTL and tag invalidation work")
+
+def test_sqlite_reads_are_cached_until_written(tmp_path, monkeypatch):
+    """Repeat reads hit the cache; the writes that change them invalidate it"""
+    sqlite_db.close_pool()
+    monkeypatch.setattr(sqlite_db, "DB_URL", f"sqlite:///{tmp_path / 'game.sqlite3'}")
+    user_id = sqlite_db.get_or_create_user("player")
+    campaign_id = sqlite_db.create_campaign("Cached", "", user_id)
+    character_id = sqlite_db.create_character(campaign_id, user_id, "Hero", "Fighter")
+    sqlite_db.save_npc(campaign_id, goblin("Grik"), "Cave")
+
+    character = sqlite_db.get_character_in_campaign(campaign_id, user_id)
+    character.hp = 1  # callers get their own copy to mutate
+    hits = cache.cache_stats()["hits"]
+    assert sqlite_db.get_character_in_campaign(campaign_id, user_id).hp == 30
+    assert sqlite_db.get_npcs_at_location(campaign_id, "Cave")[0].hp == 7
+    assert sqlite_db.get_npcs_at_location(campaign_id, "Cave")[0].hp == 7
+    assert cache.cache_stats()["hits"] == hits + 2
+
+    character.hp = 12
+    sqlite_db.update_character_stats(character_id, character)
+    sqlite_db.save_npc(campaign_id, goblin("Grik", hp=2), "Cave")
+    sqlite_db.get_npc_relationships(campaign_id, character_id)
+    sqlite_db.update_npc_relationship(campaign_id, "Grik", character_id, 5, "Player: hi")
+    assert sqlite_db.get_character_in_campaign(campaign_id, user_id).hp == 12
+    assert sqlite_db.get_npcs_at_location(campaign_id, "Cave")[0].hp == 2
+    assert sqlite_db.get_npc_relationships(campaign_id, character_id)[0].relationship_score == 5
+
+    # Inside a transaction the block's own writes are visible straight away
+    with sqlite_db.transaction():
+        sqlite_db.save_npc(campaign_id, goblin("Grik", hp=1), "Cave")
+        assert sqlite_db.get_npcs_at_location(campaign_id, "Cave")[0].hp == 1
+    sqlite_db.close_pool()
+    print("✅ SQLite reads are cached until written")
+
+def _can_connect(url):
+    try:
+        psycopg2.connect(url).close()
+        return True
+    except Exception:
+        return False
+
+@pytest.mark.skipif(not TEST_DB_URL or not _can_connect(TEST_DB_URL),
+                    reason="TEST_DATABASE_URL is not set or not reachable")
+def test_postgres_notify_invalidates_other_processes(monkeypatch):
+    """An invalidation NOTIFYed by another worker drops this process's copy"""
+    conn = psycopg2.connect(TEST_DB_URL)
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(SCHEMA_SQL)
+    monkeypatch.setattr(pg_db, "DB_URL", TEST_DB_URL)
+    pg_db.close_pool()
+
+    user_id = pg_db.get_or_create_user("worker")
+    campaign_id = pg_db.create_campaign("Shared", "", user_id)
+    pg_db.save_npc(campaign_id, goblin("Grik"), "Cave")
+    pg_db.get_npcs_at_location(campaign_id, "Cave")  # starts the listener
+    assert pg_db._listener.listening.wait(5)
+    assert pg_db.get_npcs_at_location(campaign_id, "Cave")[0].hp == 7
+    hits = cache.cache_stats()["hits"]
+    assert pg_db.get_npcs_at_location(campaign_id, "Cave")[0].hp == 7
+    assert cache.cache_stats()["hits"] == hits + 1
+
+    # Another worker updates the NPC and broadcasts, as its save_npc would
+    cur.execute("UPDATE npcs SET hp = 3 WHERE campaign_id = %s;", (campaign_id,))
+    cur.execute("SELECT pg_notify(%s, %s);", (pg_db._CACHE_CHANNEL, json.dumps(
+        {"origin": "other-worker", "tags": [["npcs", campaign_id]]})))
+
+    deadline = time.monotonic() + 5
+    while cache.cache_stats()["remote_invalidations"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert cache.cache_stats()["remote_invalidations"] == 1
+    assert pg_db.get_npcs_at_location(campaign_id, "Cave")[0].hp == 3
+
+    pg_db._listener.stop()
+    pg_db.close_pool()
+    conn.close()
+    print("✅ NOTIFY keeps worker caches coherent")
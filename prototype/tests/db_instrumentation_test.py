@@ -0,0 +1,75 @@
+"""
+Tests for db timing and counters (db/instrumentation.py)
+
+Runs against the embedded SQLite backend, so no database server is needed.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import json
+
+import pytest
+
+from db import db
+from db import instrumentation
+from db import sqlite_backend as sqlite_db
+
+pytestmark = pytest.mark.skipif(db.backend_for_url(db.DB_URL) != "sqlite",
+                                reason="instrumentation tests run on the SQLite backend")
+
+@pytest.fixture
+def campaign_id(tmp_path, monkeypatch):
+    """A campaign in a fresh SQLite database, with instrumentation reset and on"""
+    sqlite_db.close_pool()
+    monkeypatch.setattr(sqlite_db, "DB_URL", f"sqlite:///{tmp_path / 'game.sqlite3'}")
+    campaign_id = db.create_campaign("Timed", "", db.get_or_create_user("player"))
+    instrumentation.reset()
+    instrumentation.enable()
+    yield campaign_id
+    instrumentation.disable()
+    instrumentation.reset()
+    sqlite_db.close_pool()
+
+def test_functions_and_statements_are_recorded(campaign_id, tmp_path):
+    """Calls, rows, errors, connection waits and per-statement timings show up in the JSON dump"""
+    for turn in range(3):
+        db.save_event(campaign_id, "interaction", f"Turn {turn}", "Cave")
+    assert len(db.get_recent_events(campaign_id, limit=2)) == 2
+    with pytest.raises(ValueError):
+        db.page_events(campaign_id, cursor="not-a-cursor")
+
+    path = tmp_path / "db_stats.json"
+    dumped = json.loads(instrumentation.dump_json(str(path)))
+    assert json.loads(path.read_text()) == dumped
+
+    functions = dumped["functions"]
+    assert functions["save_event"]["calls"] == 3
+    assert sum(functions["save_event"]["histogram"].values()) == 3
+    assert functions["get_recent_events"]["rows"] == 2
+    assert functions["page_events"]["errors"] == 1
+    assert functions["save_event"]["connection_acquire_ms"] >= 0
+    assert dumped["connection_acquire"]["count"] >= 4
+
+    inserts = [query for query in dumped["statements"] if query.startswith("INSERT INTO events ")]
+    assert len(inserts) == 1 and dumped["statements"][inserts[0]]["calls"] == 3
+    print("✅ db functions and statements are timed")
+
+def test_disabled_records_nothing(campaign_id):
+    """Switched off, calls pass straight through"""
+    instrumentation.disable()
+    db.save_event(campaign_id, "interaction", "Untimed")
+    assert db.get_recent_events(campaign_id)[0].description == "Untimed"
+    stats = instrumentation.stats()
+    assert stats["functions"] == {} and stats["statements"] == {}
+    print("✅ Disabled instrumentation records nothing")
+
+def test_normalize_sql():
+    """Literals and multi-row VALUES lists fold into one statement key"""
+    two = instrumentation.normalize_sql(b"INSERT INTO t (a, b) VALUES ('x', 1),('y', 2) ON CONFLICT DO NOTHING;")
+    three = instrumentation.normalize_sql("INSERT INTO t (a, b)\n  VALUES ('it''s', 1), ('y', 2), ('z', 3.5);")
+    assert two == "INSERT INTO t (a, b) VALUES (...) ON CONFLICT DO NOTHING;"
+    assert three == "INSERT INTO t (a, b) VALUES (...);"
+    assert instrumentation.normalize_sql("SELECT * FROM events_2026_01 WHERE x = 42") == \
+        "SELECT * FROM events_2026_01 WHERE x = ?"
+    print("✅ SQL statements normalize to stable keys")
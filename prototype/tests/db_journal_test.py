@@ -0,0 +1,104 @@
+"""
+Tests for the write-behind event journal (db/journal.py)
+
+Runs against the embedded SQLite backend, so no database server is needed.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import threading
+import time
+
+import pytest
+
+from db import db
+from db import sqlite_backend as sqlite_db
+from db.journal import EventJournal, JournalError
+
+pytestmark = pytest.mark.skipif(db.backend_for_url(db.DB_URL) != "sqlite",
+                                reason="journal tests run on the SQLite backend")
+
+@pytest.fixture
+def world(tmp_path, monkeypatch):
+    """A fresh SQLite database with a campaign, a character and one NPC"""
+    sqlite_db.close_pool()
+    monkeypatch.setattr(sqlite_db, "DB_URL", f"sqlite:///{tmp_path / 'game.sqlite3'}")
+    user_id = sqlite_db.get_or_create_user("player")
+    campaign_id = sqlite_db.create_campaign("Journal", "", user_id)
+    character_id = sqlite_db.create_character(campaign_id, user_id, "Hero", "Fighter")
+    sqlite_db.save_npc(campaign_id, {"name": "Grik", "class": "Goblin", "hp": 7, "ac": 12,
+                                     "strength": 8, "dexterity": 14, "constitution": 10,
+                                     "intelligence": 8, "wisdom": 8, "charisma": 8, "level": 1}, "Cave")
+    yield {"campaign_id": campaign_id, "character_id": character_id}
+    sqlite_db.close_pool()
+
+def test_batches_keep_order_and_time(world):
+    """Queued writes land in one batch, in order, with the time they were queued"""
+    journal = EventJournal(batch_size=50, flush_interval=30)
+    for turn in range(1, 4):
+        journal.save_event(world["campaign_id"], "interaction", f"Turn {turn}", "Cave",
+                           session_id="s1", turn_number=turn, context_delta=f"{turn} ")
+        time.sleep(0.01)
+    journal.update_npc_relationships(world["campaign_id"], world["character_id"], [("Grik", 5, "Player: hi")])
+    assert sqlite_db.get_recent_events(world["campaign_id"]) == []
+
+    journal.flush()
+    events = sqlite_db.get_recent_events(world["campaign_id"])
+    assert [event.description for event in events] == ["Turn 3", "Turn 2", "Turn 1"]
+    assert events[0].created_at > events[2].created_at and events[0].location == "Cave"
+    assert sqlite_db.get_npc_relationships(world["campaign_id"], world["character_id"])[0].relationship_score == 5
+    stats = journal.stats()
+    assert stats["batches"] == 1 and stats["events_written"] == 3 and stats["relationship_updates_written"] == 1
+    journal.close()
+    print("✅ Journal batches keep order and time")
+
+def test_flush_on_size_and_interval(world):
+    """A full batch is written at once; a lone write waits at most flush_interval"""
+    journal = EventJournal(batch_size=2, flush_interval=0.2)
+    journal.save_event(world["campaign_id"], "interaction", "One")
+    journal.save_event(world["campaign_id"], "interaction", "Two")
+    journal.save_event(world["campaign_id"], "interaction", "Three")
+
+    deadline = time.monotonic() + 5
+    while journal.stats()["events_written"] < 3 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert journal.stats()["batches"] == 2 and len(sqlite_db.get_recent_events(world["campaign_id"])) == 3
+    journal.close()
+    print("✅ Journal flushes on size and interval")
+
+def test_back_pressure_and_sync_failures(world, monkeypatch):
+    """A full queue blocks the writer; sync durability surfaces failed batches"""
+    release = threading.Event()
+    real_save_events_bulk = db.save_events_bulk
+
+    def slow_save_events_bulk(events):
+        release.wait(5)
+        real_save_events_bulk(events)
+
+    monkeypatch.setattr(db, "save_events_bulk", slow_save_events_bulk)
+    journal = EventJournal(max_queue=1, batch_size=1, flush_interval=0)
+    journal.save_event(world["campaign_id"], "interaction", "Stuck")  # the worker takes it and waits
+    time.sleep(0.05)
+    journal.save_event(world["campaign_id"], "interaction", "Queued")  # fills the queue
+
+    writer = threading.Thread(target=journal.save_event, args=(world["campaign_id"], "interaction", "Blocked"))
+    writer.start()
+    time.sleep(0.05)
+    assert writer.is_alive() and journal.stats()["blocked_puts"] == 1
+    release.set()
+    writer.join(5)
+    journal.flush()
+    assert len(sqlite_db.get_recent_events(world["campaign_id"])) == 3
+    journal.close()
+
+    def failing_save_events_bulk(events):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(db, "save_events_bulk", failing_save_events_bulk)
+    journal = EventJournal(durability="sync", max_retries=0)
+    with pytest.raises(JournalError):
+        journal.save_event(world["campaign_id"], "interaction", "Lost")
+    assert journal.stats()["dropped"] == 1
+    journal.close()
+    print("✅ Journal applies back-pressure and reports sync failures")
@@ -0,0 +1,139 @@
+"""
+Tests for the Postgres connection pool (db/pool.py)
+
+Uses fake connections, so no database server is needed.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import threading
+import time
+
+import pytest
+from psycopg2 import extensions
+
+from db.pool import ConnectionPool, PoolTimeout
+
+class FakeConnection:
+    """Stand-in connection; with a ping_gate its health-check ping blocks until released"""
+
+    def __init__(self, ping_gate=None):
+        self.closed = 0
+        self.ping_gate = ping_gate
+        self.pings = 0
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+        self.commits = 0
+        self.rollbacks = 0
+
+    def get_transaction_status(self):
+        return self.status
+
+    def commit(self):
+        self.commits += 1
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query):
+        self.pings += 1
+        if self.ping_gate is not None:
+            self.ping_gate.wait(5)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    """Pool factory whose connections are FakeConnections"""
+    monkeypatch.setattr(ConnectionPool, "_connect", lambda self: FakeConnection())
+    return lambda **config: ConnectionPool("fake", **config)
+
+def test_checkout_limits_and_waiters(fake_pool):
+    """Checkouts time out at max_size; a returned connection wakes a waiter"""
+    pool = fake_pool(min_size=0, max_size=2, checkout_timeout=0.05)
+    first, second = pool.getconn(), pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    assert pool.stats()["timeouts"] == 1 and pool.stats()["saturation"] == 1.0
+
+    pool.checkout_timeout = 5
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.getconn()))
+    waiter.start()
+    time.sleep(0.05)
+    assert not got
+    pool.putconn(first)
+    waiter.join(5)
+    assert got == [first] and pool.stats()["waits"] == 1
+    pool.closeall()
+    print("✅ Pool enforces max_size and wakes waiters")
+
+def test_putconn_discards_unusable_and_prune_keeps_min_size(fake_pool):
+    """Mid-transaction or closed connections aren't reused; pruning stops at min_size"""
+    pool = fake_pool(min_size=1, max_size=4, idle_timeout=0.0)
+    conns = [pool.getconn() for _ in range(3)]
+    conns[0].status = extensions.TRANSACTION_STATUS_INTRANS
+    conns[1].closed = 1
+    for conn in conns:
+        pool.putconn(conn)
+    stats = pool.stats()
+    assert stats["idle"] == 1 and stats["connections_closed"] == 2 and conns[0].closed
+
+    more = [pool.getconn() for _ in range(3)]
+    for conn in more:
+        pool.putconn(conn)
+    time.sleep(0.01)
+    pool._prune_idle(time.monotonic())
+    assert pool.stats()["size"] == 1  # every connection is past idle_timeout, min_size still kept
+    pool.closeall()
+    print("✅ Unusable connections are dropped and pruning keeps min_size")
+
+def test_connection_commits_or_rolls_back(fake_pool):
+    """connection() commits a clean block and rolls back one that raises"""
+    pool = fake_pool(min_size=0, max_size=1)
+    with pool.connection() as conn:
+        pass
+    assert conn.commits == 1 and conn.rollbacks == 0
+
+    with pytest.raises(RuntimeError):
+        with pool.connection() as conn:
+            raise RuntimeError("boom")
+    assert conn.rollbacks == 1 and pool.stats()["in_use"] == 0 and pool.stats()["idle"] == 1
+    pool.closeall()
+    print("✅ connection() commits or rolls back")
+
+def test_ping_does_not_block_the_pool(monkeypatch):
+    """A slow health-check ping holds no lock: other threads can still return connections"""
+    gate = threading.Event()
+    stale, busy = FakeConnection(gate), FakeConnection()
+    monkeypatch.setattr(ConnectionPool, "_connect", lambda self: FakeConnection())
+    pool = ConnectionPool("fake", min_size=0, max_size=2, health_check_after=0.0)
+    pool._idle.append((stale, time.monotonic() - 60))
+    pool._in_use.add(busy)
+
+    checked_out = []
+    pinging = threading.Thread(target=lambda: checked_out.append(pool.getconn()))
+    pinging.start()
+    while stale.pings == 0:
+        time.sleep(0.01)
+
+    returned = threading.Thread(target=pool.putconn, args=(busy,))
+    returned.start()
+    returned.join(1)
+    assert not returned.is_alive()  # putconn didn't wait for the ping
+    assert pool.stats()["idle"] == 1
+
+    gate.set()
+    pinging.join(5)
+    assert checked_out == [stale] and pool.stats()["in_use"] == 1
+    print("✅ Health-check pings run outside the pool lock")
@@ -0,0 +1,301 @@
+"""
+Query plan regression tests for the Postgres backend (db/postgres_backend.py)
+
+Seeds a large synthetic world into a scratch Postgres database, runs the db
+functions against it while recording every SQL statement they send, and
+asserts that EXPLAIN plans each statement with index scans instead of
+sequential scans.
+
+These tests DROP and recreate every table, so they only run against the
+database named in TEST_DATABASE_URL (never DATABASE_URL):
+
+    TEST_DATABASE_URL=postgresql://postgres:pw@localhost:5432/agentic_dnd_test \
+        python -m pytest prototype/tests/db_query_plans_test.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import json
+import pytest
+import psycopg2
+from psycopg2 import extensions
+
+from db import postgres_backend as db
+from db import cache
+from db import pool as pool_module
+from db.db_schema import SCHEMA_SQL
+
+TEST_DB_URL = os.getenv("TEST_DATABASE_URL")
+
+def _can_connect(url):
+    try:
+        psycopg2.connect(url).close()
+        return True
+    except Exception:
+        return False
+
+pytestmark = pytest.mark.skipif(
+    not TEST_DB_URL or not _can_connect(TEST_DB_URL),
+    reason="TEST_DATABASE_URL is not set or not reachable"
+)
+
+CAMPAIGNS = 2000
+USERS = 5000
+LOCATIONS_PER_CAMPAIGN = 10
+NPCS_PER_CAMPAIGN = 20
+EVENTS_PER_CAMPAIGN = 100
+INTERACTIONS_PER_RELATIONSHIP = 3
+
+SEED_SQL = f"""
+INSERT INTO users (username)
+SELECT 'user_' || g FROM generate_series(1, {USERS}) g;
+
+WITH u AS (SELECT user_id, row_number() OVER (ORDER BY username) AS n FROM users)
+INSERT INTO campaigns (name, description, created_by, last_played, is_active)
+SELECT 'Campaign ' || g, 'Synthetic campaign', u.user_id,
+       now() - (g || ' minutes')::interval, g % 10 <> 0
+FROM generate_series(1, {CAMPAIGNS}) g
+JOIN u ON u.n = 1 + g % {USERS};
+
+INSERT INTO campaign_members (campaign_id, user_id, role)
+SELECT campaign_id, created_by, 'dm' FROM campaigns;
+
+INSERT INTO characters (campaign_id, user_id, name, class)
+SELECT campaign_id, created_by, 'Hero of ' || name, 'Fighter' FROM campaigns;
+
+INSERT INTO locations (campaign_id, name, description)
+SELECT c.campaign_id, 'Location ' || g, 'Somewhere'
+FROM campaigns c, generate_series(1, {LOCATIONS_PER_CAMPAIGN}) g;
+
+INSERT INTO npcs (campaign_id, name, class, current_location_id, status, last_seen)
+SELECT l.campaign_id, l.name || ' NPC ' || g, 'Goblin', l.location_id,
+       CASE WHEN g % 5 = 0 THEN 'dead' ELSE 'alive' END,
+       now() - (g || ' seconds')::interval
+FROM locations l, generate_series(1, {NPCS_PER_CAMPAIGN // LOCATIONS_PER_CAMPAIGN}) g;
+
+INSERT INTO events (campaign_id, event_type, description, location_id, player_actions,
+                    session_id, turn_number, context_delta, created_at)
+SELECT c.campaign_id, 'interaction', 'Something happened ' || g, NULL, 'I act',
+       c.campaign_id, g, E'\\nPlayer: I act\\nDM: Something happened',
+       now() - ((({EVENTS_PER_CAMPAIGN} - g)) || ' seconds')::interval
+FROM campaigns c, generate_series(1, {EVENTS_PER_CAMPAIGN}) g;
+
+INSERT INTO relationships (campaign_id, character_id, npc_id, relationship_score, last_interaction)
+SELECT ch.campaign_id, ch.character_id, n.npc_id, 10, 'Player: hello'
+FROM characters ch JOIN npcs n ON n.campaign_id = ch.campaign_id;
+
+INSERT INTO relationship_interactions (relationship_id, score_change, description, created_at)
+SELECT r.relationship_id, 5, 'Player: hello ' || g, now() - (g || ' minutes')::interval
+FROM relationships r, generate_series(1, {INTERACTIONS_PER_RELATIONSHIP}) g;
+
+ANALYZE;
+"""
+
+class RecordingCursor(extensions.cursor):
+    """Cursor that remembers every statement the backend executes"""
+    statements = []
+
+    def execute(self, query, vars=None):
+        RecordingCursor.statements.append((query, vars))
+        return super().execute(query, vars)
+
+@pytest.fixture(scope="module")
+def world():
+    """Seed the synthetic world and point the backend at the test database"""
+    conn = psycopg2.connect(TEST_DB_URL)
+    cur = conn.cursor()
+    cur.execute(SCHEMA_SQL)
+    cur.execute(SEED_SQL)
+    conn.commit()
+
+    cur.execute("""
+        SELECT c.campaign_id, c.created_by, ch.character_id, u.username
+        FROM campaigns c
+        JOIN characters ch ON ch.campaign_id = c.campaign_id
+        JOIN users u ON u.user_id = c.created_by
+        WHERE c.name = 'Campaign 7';
+    """)
+    campaign_id, user_id, character_id, username = cur.fetchone()
+    cur.execute("""
+        SELECT relationship_id FROM relationships WHERE character_id = %s LIMIT 1;
+    """, (character_id,))
+    relationship_id = cur.fetchone()[0]
+    cur.execute("""
+        SELECT event_id FROM events WHERE campaign_id = %s AND turn_number = 50;
+    """, (campaign_id,))
+    event_id = cur.fetchone()[0]
+    cur.close()
+
+    original_connect = pool_module.ConnectionPool._connect
+
+    def recording_connect(self):
+        pooled = original_connect(self)
+        pooled.cursor_factory = RecordingCursor
+        return pooled
+
+    patcher = pytest.MonkeyPatch()
+    patcher.setattr(db, "DB_URL", TEST_DB_URL)
+    patcher.setattr(pool_module.ConnectionPool, "_connect", recording_connect)
+    db.close_pool()
+    cache.configure(max_size=0)  # every call must reach the database to be EXPLAINed
+
+    yield {
+        "conn": conn, "campaign_id": campaign_id, "user_id": user_id, "username": username,
+        "character_id": character_id, "relationship_id": relationship_id, "event_id": event_id,
+    }
+
+    db.close_pool()
+    cache.configure(**cache.cache_config_from_env())
+    patcher.undo()
+    conn.close()
+
+def _seq_scans(plan):
+    """Relation names of every Seq Scan node in an EXPLAIN (FORMAT JSON) plan"""
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+def _populated(cur, relations):
+    """
+    Drop relations ANALYZE found empty: the planner rightly seq-scans empty
+    partitions (next month's events, the default partition, the archive)
+    """
+    if not relations:
+        return relations
+    cur.execute("SELECT relname FROM pg_class WHERE relname = ANY(%s) AND reltuples > 0;", (relations,))
+    populated = {row[0] for row in cur.fetchall()}
+    return [name for name in relations if name in populated]
+
+def assert_index_plans(world, call):
+    """Run a db call and EXPLAIN every statement it sent"""
+    RecordingCursor.statements.clear()
+    result = call()
+    statements = list(RecordingCursor.statements)
+    assert statements, "db call did not execute any SQL"
+
+    cur = world["conn"].cursor()
+    for query, params in statements:
+        if isinstance(query, bytes):
+            query = query.decode()
+        cur.execute("EXPLAIN (FORMAT JSON) " + query, params)
+        plan = cur.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        seq_scans = _populated(cur, _seq_scans(plan[0]["Plan"]))
+        assert not seq_scans, f"Seq Scan on {seq_scans} for query:\n{query}"
+    world["conn"].rollback()
+    cur.close()
+    return result
+
+def test_user_queries(world):
+    """User lookups go through the username unique index"""
+    user = assert_index_plans(world, lambda: db.get_user_by_username(world["username"]))
+    assert user["user_id"] == world["user_id"]
+    print("✅ User queries use indexes")
+
+def test_campaign_queries(world):
+    """Per-user campaign listing walks the membership index"""
+    campaigns = assert_index_plans(world, lambda: db.list_campaigns(world["user_id"]))
+    assert campaigns
+    recent = assert_index_plans(world, lambda: db.get_most_recent_campaign(world["user_id"]))
+    assert recent.campaign_id == campaigns[0].campaign_id
+    assert assert_index_plans(world, lambda: db.campaign_exists(world["campaign_id"]))
+    assert_index_plans(world, lambda: db.update_campaign_last_played(world["campaign_id"]))
+    print("✅ Campaign queries use indexes")
+
+def test_character_queries(world):
+    """Character lookups use UNIQUE(campaign_id, user_id)"""
+    character = assert_index_plans(world, lambda: db.get_character_in_campaign(world["campaign_id"], world["user_id"]))
+    assert character["character_id"] == world["character_id"]
+    print("✅ Character queries use indexes")
+
+def test_npc_queries(world):
+    """NPC reads and upserts use the location and (campaign_id, name) indexes"""
+    npcs = assert_index_plans(world, lambda: db.get_npcs_at_location(world["campaign_id"], "Location 3"))
+    assert npcs and all(npc["status"] == "alive" for npc in npcs)
+
+    goblin = {"name": "Plan Goblin", "class": "Goblin", "hp": 7, "ac": 12, "strength": 8,
+              "dexterity": 14, "constitution": 10, "intelligence": 8, "wisdom": 8,
+              "charisma": 8, "level": 1}
+    assert_index_plans(world, lambda: db.save_npcs_bulk(world["campaign_id"], [goblin], "Location 3"))
+    print("✅ NPC queries use indexes")
+
+def test_event_queries(world):
+    """Recent events read the (campaign_id, created_at) index"""
+    events = assert_index_plans(world, lambda: db.get_recent_events(world["campaign_id"], limit=10))
+    assert len(events) == 10
+    context = assert_index_plans(world, lambda: db.get_event_context(world["event_id"]))
+    assert context.count("Player:") == 50
+    assert_index_plans(world, lambda: db.save_event(world["campaign_id"], "interaction", "Planned",
+                                                     location_name="Location 1"))
+    print("✅ Event queries use indexes")
+
+def test_event_search_queries(world):
+    """Full-text search reads the GIN index (or the campaign index), never every event"""
+    events = assert_index_plans(world, lambda: db.search_events(world["campaign_id"], "happened 42"))
+    assert [event.description for event in events] == ["Something happened 42"]
+    events = assert_index_plans(world, lambda: db.search_events(world["campaign_id"], "42 or 43", match_any=True))
+    assert {event.description for event in events} == {"Something happened 42", "Something happened 43"}
+    print("✅ Event search queries use indexes")
+
+def test_event_retention_queries(world):
+    """Retention finds a campaign's overflow through the events index"""
+    assert_index_plans(world, lambda: db.set_event_retention(world["campaign_id"], 50))
+    assert_index_plans(world, lambda: db.apply_event_retention(world["campaign_id"]))
+    assert_index_plans(world, lambda: db.apply_event_retention())
+    print("✅ Event retention queries use indexes")
+
+def test_keyset_pagination_queries(world):
+    """Every page, however deep, starts with an index seek past the cursor"""
+    # Archive part of the campaign so paging has to walk on into events_archive
+    db.set_event_retention(world["campaign_id"], 50)
+    db.apply_event_retention(world["campaign_id"])
+    with world["conn"].cursor() as cur:
+        cur.execute("""
+            SELECT (SELECT count(*) FROM ONLY events_archive WHERE campaign_id = %(c)s),
+                   (SELECT count(*) FROM events WHERE campaign_id = %(c)s)
+                 + (SELECT count(*) FROM events_archive WHERE campaign_id = %(c)s);
+        """, {"c": world["campaign_id"]})
+        archived, total = cur.fetchone()
+    world["conn"].rollback()
+    assert archived > 0
+
+    descriptions, cursor = [], None
+    while True:
+        events, cursor = assert_index_plans(world, lambda: db.page_events(world["campaign_id"], cursor, limit=15))
+        descriptions += [event.description for event in events]
+        if not cursor:
+            break
+    assert len(descriptions) == len(set(descriptions)) == total
+
+    campaigns, cursor = assert_index_plans(world, lambda: db.page_campaigns(limit=100))
+    while cursor:
+        page, cursor = assert_index_plans(world, lambda: db.page_campaigns(cursor=cursor, limit=100))
+        campaigns += page
+    assert len({campaign.campaign_id for campaign in campaigns}) == CAMPAIGNS - CAMPAIGNS // 10
+    assert [c.last_played for c in campaigns] == sorted((c.last_played for c in campaigns), reverse=True)
+
+    first, cursor = assert_index_plans(world, lambda: db.page_npc_relationships(
+        world["campaign_id"], world["character_id"], limit=5))
+    rest, _ = assert_index_plans(world, lambda: db.page_npc_relationships(
+        world["campaign_id"], world["character_id"], cursor, limit=100))
+    assert len(first) == 5 and {r.npc_name for r in first}.isdisjoint(r.npc_name for r in rest)
+    with pytest.raises(ValueError):
+        db.page_campaigns(cursor=cursor)
+    print("✅ Keyset pagination queries use indexes")
+
+def test_relationship_queries(world):
+    """Relationship reads, history paging and batched updates use indexes"""
+    relationships = assert_index_plans(world, lambda: db.get_npc_relationships(world["campaign_id"], world["character_id"]))
+    assert relationships
+
+    page = assert_index_plans(world, lambda: db.get_relationship_history(world["relationship_id"], limit=2))
+    assert_index_plans(world, lambda: db.get_relationship_history(world["relationship_id"], before=page[-1], limit=2))
+
+    changes = [(rel["npc_name"], 5, "Player: waves") for rel in relationships[:5]]
+    assert_index_plans(world, lambda: db.update_npc_relationships(world["campaign_id"], world["character_id"], changes))
+    print("✅ Relationship queries use indexes")
@@ -0,0 +1,80 @@
+"""
+Tests for the disk-backed LLM reply cache (bots/llm_cache.py)
+
+Uses a fake OpenAI client and a temporary cache file.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import threading
+import time
+from types import SimpleNamespace
+
+from bots.llm_cache import LLMCache, request_key
+from bots.llm_gateway import LLMGateway
+
+class CountingClient:
+    """Fake client numbering its replies, so reused replies are easy to spot"""
+
+    def __init__(self):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **request):
+        self.calls += 1
+        content = f'{{"reply": {self.calls}}}'
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+def test_lru_ttl_and_persistence(tmp_path):
+    """Entries survive a reopen, expire after the TTL and are evicted least recently used first"""
+    path = str(tmp_path / "llm_cache.sqlite3")
+    cache = LLMCache(path, max_entries=2, ttl=60)
+    cache.put("a", "gpt-4o", "A")
+    cache.put("b", "gpt-4o", "B")
+    assert cache.get("a") == (True, "A")  # b is now the least recently used
+    cache.put("c", "gpt-4o", "C")
+    assert cache.get("b") == (False, None) and cache.stats()["evictions"] == 1
+    cache.close()
+
+    cache = LLMCache(path, max_entries=2, ttl=0.05)
+    assert cache.get("a") == (True, "A") and cache.get("c") == (True, "C")
+    time.sleep(0.06)
+    assert cache.get("a") == (False, None) and cache.stats()["expirations"] == 1
+    cache.close()
+
+    assert request_key({"model": "gpt-4o", "messages": []}) == request_key({"messages": [], "model": "gpt-4o"})
+    assert request_key({"model": "gpt-4o", "messages": []}) != request_key({"model": "gpt-4o-mini", "messages": []})
+    print("✅ LLM cache evicts LRU, expires and persists")
+
+def test_gateway_caches_only_opted_in_calls(tmp_path):
+    """cache=True reuses an identical request's reply; other calls always reach the provider"""
+    client = CountingClient()
+    gateway = LLMGateway(client=client, cache=LLMCache(str(tmp_path / "llm_cache.sqlite3")))
+
+    first = gateway.chat_json("Stat block", "Class: Goblin\nLevel: 1", cache=True)
+    assert gateway.chat_json("Stat block", "Class: Goblin\nLevel: 1", cache=True) == first
+    assert gateway.chat_json("Stat block", "Class: Orc\nLevel: 1", cache=True) != first
+    assert gateway.chat("Narrate", "I open the door") != gateway.chat("Narrate", "I open the door")
+
+    assert client.calls == 4
+    assert gateway.stats()["cache"]["hits"] == 1 and gateway.stats()["cache"]["size"] == 2
+    print("✅ Gateway caches only opted-in calls")
+
+def test_identical_cached_calls_share_one_request(tmp_path):
+    """Concurrent identical cacheable calls wait for the first instead of all reaching the provider"""
+    client = CountingClient()
+    slow_create = client.create
+    client.chat.completions.create = lambda **request: (time.sleep(0.1), slow_create(**request))[1]
+    gateway = LLMGateway(client=client, cache=LLMCache(str(tmp_path / "llm_cache.sqlite3")))
+
+    replies = []
+    threads = [threading.Thread(target=lambda: replies.append(gateway.chat("Stat block", "Class: Goblin", cache=True)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert client.calls == 1 and len(set(replies)) == 1 and len(replies) == 5
+    print("✅ Identical cached calls share one request")
@@ -0,0 +1,112 @@
+"""
+Tests for the shared LLM gateway (bots/llm_gateway.py)
+
+Uses a fake OpenAI client, so no API key or network is needed.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from bots.llm_gateway import LLMGateway, LLMError
+
+def provider_error(cls, status=None):
+    """An SDK exception without the HTTP response it normally carries"""
+    error = cls.__new__(cls)
+    Exception.__init__(error, f"{cls.__name__} from the fake provider")
+    error.status_code = status
+    error.response = None
+    return error
+
+class FakeClient:
+    """Answers chat.completions.create() from a script of replies and errors"""
+
+    def __init__(self, *script, delay=0.0):
+        self.script = list(script)
+        self.delay = delay
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **request):
+        self.requests.append(request)
+        time.sleep(self.delay)
+        reply = self.script.pop(0) if self.script else '{"ok": true}'
+        if isinstance(reply, Exception):
+            raise reply
+        if request.get("stream"):
+            # Streamed replies arrive a few characters at a time
+            return iter([SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=reply[i:i + 3]))])
+                         for i in range(0, len(reply), 3)])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+
+def test_retries_rate_limits_and_server_errors():
+    """429s, 5xxs and timeouts are retried with backoff; the reply comes back parsed"""
+    client = FakeClient(provider_error(openai.RateLimitError, 429),
+                        provider_error(openai.InternalServerError, 503),
+                        provider_error(openai.APITimeoutError),
+                        '{"combat": true}')
+    gateway = LLMGateway(client=client, max_retries=3, backoff_base=0.01, backoff_max=0.02)
+
+    assert gateway.chat_json("system", "user") == {"combat": True}
+    request = client.requests[-1]
+    assert request["response_format"] == {"type": "json_object"} and request["messages"][1]["content"] == "user"
+    assert request["timeout"] <= gateway.timeout
+
+    stats = gateway.stats()
+    assert stats["attempts"] == 4 and stats["retries"] == 3 and stats["failures"] == 0
+    assert stats["rate_limited"] == 1 and stats["timeouts"] == 1
+    print("✅ Gateway retries 429s, 5xxs and timeouts")
+
+def test_gives_up_on_client_errors_and_deadlines():
+    """Bad requests aren't retried, and no call outlives its deadline"""
+    gateway = LLMGateway(client=FakeClient(provider_error(openai.BadRequestError, 400)), backoff_base=0.01)
+    with pytest.raises(LLMError):
+        gateway.chat("system", "user")
+    assert gateway.stats()["attempts"] == 1
+
+    errors = [provider_error(openai.InternalServerError, 500) for _ in range(10)]
+    gateway = LLMGateway(client=FakeClient(*errors), max_retries=10, backoff_base=0.2, backoff_max=0.2)
+    started = time.monotonic()
+    with pytest.raises(LLMError):
+        gateway.chat("system", "user", deadline=0.5)
+    assert time.monotonic() - started < 0.6
+    assert gateway.stats()["failures"] == 1
+    print("✅ Gateway gives up on client errors and at the deadline")
+
+def test_limits_concurrent_calls():
+    """No more than max_concurrency calls are on the wire at once"""
+    gateway = LLMGateway(client=FakeClient(delay=0.05), max_concurrency=2)
+    threads = [threading.Thread(target=gateway.chat, args=("system", "user")) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    stats = gateway.stats()
+    assert stats["calls"] == 6 and stats["peak_in_flight"] == 2 and stats["slot_waits"] > 0
+    assert stats["in_flight"] == 0
+    print("✅ Gateway limits concurrent calls")
+
+def test_streams_a_json_field_as_it_arrives():
+    """stream() yields just the field's decoded text, split anywhere, and keeps the full reply"""
+    reply = json.dumps({"content": 'The goblin hisses, "Turn back!" \u2014 then flees. 🐉', "location": "Cave"})
+    client = FakeClient(provider_error(openai.RateLimitError, 429), reply)
+    gateway = LLMGateway(client=client, backoff_base=0.01, backoff_max=0.01)
+
+    stream = gateway.stream("system", "user", json_field="content")
+    pieces = list(stream)
+    assert len(pieces) > 5 and "".join(pieces) == 'The goblin hisses, "Turn back!" \u2014 then flees. 🐉'
+    assert stream.text == "".join(pieces) and stream.json()["location"] == "Cave"
+    assert client.requests[-1]["stream"] is True and client.requests[-1]["response_format"] == {"type": "json_object"}
+    assert gateway.stats()["in_flight"] == 0 and gateway.stats()["retries"] == 1
+
+    plain = gateway.stream("system", "user")
+    assert plain.read() == '{"ok": true}' and gateway.stats()["in_flight"] == 0
+    print("✅ Gateway streams a JSON field as it arrives")
@@ -1,6 +1,8 @@
-from bots.npc_creator_agent import NpcCreatorAgent
+from bots.npc_creator_agent import NpcCreatorAgent, DEFAULT_STATS
+from bots import llm_gateway
 import pytest
 import json
+import time
 
 wizard_context = """
     In the mystical realm of Eldoria, Foo, a gifted Wizard of unparalleled repute, finds themselves embroiled in a dire quest.
@@ -54,6 +56,28 @@ def test_warrior_name():
     print_character_sheets(list_of_characters)
     assert first_character_json["name"] == "Peach" or first_character_json["name"] == "Parrot"
 
+def test_stats_fan_out_in_order(monkeypatch):
+    """Stat blocks are fetched side by side, in roster order, with defaults for failed calls"""
+    roster = [{"name": f"Goblin {i}", "class": "Goblin"} for i in range(1, 5)] + [{"name": "Vexa", "class": "Lich"}]
+
+    def fake_chat_json(system_prompt, user_prompt, cache=False):
+        if "Class:" not in user_prompt:
+            return {"characters": roster}
+        time.sleep(0.2)
+        if "Lich" in user_prompt:
+            raise llm_gateway.LLMError("provider timed out")
+        return {**DEFAULT_STATS, "strength": 14, "hp": 7}
+
+    monkeypatch.setattr(llm_gateway, "chat_json", fake_chat_json)
+    started = time.monotonic()
+    characters = NpcCreatorAgent(max_workers=5).generate_character_sheet("A goblin warband and a lich", ["Foo"])
+
+    assert time.monotonic() - started < 0.6  # five serial stat calls would take a second
+    assert [char["name"] for char in characters] == ["Goblin 1", "Goblin 2", "Goblin 3", "Goblin 4", "Vexa"]
+    assert all(char["strength"] == 14 for char in characters[:4])
+    assert characters[4]["hp"] == DEFAULT_STATS["hp"] and characters[4]["class"] == "Lich"
+    print("✅ NPC stats fan out, keep order and survive a failed call")
+
 def print_character_sheets(characters):
     for i, char in enumerate(characters, 1):
         print(f"\n--- Character {i} ---")
@@ -0,0 +1,222 @@
+"""
+Tests for the embedded SQLite backend (db/sqlite_backend.py)
+
+Runs the same calls the game makes against a throwaway SQLite file, so no
+database server is needed.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import json
+from datetime import datetime
+
+import pytest
+
+from db import db
+from db import sqlite_backend as sqlite_db
+
+def goblin(name, **overrides):
+    npc = {"name": name, "class": "Goblin", "hp": 7, "ac": 12, "strength": 8,
+           "dexterity": 14, "constitution": 10, "intelligence": 8, "wisdom": 8,
+           "charisma": 8, "level": 1}
+    npc.update(overrides)
+    return npc
+
+@pytest.fixture
+def world(tmp_path, monkeypatch):
+    """A fresh SQLite database with one user, campaign and character"""
+    sqlite_db.close_pool()
+    monkeypatch.setattr(sqlite_db, "DB_URL", f"sqlite:///{tmp_path / 'game.sqlite3'}")
+
+    user_id = sqlite_db.get_or_create_user("player")
+    campaign_id = sqlite_db.create_campaign("Test Campaign", "A test", user_id)
+    character_id = sqlite_db.create_character(campaign_id, user_id, "Hero", "Fighter")
+    yield {"user_id": user_id, "campaign_id": campaign_id, "character_id": character_id}
+
+    sqlite_db.close_pool()
+
+def test_backend_for_url():
+    """The URL scheme picks the backend"""
+    assert db.backend_for_url("postgresql://u:p@localhost/dnd") == "postgres"
+    assert db.backend_for_url("postgres://u:p@localhost/dnd") == "postgres"
+    assert db.backend_for_url("sqlite:///game.sqlite3") == "sqlite"
+    with pytest.raises(ValueError):
+        db.backend_for_url("mysql://localhost/dnd")
+    assert sqlite_db.sqlite_path("sqlite:////tmp/game.db") == "/tmp/game.db"
+    assert sqlite_db.sqlite_path("sqlite:///:memory:") == ":memory:"
+    print("✅ Backend chosen by URL scheme")
+
+def test_users_campaigns_characters(world):
+    """Users, campaigns and characters round-trip with Postgres-shaped results"""
+    assert sqlite_db.get_or_create_user("player") == world["user_id"]
+    user = sqlite_db.get_user_by_username("player")
+    assert isinstance(user["created_at"], datetime)
+
+    campaign = sqlite_db.get_most_recent_campaign(world["user_id"])
+    assert campaign.campaign_id == world["campaign_id"] and campaign.role == "dm"
+    assert isinstance(campaign.last_played, datetime)
+    assert sqlite_db.list_campaigns()[0].role is None
+    assert sqlite_db.campaign_exists(world["campaign_id"])
+    assert not sqlite_db.campaign_exists("00000000-0000-4000-8000-000000000000")
+    sqlite_db.update_campaign_last_played(world["campaign_id"])
+
+    character = sqlite_db.get_character_in_campaign(world["campaign_id"], world["user_id"])
+    assert character.character_id == world["character_id"] and character["class"] == "Fighter"
+    character.hp, character.level = 12, 2
+    sqlite_db.update_character_stats(world["character_id"], character)
+    assert sqlite_db.get_character_in_campaign(world["campaign_id"], world["user_id"]).hp == 12
+
+    sqlite_db.clear_characters_in_campaign(world["campaign_id"])
+    assert sqlite_db.get_character_in_campaign(world["campaign_id"], world["user_id"]) is None
+    print("✅ Users, campaigns and characters work on SQLite")
+
+def test_npcs_and_events(world):
+    """Bulk NPC upserts and event context rebuilds"""
+    ids = sqlite_db.save_npcs_bulk(world["campaign_id"],
+                                   [goblin("Grik"), goblin("Snag"), goblin("Grik", hp=3)], "Cave")
+    assert ids[0] == ids[2] and len(set(ids)) == 2
+    assert sqlite_db.save_npc(world["campaign_id"], goblin("Snag", status="dead"), "Cave") == ids[1]
+
+    npcs = sqlite_db.get_npcs_at_location(world["campaign_id"], "Cave")
+    assert [(npc.name, npc.hp, npc.current_location) for npc in npcs] == [("Grik", 3, "Cave")]
+
+    session_id = "11111111-1111-4111-8111-111111111111"
+    for turn, delta in enumerate(["Intro. ", "Player: hi. ", "Player: bye. "], start=1):
+        sqlite_db.save_event(world["campaign_id"], "interaction", f"Turn {turn}", "Cave",
+                             npcs_involved=json.dumps(["Grik"]), session_id=session_id,
+                             turn_number=turn, context_delta=delta)
+
+    events = sqlite_db.get_recent_events(world["campaign_id"], limit=2)
+    assert [event.description for event in events] == ["Turn 3", "Turn 2"]
+    assert events[0].npcs_involved == ["Grik"] and events[0].location == "Cave"
+
+    with sqlite_db.db_connection() as conn:
+        event_id = conn.execute("SELECT event_id FROM events WHERE turn_number = 2;").fetchone()[0]
+    assert sqlite_db.get_event_context(event_id) == "Intro. Player: hi. "
+    print("✅ NPCs and events work on SQLite")
+
+def test_relationships(world):
+    """Batched relationship updates clamp scores and keep paged history"""
+    sqlite_db.save_npcs_bulk(world["campaign_id"], [goblin("Grik"), goblin("Snag")], "Cave")
+
+    touched = sqlite_db.update_npc_relationships(world["campaign_id"], world["character_id"], [
+        ("Grik", 5, "Player: hello"), ("Snag", -150, "Player: punches"),
+        ("Grik", 3, "Player: waves"), ("Nobody", 10, "Player: shouts"),
+    ])
+    assert touched == 2
+    for i in range(4):
+        sqlite_db.update_npc_relationship(world["campaign_id"], "Grik", world["character_id"], 1, f"Chat {i}")
+
+    relationships = {rel.npc_name: rel for rel in
+                     sqlite_db.get_npc_relationships(world["campaign_id"], world["character_id"])}
+    assert relationships["Snag"].relationship_score == -100
+    assert relationships["Grik"].relationship_score == 12
+    assert relationships["Grik"].history == ["Chat 1", "Chat 2", "Chat 3"]
+
+    relationship_id = relationships["Grik"].relationship_id
+    first = sqlite_db.get_relationship_history(relationship_id, limit=3)
+    rest = sqlite_db.get_relationship_history(relationship_id, before=first[-1], limit=10)
+    assert [entry["description"] for entry in first + rest] == [
+        "Chat 3", "Chat 2", "Chat 1", "Chat 0", "Player: hello\nPlayer: waves"]
+    print("✅ Relationships work on SQLite")
+
+def test_transaction_rolls_back(world):
+    """A failing unit of work leaves nothing behind"""
+    with pytest.raises(RuntimeError):
+        with sqlite_db.transaction():
+            sqlite_db.save_npc(world["campaign_id"], goblin("Ghost"), "Crypt")
+            raise RuntimeError("boom")
+    assert sqlite_db.get_npcs_at_location(world["campaign_id"], "Crypt") == []
+    print("✅ SQLite transactions roll back")
+
+def test_records_keep_dict_access(world):
+    """Records still answer record["key"] while callers move to attributes"""
+    sqlite_db.save_npc(world["campaign_id"], goblin("Grik"), "Cave")
+    npc = sqlite_db.get_npcs_at_location(world["campaign_id"], "Cave")[0]
+    assert npc["name"] == npc.name and npc["class"] == npc.char_class == "Goblin"
+    assert npc.get("disposition") == "neutral" and npc.get("missing", 0) == 0
+    assert "hp" in npc and "missing" not in npc
+    npc["hp"] -= 2
+    assert npc.hp == 5 and dict(npc.items())["class"] == "Goblin"
+    assert not hasattr(npc, "__dict__")
+
+    campaign_id, name, *_ = sqlite_db.get_most_recent_campaign(world["user_id"])
+    assert campaign_id == world["campaign_id"] and name == "Test Campaign"
+    print("✅ Records keep dict-style access")
+
+def test_event_retention_and_archive(world):
+    """Retention moves old events to the archive, where context rebuilds still find them"""
+    session_id = "22222222-2222-4222-8222-222222222222"
+    for turn in range(1, 6):
+        sqlite_db.save_event(world["campaign_id"], "interaction", f"Turn {turn}", "Cave",
+                             session_id=session_id, turn_number=turn, context_delta=f"{turn}. ")
+
+    sqlite_db.set_event_retention(world["campaign_id"], 2)
+    assert sqlite_db.apply_event_retention(world["campaign_id"]) == 3
+    assert sqlite_db.apply_event_retention() == 0
+
+    with sqlite_db.db_connection() as conn:
+        assert conn.execute("SELECT count(*) FROM events;").fetchone()[0] == 2
+        event_id = conn.execute("SELECT event_id FROM events WHERE turn_number = 5;").fetchone()[0]
+    assert sqlite_db.get_event_context(event_id) == "1. 2. 3. 4. 5. "
+
+    events = sqlite_db.get_recent_events(world["campaign_id"], limit=4)
+    assert [event.description for event in events] == ["Turn 5", "Turn 4", "Turn 3", "Turn 2"]
+    print("✅ Event retention archives old turns on SQLite")
+
+def test_search_events(world):
+    """Full-text search ranks hot and archived events and stays inside the campaign"""
+    sqlite_db.save_event(world["campaign_id"], "combat", "Goblins ambush the caravan", "Road",
+                         player_actions="I draw my sword")
+    sqlite_db.save_event(world["campaign_id"], "interaction", "The innkeeper pours an ale", "Inn")
+    sqlite_db.save_event(world["campaign_id"], "interaction", "A goblin trader haggles over ale", "Inn")
+    other_campaign = sqlite_db.create_campaign("Other", "", world["user_id"])
+    sqlite_db.save_event(other_campaign, "combat", "A goblin raid", "Road")
+    sqlite_db.set_event_retention(world["campaign_id"], 1)
+    sqlite_db.apply_event_retention(world["campaign_id"])
+
+    goblins = sqlite_db.search_events(world["campaign_id"], "goblin")
+    assert {event.description for event in goblins} == {"Goblins ambush the caravan",
+                                                        "A goblin trader haggles over ale"}
+    assert [event.description for event in sqlite_db.search_events(world["campaign_id"], "Goblin, ale!")] == [
+        "A goblin trader haggles over ale"]
+    assert len(sqlite_db.search_events(world["campaign_id"], "sword or ale", match_any=True)) == 3
+    assert sqlite_db.search_events(world["campaign_id"], "the ...") == []
+    print("✅ Event search works on SQLite")
+
+def test_keyset_pagination(world):
+    """Pages follow the listing order and carry on into archived events"""
+    for turn in range(1, 8):
+        sqlite_db.save_event(world["campaign_id"], "interaction", f"Turn {turn}")
+    sqlite_db.set_event_retention(world["campaign_id"], 4)
+    sqlite_db.apply_event_retention(world["campaign_id"])
+
+    descriptions, cursor = [], None
+    while True:
+        events, cursor = sqlite_db.page_events(world["campaign_id"], cursor, limit=3)
+        descriptions += [event.description for event in events]
+        if not cursor:
+            break
+    assert descriptions == [f"Turn {turn}" for turn in range(7, 0, -1)]
+
+    descriptions, cursor = [], None
+    while True:
+        events, cursor = sqlite_db.page_events(world["campaign_id"], cursor, limit=3, oldest_first=True)
+        descriptions += [event.description for event in events]
+        if not cursor:
+            break
+    assert descriptions == [f"Turn {turn}" for turn in range(1, 8)]
+
+    for i in range(4):
+        sqlite_db.create_campaign(f"Extra {i}", "", world["user_id"])
+    first, cursor = sqlite_db.page_campaigns(world["user_id"], limit=3)
+    rest, last_cursor = sqlite_db.page_campaigns(world["user_id"], cursor, limit=3)
+    assert [c.name for c in first + rest] == [c.name for c in sqlite_db.list_campaigns(world["user_id"])]
+    assert len(rest) == 2 and last_cursor is None and rest[0].role == "dm"
+
+    with pytest.raises(ValueError):
+        sqlite_db.page_events(world["campaign_id"], cursor)
+    with pytest.raises(ValueError):
+        sqlite_db.page_npc_relationships(world["campaign_id"], world["character_id"], "not-a-cursor")
+    print("✅ Keyset pagination works on SQLite")
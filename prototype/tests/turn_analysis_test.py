@@ -0,0 +1,65 @@
+"""
+Tests for the one-shot turn analysis (services/turn_analysis.py)
+
+LLM calls are replaced with fakes, so no API key or network is needed.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+
+from bots import llm_gateway
+from services import combat_detector, turn_analysis
+
+def test_unified_call_answers_both_questions(monkeypatch):
+    """One call decides combat and the roll; string flags and DCs are normalized"""
+    calls = []
+
+    def fake_chat_json(system_prompt, user_prompt, cache=False):
+        calls.append(user_prompt)
+        return {"combat": "false", "roll_needed": True, "dice_type": "d20", "roll_type": "Stealth",
+                "roll_reason": "Sneaking past the guard", "dc": "14"}
+
+    monkeypatch.setenv("TURN_ANALYSIS", "unified")
+    monkeypatch.setattr(llm_gateway, "chat_json", fake_chat_json)
+    turn = turn_analysis.analyze_turn_ai("A guard dozes by the gate.", "I sneak past him")
+
+    assert len(calls) == 1 and "I sneak past him" in calls[0]
+    assert turn["combat"] is False and turn["roll_needed"] is True and turn["dc"] == 14
+    assert turn["roll_type"] == "Stealth"
+    print("✅ Unified turn analysis answers both questions in one call")
+
+def test_parallel_calls_run_together(monkeypatch):
+    """Separate combat and roll calls overlap, and back up an incomplete unified reply"""
+    fallback_calls = []
+
+    def slow_combat(last_dm_text, player_response):
+        fallback_calls.append("combat")
+        time.sleep(0.2)
+        return True
+
+    def slow_roll(last_dm_text, player_input=""):
+        time.sleep(0.2)
+        return {"roll_needed": False, "roll_reason": "Combat"}
+
+    monkeypatch.setattr(combat_detector.detector, "enabled", False)
+    monkeypatch.setattr(turn_analysis, "analyze_combat_state_llm", slow_combat)
+    monkeypatch.setattr(turn_analysis._dice, "analyze_for_roll", slow_roll)
+
+    monkeypatch.setenv("TURN_ANALYSIS", "parallel")
+    started = time.monotonic()
+    turn = turn_analysis.analyze_turn_ai("The goblin snarls.", "I draw my sword")
+    assert time.monotonic() - started < 0.35  # serial calls would take 0.4s
+    assert turn["combat"] is True and turn["roll_needed"] is False
+
+    monkeypatch.setenv("TURN_ANALYSIS", "unified")
+    fallback_calls.clear()
+    monkeypatch.setattr(llm_gateway, "chat_json", lambda system_prompt, user_prompt, cache=False: {"combat": True})
+    turn = turn_analysis.analyze_turn_ai("The goblin snarls.", "I draw my sword")
+    assert turn["combat"] is True and turn["roll_needed"] is False and fallback_calls == []
+
+    monkeypatch.setattr(llm_gateway, "chat_json", lambda system_prompt, user_prompt, cache=False: {"combat": False})
+    assert turn_analysis.analyze_turn_ai("The goblin snarls.", "I draw my sword")["roll_reason"] == "Combat"
+    assert fallback_calls == ["combat"]
+    print("✅ Parallel turn analysis overlaps the two calls")
@@ -0,0 +1,84 @@
+"""
+Tests for the vector memory index (services/vector_memory.py)
+
+Uses the offline hashing embedder and the embedded SQLite backend.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import pytest
+
+from db import db
+from db import sqlite_backend as sqlite_db
+from services import vector_memory
+from services.vector_memory import HashingEmbedder, VectorMemory
+
+@pytest.fixture
+def campaign_id(tmp_path, monkeypatch):
+    """A campaign in a fresh SQLite database"""
+    if db.backend_for_url(db.DB_URL) != "sqlite":
+        pytest.skip("vector memory tests backfill from the SQLite backend")
+    sqlite_db.close_pool()
+    monkeypatch.setattr(sqlite_db, "DB_URL", f"sqlite:///{tmp_path / 'game.sqlite3'}")
+    user_id = sqlite_db.get_or_create_user("player")
+    yield sqlite_db.create_campaign("Memory", "", user_id)
+    sqlite_db.close_pool()
+
+def test_hashing_embedder():
+    """Same text, same unit vector; shared words score higher than unrelated text"""
+    embedder = HashingEmbedder(dim=128)
+    first, again, related, unrelated = embedder.embed([
+        "The goblin chieftain guards the crypt", "The goblin chieftain guards the crypt",
+        "Goblins guarding a crypt", "The innkeeper pours an ale"])
+    assert first.dtype == np.float32 and np.isclose(np.linalg.norm(first), 1.0)
+    assert np.array_equal(first, again)
+    assert first @ related > first @ unrelated
+    print("✅ Hashing embedder is deterministic and similarity-preserving")
+
+def test_search_persist_and_backfill(campaign_id, tmp_path):
+    """Top-k search, NPC dedupe, reload from disk and backfill from stored events"""
+    sqlite_db.save_event(campaign_id, "combat", "A goblin ambush on the forest road", "Road",
+                         player_actions="I draw my sword")
+    directory = str(tmp_path / "memory")
+    memory = VectorMemory(HashingEmbedder(dim=256), directory)
+    assert len(memory.index(campaign_id)) == 1  # backfilled from the events table
+
+    memory.add_event(campaign_id, "The innkeeper pours you an ale", player_actions="order a drink")
+    memory.add_npcs(campaign_id, [{"name": "Mira", "class": "Priest", "backstory": "Keeper of the old crypt"}])
+    memory.add_npc(campaign_id, {"name": "Mira", "class": "Priest", "backstory": "Keeper of the old crypt"})
+    assert len(memory.index(campaign_id)) == 3
+
+    hits = memory.search(campaign_id, "who keeps the crypt?", k=2)
+    assert hits[0].kind == "npc" and hits[0].metadata["name"] == "Mira"
+    assert [hit.kind for hit in memory.search(campaign_id, "goblin ambush", k=5, kind="event")][:1] == ["event"]
+
+    reloaded = VectorMemory(HashingEmbedder(dim=256), directory)
+    assert len(reloaded.index(campaign_id)) == 3
+    assert reloaded.search(campaign_id, "ale with the innkeeper", k=1)[0].text.endswith("pours you an ale")
+
+    # An index built by another embedder is rebuilt rather than misread
+    assert len(VectorMemory(HashingEmbedder(dim=64), directory).index(campaign_id)) == 1
+    print("✅ Vector memory searches, persists and backfills")
+
+def test_backfill_embeds_a_page_at_a_time(campaign_id, tmp_path, monkeypatch):
+    """Backfill sends one page per embedding request, oldest first, then the stored NPCs"""
+    for turn in range(1, 6):
+        sqlite_db.save_event(campaign_id, "interaction", f"Turn {turn} at the well", "Village")
+    stats = {"hp": 8, "ac": 10, "strength": 12, "dexterity": 10, "constitution": 12,
+             "intelligence": 10, "wisdom": 11, "charisma": 9, "level": 1}
+    sqlite_db.save_npcs_bulk(campaign_id, [{"name": "Old Tam", "class": "Farmer", "backstory": "Digs wells", **stats}],
+                             "Village")
+    monkeypatch.setattr(vector_memory, "_BACKFILL_PAGE", 2)
+
+    embedder = HashingEmbedder(dim=64)
+    batches = []
+    embed = embedder.embed
+    monkeypatch.setattr(embedder, "embed", lambda texts: (batches.append(list(texts)), embed(texts))[1])
+    index = VectorMemory(embedder, str(tmp_path / "memory")).index(campaign_id)
+
+    assert [len(batch) for batch in batches] == [2, 2, 1, 1]
+    assert [entry["text"] for entry in index.entries[:5]] == [f"Turn {turn} at the well" for turn in range(1, 6)]
+    assert index.entries[5]["kind"] == "npc" and index.entries[5]["name"] == "Old Tam"
+    print("✅ Backfill embeds a page at a time and picks up NPCs")
@@ -1,6 +1,7 @@
 # utils/command_handler.py
 import cli
-from db.db import get_recent_events, get_npc_relationships, get_npcs_at_location
+from db.db import (get_recent_events, page_events, search_events, get_npc_relationships,
+                   page_npc_relationships, get_npcs_at_location, get_relationship_history)
 
 class CommandHandler:
     def __init__(self, game_session=None, combat_manager=None):
@@ -32,8 +33,13 @@ class CommandHandler:
             return self.handle_debug_info()
         elif cmd == "memory":
             return self.handle_memory()
+        elif cmd.startswith("/search ") and self.game_session:
+            # Slash form, so "search the chest" stays a player action
+            return self.handle_search(command.strip()[len("/search "):])
         elif cmd == "relationships" or cmd == "relations":
             return self.handle_relationships()
+        elif cmd.startswith("/history ") and self.game_session:
+            return self.handle_relationship_history(command.strip()[len("/history "):])
         elif cmd == "npcs":
             return self.handle_npcs()
         elif cmd == "location":
@@ -122,77 +128,145 @@ class CommandHandler:
         print("  menu    - Return to menu")
         print("\n🧠 AI Memory Commands:")
         print("  memory       - View recent story events")
+        print("  /search <words> - Find past story events mentioning those words")
         print("  relationships - View NPC relationships")
+        print("  /history <npc> - Page through past interactions with an NPC")
         print("  npcs         - View NPCs at current location")
         print("  location     - View current location")
         print("  help         - Show this help")
         print("\nType any command during story or combat!")
         return True
 
-    def handle_memory(self):
-        """View recent story events from AI memory"""
+    def handle_memory(self, page_size=8):
+        """Page through story events from AI memory, newest first"""
         if not self.game_session:
             print("❌ No game session active")
             return True
             
         print("\n🧠 AI MEMORY - RECENT EVENTS:")
-        events = get_recent_events(self.game_session.campaign_id, limit=8)
-        
+        cursor = None
+        shown = 0
+        while True:
+            events, cursor = page_events(self.game_session.campaign_id, cursor=cursor, limit=page_size)
+            
+            if not events and shown == 0:
+                print("   No events recorded yet.")
+                return True
+                
+            for event in events:
+                shown += 1
+                timestamp = event['created_at'].strftime("%H:%M:%S") if event['created_at'] else "Unknown"
+                print(f"\n{shown}. [{timestamp}] {event['event_type'].upper()}")
+                print(f"   Location: {event['location'] or 'Unknown'}")
+                print(f"   Event: {event['description'][:100]}{'...' if len(event['description']) > 100 else ''}")
+                if event['player_actions']:
+                    print(f"   Player: {event['player_actions'][:80]}{'...' if len(event['player_actions']) > 80 else ''}")
+                    
+            if not cursor or input("\nShow older events? (y/n): ").strip().lower() != "y":
+                return True
+
+    def handle_search(self, query, limit=8):
+        """Search the whole campaign history, best matches first"""
+        if not self.game_session:
+            print("❌ No game session active")
+            return True
+
+        events = search_events(self.game_session.campaign_id, query, limit=limit)
+        print(f"\n🔎 AI MEMORY - EVENTS MATCHING '{query}':")
         if not events:
-            print("   No events recorded yet.")
+            print("   No matching events.")
             return True
-            
+
         for i, event in enumerate(events, 1):
-            timestamp = event['created_at'].strftime("%H:%M:%S") if event['created_at'] else "Unknown"
+            timestamp = event['created_at'].strftime("%Y-%m-%d %H:%M") if event['created_at'] else "Unknown"
             print(f"\n{i}. [{timestamp}] {event['event_type'].upper()}")
             print(f"   Location: {event['location'] or 'Unknown'}")
             print(f"   Event: {event['description'][:100]}{'...' if len(event['description']) > 100 else ''}")
             if event['player_actions']:
                 print(f"   Player: {event['player_actions'][:80]}{'...' if len(event['player_actions']) > 80 else ''}")
-                
         return True
 
-    def handle_relationships(self):
-        """View NPC relationships"""
+    def handle_relationships(self, page_size=10):
+        """View NPC relationships, a page at a time"""
         if not self.game_session or not self.game_session.character_id:
             print("❌ No game session or character active")
             return True
             
         print(f"\n🤝 NPC RELATIONSHIPS for {self.game_session.player_name}:")
-        relationships = get_npc_relationships(self.game_session.campaign_id, self.game_session.character_id)
-        
-        if not relationships:
-            print("   No relationships established yet.")
-            return True
-            
-        for rel in relationships:
-            score = rel['relationship_score']
+        cursor = None
+        shown = 0
+        while True:
+            relationships, cursor = page_npc_relationships(self.game_session.campaign_id,
+                                                           self.game_session.character_id,
+                                                           cursor=cursor, limit=page_size)
             
-            # Determine relationship status
-            if score > 50:
-                status = "🟢 Strong Ally"
-            elif score > 20:
-                status = "🔵 Ally"
-            elif score > -20:
-                status = "⚪ Neutral"
-            elif score > -50:
-                status = "🔴 Enemy"
-            else:
-                status = "🔴 Strong Enemy"
+            if not relationships and shown == 0:
+                print("   No relationships established yet.")
+                return True
                 
-            print(f"\n• {rel['npc_name']} - {status} ({score:+d})")
-            if rel['last_interaction']:
-                print(f"  Last: {rel['last_interaction'][:100]}{'...' if len(rel['last_interaction']) > 100 else ''}")
-            
-            # Show relationship history if available
-            if rel['history'] and len(rel['history'].strip()) > 0:
-                history_lines = rel['history'].split('\n')[-2:]  # Last 2 interactions
-                for line in history_lines:
+            for rel in relationships:
+                shown += 1
+                score = rel['relationship_score']
+                
+                # Determine relationship status
+                if score > 50:
+                    status = "🟢 Strong Ally"
+                elif score > 20:
+                    status = "🔵 Ally"
+                elif score > -20:
+                    status = "⚪ Neutral"
+                elif score > -50:
+                    status = "🔴 Enemy"
+                else:
+                    status = "🔴 Strong Enemy"
+                    
+                print(f"\n• {rel['npc_name']} - {status} ({score:+d})")
+                if rel['last_interaction']:
+                    print(f"  Last: {rel['last_interaction'][:100]}{'...' if len(rel['last_interaction']) > 100 else ''}")
+                
+                # Show relationship history if available
+                for line in rel['history'][-2:]:  # Last 2 interactions
                     if line.strip():
                         print(f"  History: {line.strip()[:80]}{'...' if len(line.strip()) > 80 else ''}")
-                        
+
+            if not cursor or input("\nShow more relationships? (y/n): ").strip().lower() != "y":
+                break
+
+        print("\n  (Type 'history <npc name>' to see older interactions)")
         return True
 
+    def handle_relationship_history(self, npc_name, page_size=10):
+        """Page through the full interaction history with one NPC"""
+        if not self.game_session or not self.game_session.character_id:
+            print("❌ No game session or character active")
+            return True
+
+        relationships = get_npc_relationships(self.game_session.campaign_id, self.game_session.character_id,
+                                              history_limit=0)
+        rel = next((r for r in relationships if r['npc_name'].lower() == npc_name.strip().lower()), None)
+        if not rel:
+            print(f"❌ No relationship with '{npc_name}' yet.")
+            return True
+
+        print(f"\n📜 HISTORY WITH {rel['npc_name'].upper()} ({rel['relationship_score']:+d}):")
+        before = None
+        shown = 0
+        while True:
+            entries = get_relationship_history(rel['relationship_id'], before=before, limit=page_size)
+            for entry in entries:
+                shown += 1
+                timestamp = entry['created_at'].strftime("%Y-%m-%d %H:%M") if entry['created_at'] else "Unknown"
+                print(f"{shown}. [{timestamp}] ({entry['score_change']:+d}) {entry['description'][:100]}")
+
+            if len(entries) < page_size:
+                if shown == 0:
+                    print("   No interactions recorded yet.")
+                return True
+
+            before = entries[-1]
+            if input("\nShow older interactions? (y/n): ").strip().lower() != "y":
+                return True
+
     def handle_npcs(self):
         """View NPCs at current location"""
         if not self.game_session:
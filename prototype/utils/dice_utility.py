@@ -3,16 +3,10 @@
 import os
 import json
 import random
-from openai import OpenAI
-from dotenv import load_dotenv
+from bots import llm_gateway
 from .debug_util import debug_log
-load_dotenv()
-client = OpenAI()
 
 class DiceUtility:
-    def __init__(self):
-        self.client = client
-
     def analyze_for_roll(self, last_dm_text: str, player_input: str = "") -> dict:
 
         debug_log("analyze_for_roll() called.")
@@ -35,16 +29,7 @@ class DiceUtility:
             "Decide if a dice roll is needed and explain the type and reason."
         )
 
-        response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            response_format={"type": "json_object"}
-        )
-        
-        return json.loads(response.choices[0].message.content)
+        return llm_gateway.chat_json(system_prompt, user_prompt)
 
     def roll_dice(self, dice_type) -> int:
         